@@ -0,0 +1,84 @@
+'''
+Function:
+    Implementation of Cross Checking And Benchmarking The AESAlgorithmWrapper Backends (pycryptodome vs Pure Python)
+Author:
+    Zhenchao Jin
+WeChat Official Account (微信公众号):
+    Charles的皮卡丘
+'''
+import os
+import time
+import random
+import argparse
+from contextlib import contextmanager
+from videodl.modules.utils.aes import AES, AESAlgorithmWrapper, BLOCK_SIZE_BYTES
+
+
+'''backend'''
+@contextmanager
+def backend(use_fast: bool):
+    previous = AESAlgorithmWrapper.USE_FAST_BACKEND; AESAlgorithmWrapper.USE_FAST_BACKEND = use_fast
+    try: yield
+    finally: AESAlgorithmWrapper.USE_FAST_BACKEND = previous
+
+
+'''both'''
+def both(func, *args, **kwargs):
+    outputs = []
+    for use_fast in (False, True):
+        with backend(use_fast):
+            try: outputs.append(('ok', func(*args, **kwargs)))
+            except Exception as err: outputs.append(('err', f'{type(err).__name__}: {err}'))
+    return outputs
+
+
+'''crosscheck'''
+def crosscheck(rounds: int, seed: int = 0) -> int:
+    rng, failures, W = random.Random(seed), 0, AESAlgorithmWrapper
+    randbytes = lambda n: bytes(rng.getrandbits(8) for _ in range(n))
+    for idx in range(rounds):
+        key, iv, size = randbytes(rng.choice((16, 24, 32))), randbytes(BLOCK_SIZE_BYTES), rng.choice((0, 1, 15, 16, 17, 31, 32, 33, 100, 256))
+        data, aligned = randbytes(size), randbytes(BLOCK_SIZE_BYTES * rng.randint(1, 8))
+        nonce, tag = randbytes(rng.choice((12, 16))), randbytes(BLOCK_SIZE_BYTES)
+        cases = {
+            'aesecbencrypt': (W.aesecbencrypt, list(data), list(key)), 'aesecbdecrypt': (W.aesecbdecrypt, list(aligned), list(key)),
+            'aesctrencrypt': (W.aesctrencrypt, list(data), list(key), list(iv)), 'aesctrwraparound': (W.aesctrencrypt, list(data), list(key), [0xFF] * BLOCK_SIZE_BYTES),
+            'aescbcdecrypt': (W.aescbcdecrypt, list(aligned), list(key), list(iv)), 'aescbcdecryptbytes': (W.aescbcdecryptbytes, aligned, key, iv),
+            'aesgcmdecryptandverify': (W.aesgcmdecryptandverify, list(data), list(key), list(tag), list(nonce)),
+        }
+        for padding_mode in ('pkcs7', 'iso7816', 'whitespace', 'zero'):
+            cases[f'aescbcencrypt[{padding_mode}]'] = (lambda *a, m=padding_mode: W.aescbcencrypt(*a, padding_mode=m), list(data), list(key), list(iv))
+            cases[f'aescbcencryptbytes[{padding_mode}]'] = (lambda *a, m=padding_mode: W.aescbcencryptbytes(*a, padding_mode=m), data, key, iv)
+        # a valid tag so the gcm fast path is exercised on the success branch too
+        sealed, valid_tag = AES.new(key, AES.MODE_GCM, nonce=nonce).encrypt_and_digest(data) if AES is not None else (data, tag)
+        cases['aesgcmdecryptandverify[valid]'] = (W.aesgcmdecryptandverify, list(sealed), list(key), list(valid_tag), list(nonce))
+        for name, (func, *args) in cases.items():
+            if (outputs := both(func, *args))[0] != outputs[1]: failures += 1; print(f'[MISMATCH] round {idx} {name}: pure={outputs[0]!r:.80} fast={outputs[1]!r:.80}')
+    return failures
+
+
+'''throughput'''
+def throughput(size_mb: float, pure_size_kb: int):
+    key, iv, data = os.urandom(16), os.urandom(16), os.urandom(int(size_mb * 1024 * 1024))
+    for use_fast, payload in ((True, data), (False, data[:pure_size_kb * 1024])):
+        with backend(use_fast):
+            started_at = time.perf_counter(); AESAlgorithmWrapper.aescbcdecryptbytes(payload, key, iv); elapsed = time.perf_counter() - started_at
+        print(f"{'pycryptodome' if use_fast else 'pure python'}: aes-128-cbc decrypt {len(payload) / 1024 / 1024:.2f} MB in {elapsed * 1000:.1f} ms, {len(payload) / 1024 / 1024 / elapsed:.2f} MB/s")
+
+
+'''run'''
+def run():
+    arg_parser = argparse.ArgumentParser(description='Cross check the pycryptodome fast path of AESAlgorithmWrapper against the pure python implementation and report throughput.')
+    arg_parser.add_argument('--rounds', type=int, default=20, help='number of randomised cross check rounds')
+    arg_parser.add_argument('--size-mb', type=float, default=64.0, help='payload size for the pycryptodome throughput run')
+    arg_parser.add_argument('--pure-size-kb', type=int, default=64, help='payload size for the pure python throughput run')
+    args = arg_parser.parse_args()
+    if not AESAlgorithmWrapper.USE_FAST_BACKEND: print('pycryptodome is not installed, only the pure python backend is available')
+    failures = crosscheck(args.rounds); print(f'cross check: {args.rounds} rounds, {failures} mismatches')
+    if AESAlgorithmWrapper.USE_FAST_BACKEND: throughput(args.size_mb, args.pure_size_kb)
+    if failures: raise SystemExit(1)
+
+
+'''tests'''
+if __name__ == '__main__':
+    run()
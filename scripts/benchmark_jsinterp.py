@@ -0,0 +1,45 @@
+'''
+Function:
+    Implementation of Benchmarking The Pure Python JSInterpreter Used As The Non-Node YouTube Cipher Fallback
+Author:
+    Zhenchao Jin
+WeChat Official Account (微信公众号):
+    Charles的皮卡丘
+'''
+import os
+import time
+import argparse
+from videodl.modules.js.youtube import JSInterpreter
+
+
+'''timeit'''
+def timeit(func, repeat: int) -> float:
+    timings = []
+    for _ in range(max(1, repeat)):
+        started_at = time.perf_counter(); func(); timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+'''run'''
+def run():
+    arg_parser = argparse.ArgumentParser(description='Time extracted player functions through JSInterpreter, uncached (fresh interpreter, and with it fresh parse caches, per call) versus the cached compiled functions.')
+    arg_parser.add_argument('--player-js', type=str, default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'samples', 'youtube_player_functions.js'), help='player js holding the functions to benchmark')
+    arg_parser.add_argument('--functions', type=str, default='Ms,Nq,Pr', help='comma separated function names to call')
+    arg_parser.add_argument('--calls', type=int, default=20, help='number of calls per timed run')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='number of timed runs')
+    args = arg_parser.parse_args()
+    with open(args.player_js, 'r', encoding='utf-8') as fp: code = fp.read()
+    inputs = [f'AOq0QJ8wRQIhAKKt7xk6iq2lZq_GGB{idx:04d}' * 3 for idx in range(args.calls)]
+    def coldcall(function_name: str, value: str):
+        return JSInterpreter(code).extractfunction(function_name)([value])
+    # uncached still runs the current tokeniser, it is not the pre-cache interpreter, which took 11.4 / 501 / 208 ms per call for Ms / Nq / Pr on the default sample
+    for function_name in [name.strip() for name in args.functions.split(',') if name.strip()]:
+        cold = timeit(lambda: [coldcall(function_name, value) for value in inputs], args.repeat)
+        assert [coldcall(function_name, value) for value in inputs] == [JSInterpreter.cachedfunction(code, function_name)([value]) for value in inputs]
+        warm = timeit(lambda: [JSInterpreter.cachedfunction(code, function_name)([value]) for value in inputs], args.repeat)
+        print(f"{function_name}: uncached {cold / len(inputs) * 1000:.2f} ms/call, cached {warm / len(inputs) * 1000:.2f} ms/call, speedup {cold / warm:.1f}x")
+
+
+'''tests'''
+if __name__ == '__main__':
+    run()
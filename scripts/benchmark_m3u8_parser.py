@@ -0,0 +1,75 @@
+'''
+Function:
+    Implementation of Benchmarking The Streaming M3U8 Parser Against The m3u8 Library On Very Long Playlists
+Author:
+    Zhenchao Jin
+WeChat Official Account (微信公众号):
+    Charles的皮卡丘
+'''
+import gc
+import time
+import m3u8
+import argparse
+import tracemalloc
+from videodl.modules.utils.hls import M3U8StreamParser
+
+
+'''synthesizeplaylist'''
+def synthesizeplaylist(num_segments: int, byterange: bool = False) -> bytes:
+    lines = ['#EXTM3U', '#EXT-X-VERSION:7', '#EXT-X-TARGETDURATION:6', '#EXT-X-MEDIA-SEQUENCE:100', '#EXT-X-PLAYLIST-TYPE:VOD', '#EXT-X-MAP:URI="init.mp4"']
+    for idx in range(num_segments):
+        if idx % 1000 == 0: lines.append(f'#EXT-X-KEY:METHOD=AES-128,URI="https://keys.example.com/key/{idx // 1000}",IV=0x{idx:032x}')
+        if idx and idx % 5000 == 0: lines.append('#EXT-X-DISCONTINUITY')
+        if idx % 600 == 0: lines.append(f'#EXT-X-PROGRAM-DATE-TIME:2024-01-01T00:{(idx // 600) % 60:02d}:00.000Z')
+        lines.append('#EXTINF:6.006,')
+        if byterange: lines.append(f'#EXT-X-BYTERANGE:{1000000 + idx % 7}'); lines.append('media/archive.mp4')
+        else: lines.append(f'media/seg-{idx:06d}.m4s?token=abcdef0123456789')
+    lines.append('#EXT-X-ENDLIST')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+'''iterchunks'''
+def iterchunks(data: bytes, chunk_size: int = 65536):
+    for offset in range(0, len(data), chunk_size): yield data[offset: offset + chunk_size]
+
+
+'''measure'''
+def measure(func, repeat: int = 3):
+    # timings and memory come from separate runs since tracemalloc slows allocation heavy code down several times
+    elapsed = []
+    for _ in range(max(1, repeat)): gc.collect(); started_at = time.perf_counter(); func(); elapsed.append(time.perf_counter() - started_at)
+    gc.collect(); tracemalloc.start(); result = func(); _, peak = tracemalloc.get_traced_memory(); tracemalloc.stop()
+    return result, min(elapsed), peak
+
+
+'''run'''
+def run():
+    arg_parser = argparse.ArgumentParser(description='Compare M3U8StreamParser with m3u8.loads on a synthetic long playlist.')
+    arg_parser.add_argument('--segments', type=int, default=50000, help='number of segments in the synthetic playlist')
+    arg_parser.add_argument('--byterange', action='store_true', help='address all segments as byte ranges of one file')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='number of timed runs, the best one is reported')
+    args = arg_parser.parse_args()
+    data, base_uri = synthesizeplaylist(args.segments, byterange=args.byterange), 'https://cdn.example.com/vod/playlist.m3u8'
+    print(f"playlist: {args.segments} segments, {len(data) / 1024 / 1024:.2f} MB")
+    # m3u8 library, whole text in memory and a full object tree
+    loaded, elapsed, peak = measure(lambda: m3u8.loads(data.decode('utf-8'), uri=base_uri), repeat=args.repeat)
+    reference = [(s.absolute_uri, s.duration, s.byterange) for s in loaded.segments]; del loaded
+    print(f"m3u8.loads                  : {elapsed * 1000:8.1f} ms, peak {peak / 1024 / 1024:7.2f} MB")
+    # streaming parser, records consumed one by one as a downloader would
+    count, elapsed, peak = measure(lambda: sum(1 for _ in M3U8StreamParser(base_uri).iterbytes(iterchunks(data))), repeat=args.repeat)
+    print(f"M3U8StreamParser (streamed) : {elapsed * 1000:8.1f} ms, peak {peak / 1024 / 1024:7.2f} MB, {count} segments")
+    # streaming parser, all records kept
+    segments, elapsed, peak = measure(lambda: list(M3U8StreamParser(base_uri).iterbytes(iterchunks(data))), repeat=args.repeat)
+    print(f"M3U8StreamParser (list)     : {elapsed * 1000:8.1f} ms, peak {peak / 1024 / 1024:7.2f} MB")
+    # time until the first segment can be handed to the downloader
+    started_at = time.perf_counter(); next(M3U8StreamParser(base_uri).iterbytes(iterchunks(data)))
+    print(f"first segment available     : {(time.perf_counter() - started_at) * 1000:8.3f} ms")
+    # cross check against the m3u8 library
+    to_byterange = lambda s: f"{s.byterange[0]}@{s.byterange[1]}" if s.byterange else None
+    mismatches = sum(1 for ref, seg in zip(reference, segments) if ref[0] != seg.uri or abs(ref[1] - seg.duration) > 1e-9 or (ref[2] is not None and not to_byterange(seg).startswith(ref[2].split('@')[0])))
+    print(f"cross check                 : {len(segments)} / {len(reference)} segments, {mismatches} mismatches")
+
+
+'''tests'''
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,106 @@
+'''
+Function:
+    Implementation of Benchmarking The UMP/SABR Response Parser Used By YouTube Downloads
+Author:
+    Zhenchao Jin
+WeChat Official Account (微信公众号):
+    Charles的皮卡丘
+'''
+import os
+import time
+import argparse
+from videodl.modules.utils.youtubeutils import PART, MediaHeader, ServerAbrStream
+
+
+'''encodeumpvarint'''
+def encodeumpvarint(value: int) -> bytes:
+    if value < 128: return bytes([value])
+    if value < 16384: return bytes([(value & 0x3F) | 0x80, value >> 6])
+    if value < 2097152: return bytes([(value & 0x1F) | 0xC0, (value >> 5) & 0xFF, value >> 13])
+    if value < 268435456: return bytes([(value & 0x0F) | 0xE0, (value >> 4) & 0xFF, (value >> 12) & 0xFF, value >> 20])
+    return bytes([0xF0]) + value.to_bytes(4, 'little')
+
+
+'''encodeumppart'''
+def encodeumppart(part_type: int, payload: bytes) -> bytes:
+    return encodeumpvarint(part_type) + encodeumpvarint(len(payload)) + payload
+
+
+'''synthesizeumpstream'''
+def synthesizeumpstream(size_mb: float, segment_size: int = 512 * 1024, part_size: int = 16 * 1024, format_id: dict = None) -> bytes:
+    format_id, parts, written, sequence_number = format_id or {'itag': 248, 'lastModified': 1700000000000000}, [], 0, 0
+    while written < size_mb * 1024 * 1024:
+        sequence_number += 1; header_id = sequence_number % 200
+        header = MediaHeader.encode({'headerId': header_id, 'itag': format_id['itag'], 'formatId': format_id, 'sequenceNumber': sequence_number, 'durationMs': 5000, 'contentLength': segment_size}).finish()
+        parts.append(encodeumppart(PART.MEDIA_HEADER.value, bytes(header)))
+        for offset in range(0, segment_size, part_size): parts.append(encodeumppart(PART.MEDIA.value, bytes([header_id]) + os.urandom(min(part_size, segment_size - offset))))
+        parts.append(encodeumppart(PART.MEDIA_END.value, bytes([header_id]))); written += segment_size
+    return b''.join(parts)
+
+
+'''readumpvarint'''
+def readumpvarint(buf: bytes, offset: int):
+    if offset >= len(buf): return -1, offset
+    first_byte = buf[offset]; byte_length = 1 if first_byte < 128 else 2 if first_byte < 192 else 3 if first_byte < 224 else 4 if first_byte < 240 else 5
+    if offset + byte_length > len(buf): return -1, offset
+    if byte_length == 1: return first_byte, offset + 1
+    if byte_length == 5: return int.from_bytes(buf[offset + 1:offset + 5], 'little'), offset + 5
+    value = first_byte & (0xFF >> byte_length)
+    for idx in range(1, byte_length): value += buf[offset + idx] << (8 - byte_length + 8 * (idx - 1))
+    return value, offset + byte_length
+
+
+'''referenceparse'''
+def referenceparse(data: bytes) -> int:
+    # copying reference with the pre-memoryview data movement, the rest of the stream is re-sliced after every part and every part is materialised as an int list
+    buf, media_bytes = bytes(data), 0
+    while buf:
+        part_type, offset = readumpvarint(buf, 0); part_size, offset = readumpvarint(buf, offset)
+        if part_type < 0 or part_size < 0 or offset + part_size > len(buf): break
+        payload, buf = buf[offset:offset + part_size], buf[offset + part_size:]
+        items = list(payload)
+        if part_type == PART.MEDIA.value: media_bytes += len(bytes(items[1:]))
+    return media_bytes
+
+
+'''buildparser'''
+def buildparser(format_id: dict) -> ServerAbrStream:
+    parser = ServerAbrStream.__new__(ServerAbrStream)
+    parser.initialized_formats, parser.formats_by_key, parser.header_id_to_format_key_map, parser.previous_sequences = [], {}, {}, {}
+    format_key = ServerAbrStream.getformatkey(format_id)
+    parser.initialized_formats.append({'formatId': format_id, 'formatKey': format_key, 'durationMs': 0, 'mimeType': 'video/webm', 'sequenceCount': 0, 'sequenceList': [], 'mediaChunks': [], '_state': {'formatId': format_id, 'startTimeMs': 0, 'durationMs': 0, 'startSegmentIndex': 1, 'endSegmentIndex': 0}})
+    parser.formats_by_key[format_key] = parser.initialized_formats[-1]
+    return parser
+
+
+'''run'''
+def run():
+    arg_parser = argparse.ArgumentParser(description='Replay a UMP byte stream through ServerAbrStream.parseumpresponse and report parse throughput.')
+    arg_parser.add_argument('--ump-file', type=str, default=None, help='recorded UMP response body, a synthetic stream is generated when omitted')
+    arg_parser.add_argument('--size-mb', type=float, default=32.0, help='size of the synthetic stream in MB')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='number of timed replays')
+    arg_parser.add_argument('--mode', type=str, default='both', choices=['both', 'current', 'reference'], help='time the memoryview parser, the copying reference parser, or both')
+    args = arg_parser.parse_args()
+    format_id = {'itag': 248, 'lastModified': 1700000000000000, 'xtags': None}
+    if args.ump_file:
+        with open(args.ump_file, 'rb') as fp: data = fp.read()
+    else:
+        data = synthesizeumpstream(args.size_mb, format_id={'itag': 248, 'lastModified': 1700000000000000})
+    '''currentparse'''
+    def currentparse():
+        result = buildparser(format_id).parseumpresponse(data)
+        return sum(len(chunk) for fmt in result['initialized_formats'] for chunk in fmt['mediaChunks'])
+    parse_funcs, bests = {'current': currentparse, 'reference': lambda: referenceparse(data)}, {}
+    print(f"stream: {len(data) / 1024 / 1024:.2f} MB")
+    for name in (['reference', 'current'] if args.mode == 'both' else [args.mode]):
+        timings = []
+        for _ in range(max(1, args.repeat)):
+            started_at = time.perf_counter(); media_bytes = parse_funcs[name](); timings.append(time.perf_counter() - started_at)
+        bests[name] = min(timings)
+        print(f"{name:>9}: best {bests[name] * 1000:.1f} ms, {len(data) / 1024 / 1024 / bests[name]:.1f} MB/s over {len(timings)} runs, media payload {media_bytes / 1024 / 1024:.2f} MB")
+    if len(bests) == 2: print(f"  speedup: {bests['reference'] / bests['current']:.1f}x")
+
+
+'''tests'''
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,6 @@
+var _yt_player={};(function(g){var window=this;'use strict';var XT="split join reverse length _w8_ abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_".split(" ");
+var Qx={Tn:function(a){a.reverse()},kF:function(a,b){a.splice(0,b)},W9:function(a,b){var c=a[0];a[0]=a[b%a.length];a[b%a.length]=c}};
+Ms=function(a){a=a.split("");Qx.W9(a,41);Qx.kF(a,2);Qx.Tn(a,7);Qx.W9(a,18);Qx.kF(a,3);Qx.Tn(a,44);Qx.W9(a,62);Qx.kF(a,1);return a.join("")};
+Nq=function(a){var b=a.split(""),c=[1843,-79,23,52,-1003,417,-26,9,-3,78,12,5,-61,33,7,-8];var d="abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_";for(var e=0;e<b.length;e++){var f=d.indexOf(b[e]);if(f>=0){b[e]=d[(f+c[e%16]%64+128)%64]}};for(var h=0;h<b.length-1;h+=2){var k=b[h];b[h]=b[h+1];b[h+1]=k};var m=[];for(var n=0;n<b.length;n++){switch(n%3){case 0:m.push(b[n]);break;case 1:m.unshift(b[n]);break;default:m.push(b[b.length-1-n])}};m.reverse();return m.join("")};
+Pr=function(a){var b=a.split(""),c=0;for(var d=0;d<b.length;d++){c=(c*31+b[d].charCodeAt(0))%65521};var e=[];for(var f=0;f<8;f++){e.push(String.fromCharCode(97+(c>>f*2)%26))};return a+"_"+e.join("")};
+})(_yt_player);
@@ -42,5 +42,6 @@ setup(
     ]},
     entry_points={'console_scripts': ['videodl = videodl.videodl:VideoClientCMD']},
     install_requires=[lab.strip('\n') for lab in list(open('requirements.txt', 'r').readlines()) if lab.strip('\n')],
+    extras_require={'wasm': ['wasmtime>=20.0.0']},
     zip_safe=True,
 )
\ No newline at end of file
@@ -6,5 +6,5 @@ from .utils import (
     touchdir, legalizestring, printtable, colorize, resp2json, usedownloadheaderscookies, useparseheaderscookies, usesearchheaderscookies, initcdm, searchdictbykey, printfullline, cookies2string, cookies2dict, intornone, closecdm, progresslog, 
     yieldtimerelatedtitle, generateuniquetmppath, shortenpathsinvideoinfos, extracttitlefromurl, floatornone, optionalimport, optionalimportfrom, traverseobj, naivedetermineext, naivecleanhtml, naivejstojson, safeextractfromdict, taskprogress, 
     safeunlinkpathobj, SearchPsshValueUtils, BaseModuleBuilder, FileTypeSniffer, VideoInfo, AESAlgorithmWrapper, BrightcoveSmuggler, RandomIPGenerator, ChromiumDownloaderUtils, SpinWithBackoff, TencentHLSHelper, CCTVHLSBestParser, LoggerHandle, 
-    FileLock, CommandBuilder, CommandModsApplier, FFmpegCommandFactory, NM3U8DLRECommandFactory, Aria2cCommandFactory, CmdArg, CmdOp, DrissionPageUtils, 
+    FileLock, CommandBuilder, CommandModsApplier, FFmpegCommandFactory, NM3U8DLRECommandFactory, Aria2cCommandFactory, CmdArg, CmdOp, DrissionPageUtils, AdaptivePoller, PollingScheduler, PollCancelledError, CredentialCache, 
 )
\ No newline at end of file
@@ -10,7 +10,7 @@ import os
 import re
 from ..sources import BaseVideoClient
 from ..utils.domains import platformfromurl
-from ..utils import VideoInfo, FileTypeSniffer, DrissionPageUtils, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle, safeextractfromdict
+from ..utils import VideoInfo, FileTypeSniffer, DrissionPageUtils, CredentialCache, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle, safeextractfromdict
 
 
 '''GVVIPVideoClient'''
@@ -26,7 +26,9 @@ class GVVIPVideoClient(BaseVideoClient):
     def _visithomepage(self, homepage: str = 'https://greenvideo.cc/video/vip', request_overrides: dict = None):
         request_overrides = request_overrides or {}
         page = DrissionPageUtils.initsmartbrowser(headless=True, requests_headers=None, requests_proxies=(request_overrides.get('proxies') or self._autosetproxies()), requests_cookies=(request_overrides.get('cookies') or self.default_cookies))
-        page.set.timeouts(page_load=60); page.get(homepage); page.wait(2); DrissionPageUtils.quitpage(page=page)
+        try: page.set.timeouts(page_load=60); page.get(homepage); page.wait(2); cookies = DrissionPageUtils.getcookiesdict(page=page)
+        finally: DrissionPageUtils.quitpage(page=page)
+        return {'homepage': homepage, 'cookies': dict(cookies or {})}
     '''parsefromurl'''
     @useparseheaderscookies
     def parsefromurl(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
@@ -35,11 +37,16 @@ class GVVIPVideoClient(BaseVideoClient):
         video_info = VideoInfo(source=self.source, enable_nm3u8dlre=False, download_with_ffmpeg=True) if BaseVideoClient.belongto(url, {"ted.com", "xinpianchang.com", "ifeng.com"}) else VideoInfo(source=self.source, enable_nm3u8dlre=True)
         if platformfromurl(url) in {'bilibili'}: video_info.update(dict(default_download_headers=self.BILIBILI_REFERENCE_HEADERS, default_audio_download_headers=self.BILIBILI_REFERENCE_HEADERS))
         if platformfromurl(url) in {'weibo'}: video_info.update(dict(default_download_headers=self.WEIBO_REFERENCE_HEADERS, default_audio_download_headers=self.WEIBO_REFERENCE_HEADERS))
-        self._visithomepage(request_overrides=request_overrides) # our tests show that you need to access the site’s homepage once in a browser before it can be parsed correctly
         # try parse
         try:
-            # --get request
-            (resp := self.get(f'https://greenvideo.cc/video-tool/movie/getRawDynamicPlayUrl?url={url}', **request_overrides)).raise_for_status()
+            # --get request, our tests show that you need to access the site’s homepage once in a browser before it can be parsed correctly, so the visit is cached and only redone when rejected
+            for _ in range(2):
+                homepage_visit = self.credential_cache.getorfetch('homepage_visit', lambda: self._visithomepage(request_overrides=request_overrides), ttl=1200)
+                cookies = {**homepage_visit['cookies'], **(request_overrides.get('cookies') or self.default_cookies or {})}
+                resp = self.get(f'https://greenvideo.cc/video-tool/movie/getRawDynamicPlayUrl?url={url}', **{**request_overrides, 'cookies': cookies})
+                if not CredentialCache.shouldinvalidate(resp): break
+                self.credential_cache.invalidate('homepage_visit')
+            resp.raise_for_status()
             video_info.update(dict(raw_data=(raw_data := resp2json(resp=resp))))
             # --video title
             video_title = legalizestring(safeextractfromdict(raw_data, ['data', 'title'], None) or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
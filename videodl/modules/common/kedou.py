@@ -17,7 +17,7 @@ from ..sources import BaseVideoClient
 from Cryptodome.Util.Padding import pad
 from Cryptodome.Cipher import PKCS1_v1_5
 from ..utils.domains import platformfromurl
-from ..utils import RandomIPGenerator, VideoInfo, FileTypeSniffer, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle, safeextractfromdict
+from ..utils import RandomIPGenerator, VideoInfo, FileTypeSniffer, CredentialCache, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle, safeextractfromdict
 
 
 '''KedouVideoClient'''
@@ -29,6 +29,19 @@ class KedouVideoClient(BaseVideoClient):
         self.default_download_headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36'}
         self.default_headers = self.default_parse_headers
         self._initsession()
+    '''_fetchauthkeys'''
+    def _fetchauthkeys(self, headers: dict, request_overrides: dict = None) -> dict:
+        request_overrides = request_overrides or {}
+        (keys_resp := self.get('https://www.kedou.life/api/auth/keys', headers=headers, **request_overrides)).raise_for_status()
+        return resp2json(resp=keys_resp)["data"]
+    '''_encryptpostdata'''
+    def _encryptpostdata(self, json_string: str, keys_data: dict) -> str:
+        rsa_public_key = RSA.import_key(base64.b64decode(keys_data["k1"])); k2_bytes = base64.b64decode(keys_data["k2"])
+        aes_key_bytes = pow(int.from_bytes(k2_bytes, "big"), rsa_public_key.e, rsa_public_key.n).to_bytes(rsa_public_key.size_in_bytes(), "big")
+        aes_key_bytes = aes_key_bytes[aes_key_bytes.find(b"\x00", 2) + 1:]; iv_bytes = b"kedou@8989!63233"; data_bytes = json_string.encode("utf-8")
+        aes_cipher = AES.new(aes_key_bytes, AES.MODE_CBC, iv_bytes); aes_encrypted = base64.b64encode(aes_cipher.encrypt(pad(data_bytes, AES.block_size))).decode("utf-8")
+        rsa_cipher = PKCS1_v1_5.new(rsa_public_key); rsa_encrypted = base64.b64encode(rsa_cipher.encrypt(aes_encrypted.encode("utf-8"))).decode("utf-8")
+        return rsa_encrypted
     '''parsefromurl'''
     @useparseheaderscookies
     def parsefromurl(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
@@ -42,14 +55,13 @@ class KedouVideoClient(BaseVideoClient):
             # --encrypt post data
             json_string = json.dumps({"url": url}, separators=(",", ":"), ensure_ascii=False)
             headers = copy.deepcopy(self.default_headers); RandomIPGenerator().addrandomipv4toheaders(headers)
-            (keys_resp := self.get('https://www.kedou.life/api/auth/keys', headers=headers, **request_overrides)).raise_for_status()
-            keys_data = resp2json(resp=keys_resp)["data"]; rsa_public_key = RSA.import_key(base64.b64decode(keys_data["k1"])); k2_bytes = base64.b64decode(keys_data["k2"])
-            aes_key_bytes = pow(int.from_bytes(k2_bytes, "big"), rsa_public_key.e, rsa_public_key.n).to_bytes(rsa_public_key.size_in_bytes(), "big")
-            aes_key_bytes = aes_key_bytes[aes_key_bytes.find(b"\x00", 2) + 1:]; iv_bytes = b"kedou@8989!63233"; data_bytes = json_string.encode("utf-8")
-            aes_cipher = AES.new(aes_key_bytes, AES.MODE_CBC, iv_bytes); aes_encrypted = base64.b64encode(aes_cipher.encrypt(pad(data_bytes, AES.block_size))).decode("utf-8")
-            rsa_cipher = PKCS1_v1_5.new(rsa_public_key); rsa_encrypted = base64.b64encode(rsa_cipher.encrypt(aes_encrypted.encode("utf-8"))).decode("utf-8")
-            # --post request
-            (resp := self.post('https://www.kedou.life/api/video/extract/v2', data=rsa_encrypted, headers=headers, **request_overrides)).raise_for_status()
+            # --post request, auth keys are reused from the credential cache and refetched once if the server rejects them
+            for _ in range(2):
+                keys_data = self.credential_cache.getorfetch('auth_keys', lambda: self._fetchauthkeys(headers, request_overrides), ttl=1800)
+                resp = self.post('https://www.kedou.life/api/video/extract/v2', data=self._encryptpostdata(json_string, keys_data), headers=headers, **request_overrides)
+                if not CredentialCache.shouldinvalidate(resp): break
+                self.credential_cache.invalidate('auth_keys')
+            resp.raise_for_status()
             video_info.update(dict(raw_data=(raw_data := resp2json(resp=resp)))); data_items = raw_data["data"]["videoItemVoList"]
             # --sort by quality
             video_items: list[dict] = [x for x in data_items if isinstance(x, dict) and x.get("baseUrl") and str(x["baseUrl"]).startswith('http') and ((x.get('fileType') in {"video"}) or (x.get('quality') not in {'音频', '封面'}))]
@@ -9,12 +9,10 @@ WeChat Official Account (微信公众号):
 import os
 import re
 import copy
-import time
 import base64
-import random
 from ..sources import BaseVideoClient
 from ..utils.domains import platformfromurl
-from ..utils import RandomIPGenerator, VideoInfo, FileTypeSniffer, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle
+from ..utils import RandomIPGenerator, VideoInfo, FileTypeSniffer, AdaptivePoller, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle, floatornone
 
 
 '''VeedMateVideoClient'''
@@ -27,6 +25,7 @@ class VeedMateVideoClient(BaseVideoClient):
             "accept": "*/*", "origin": "https://veedmate.com", "referer": "https://veedmate.com/",
         }
         self.default_download_headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36'}
+        self.job_status_poller = AdaptivePoller(initial_interval=0.5, max_interval=5.0, backoff_factor=1.5, deadline=180.0)
     '''parsefromurl'''
     @useparseheaderscookies
     def parsefromurl(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
@@ -46,11 +45,13 @@ class VeedMateVideoClient(BaseVideoClient):
             (resp := self.post(ajax_url, data=post_data, headers=headers, **request_overrides)).raise_for_status()
             video_info.update(dict(raw_data=(raw_data := resp2json(resp=resp)))); status_params = {'action': 'vd_status', 'job_id': raw_data['job_id']}
             if raw_data.get('_server'): status_params.update(dict(server=raw_data['_server']))
-            while True:
-                (resp := self.get(ajax_url, params=status_params, headers=headers, **request_overrides)).raise_for_status(); raw_data['progress_resp'] = resp2json(resp=resp)
-                if raw_data['progress_resp'].get('status') == 'completed' and raw_data['progress_resp'].get('download_url'): break
-                if raw_data['progress_resp'].get('status') == 'failed' or raw_data['progress_resp'].get('error'): raise RuntimeError(raw_data['progress_resp'])
-                time.sleep(0.5 + random.random())
+            def check_status_func():
+                (resp := self.get(ajax_url, params=status_params, headers=headers, **request_overrides)).raise_for_status()
+                return resp2json(resp=resp)
+            raw_data['progress_resp'] = self.job_status_poller.poll(
+                check_status_func, done_func=lambda d: d.get('status') == 'completed' and bool(d.get('download_url')), failed_func=lambda d: d if (d.get('status') == 'failed' or d.get('error')) else None,
+                progress_func=lambda d: floatornone(d.get('progress'), scale=100),
+            )
             # --extract
             video_title = legalizestring((progress_resp := raw_data['progress_resp']).get('title', null_backup_title) or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
             video_info.update(dict(download_url=(download_url := progress_resp['download_url'])))
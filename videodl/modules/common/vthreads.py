@@ -11,9 +11,10 @@ import copy
 import time
 from ..sources import BaseVideoClient
 from ..utils import RandomIPGenerator
+from concurrent.futures import Future
 from urllib.parse import urljoin, quote
 from ..utils.domains import platformfromurl
-from ..utils import VideoInfo, FileTypeSniffer, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle, safeextractfromdict
+from ..utils import VideoInfo, FileTypeSniffer, AdaptivePoller, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle, safeextractfromdict, floatornone
 
 
 '''VThreadsVideoClient'''
@@ -24,21 +25,26 @@ class VThreadsVideoClient(BaseVideoClient):
         self.default_parse_headers = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/149.0.0.0 Safari/537.36", "referer": "https://vthreads.top/zh/"}
         self.default_download_headers = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/149.0.0.0 Safari/537.36", "referer": "https://vthreads.top/zh/"}
         self.default_headers = self.default_parse_headers
+        self.merge_task_poller = AdaptivePoller(initial_interval=1.0, max_interval=6.0, backoff_factor=1.5, deadline=90.0)
         self._initsession()
     '''_getdownloadurlfrommediainfo'''
-    def _getdownloadurlfrommediainfo(self, media_info: dict, video_title: str, visitor_id: str, headers: dict, request_overrides: dict = None) -> str:
+    def _getdownloadurlfrommediainfo(self, media_info: dict, video_title: str, visitor_id: str, headers: dict, request_overrides: dict = None) -> str | Future:
         request_overrides, download_url = request_overrides or {}, urljoin('https://vthreads.top/', media_info['url'])
         if media_info.get('format') in {'merge', 'audio'} or '.m3u8' in download_url.lower() or '/api/download_merge' in download_url:
             task_url = download_url if 'title=' in download_url else f'{download_url}{"&" if "?" in download_url else "?"}title={quote(video_title, safe="")}&vid={visitor_id}'
-            (resp := self.get(task_url, headers=headers, **request_overrides)).raise_for_status()
-            max_check_status_retry_times, time_interval_for_check_status, task_id = 20, 2, resp2json(resp=resp)['task_id']
-            for _ in range(max_check_status_retry_times):
+            (resp := self.get(task_url, headers=headers, **request_overrides)).raise_for_status(); task_id = resp2json(resp=resp)['task_id']
+            def check_status_func():
                 (resp := self.get(f'https://vthreads.top/api/check_status/{task_id}', headers=headers, **request_overrides)).raise_for_status()
-                if (status_data := resp2json(resp=resp)).get('download_url') and status_data.get('status') in {'SUCCESS'}: break
-                if status_data.get('status') in {'FAILED'}: raise RuntimeError(status_data.get('error') or 'merge task failed')
-                time.sleep(time_interval_for_check_status)
-            return urljoin('https://vthreads.top/', resp2json(resp=resp)['download_url'])
+                return resp2json(resp=resp)
+            return self.merge_task_poller.submit(
+                check_status_func, done_func=lambda d: bool(d.get('download_url')) and d.get('status') in {'SUCCESS'}, failed_func=lambda d: (d.get('error') or 'merge task failed') if d.get('status') in {'FAILED'} else None,
+                progress_func=lambda d: floatornone(d.get('progress'), scale=100),
+            )
         return download_url
+    '''_resolvedownloadurl'''
+    def _resolvedownloadurl(self, download_url: str | Future) -> str:
+        if not isinstance(download_url, Future): return download_url
+        return urljoin('https://vthreads.top/', download_url.result()['download_url'])
     '''parsefromurl'''
     @useparseheaderscookies
     def parsefromurl(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
@@ -62,8 +68,10 @@ class VThreadsVideoClient(BaseVideoClient):
             video_medias: list[dict] = [item for item in medias if item not in audio_medias and item not in merge_medias]
             video_media = video_medias[0] if video_medias and audio_medias else merge_medias[0] if merge_medias else video_medias[0]
             audio_media = audio_medias[0] if video_medias and audio_medias else None
-            video_info.update(dict(download_url=(download_url := self._getdownloadurlfrommediainfo(video_media, video_title, visitor_id, headers, request_overrides))))
-            if audio_media: video_info.update(dict(audio_download_url=(audio_download_url := self._getdownloadurlfrommediainfo(audio_media, video_title, visitor_id, headers, request_overrides))))
+            download_url = self._getdownloadurlfrommediainfo(video_media, video_title, visitor_id, headers, request_overrides)
+            audio_download_url = self._getdownloadurlfrommediainfo(audio_media, video_title, visitor_id, headers, request_overrides) if audio_media else None
+            video_info.update(dict(download_url=(download_url := self._resolvedownloadurl(download_url))))
+            if audio_media: video_info.update(dict(audio_download_url=(audio_download_url := self._resolvedownloadurl(audio_download_url))))
             # --other infos
             guess_video_ext_result = FileTypeSniffer.getfileextensionfromurl(url=download_url, headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
             guess_video_ext_result['ext'] = 'avi' if video_media.get('format') in {'merge'} else guess_video_ext_result['ext']
@@ -8,6 +8,7 @@ WeChat Official Account (微信公众号):
 '''
 import os
 import copy
+import time
 import base64
 import hashlib
 import json_repair
@@ -16,7 +17,7 @@ from Cryptodome.Cipher import AES
 from ..sources import BaseVideoClient
 from Cryptodome.Util.Padding import unpad
 from ..utils.domains import platformfromurl
-from ..utils import VideoInfo, FileTypeSniffer, RandomIPGenerator, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle
+from ..utils import VideoInfo, FileTypeSniffer, RandomIPGenerator, CredentialCache, useparseheaderscookies, legalizestring, resp2json, yieldtimerelatedtitle
 
 
 '''XMFlvVideoClient'''
@@ -35,6 +36,15 @@ class XMFlvVideoClient(BaseVideoClient):
         }
         self.default_headers = self.default_parse_headers
         self._initsession()
+    '''_fetchservertimeandarea'''
+    def _fetchservertimeandarea(self, headers: dict, request_overrides: dict = None) -> dict:
+        request_overrides = request_overrides or {}
+        (pre_resp := self.get(f"https://data.video.iqiyi.com/v.f4v?src=iqiyi.com", headers=headers, **request_overrides)).raise_for_status()
+        raw_data = resp2json(resp=pre_resp); server_time, server_area = str(raw_data.get("time")), raw_data.get("t")
+        if not server_time or not server_area or not server_time.isdigit(): raise RuntimeError("Failed to retrieve time or area from https://data.video.iqiyi.com/v.f4v?src=iqiyi.com")
+        # keep the clock offset rather than the timestamp itself so the cached entry yields a fresh server time on every parse
+        scale = 1000 if len(server_time) >= 13 else 1
+        return {"time_offset": int(server_time) - int(time.time() * scale), "time_scale": scale, "area": server_area, "raw": raw_data}
     '''_generatekey'''
     def _generatekey(self, time_str: str, url: str) -> str:
         return hashlib.md5((str(time_str) + url).encode('utf-8')).hexdigest()
@@ -63,14 +73,17 @@ class XMFlvVideoClient(BaseVideoClient):
         try:
             # --fetch time and area
             headers = copy.deepcopy(self.default_headers); RandomIPGenerator().addrandomipv4toheaders(headers); headers["accept"] = "*/*"; headers["origin"] = "https://jx.xmflv.com"
-            (pre_resp := self.get(f"https://data.video.iqiyi.com/v.f4v?src=iqiyi.com", headers=headers, **request_overrides)).raise_for_status()
-            raw_data = resp2json(resp=pre_resp); server_time, server_area = str(raw_data.get("time")), raw_data.get("t")
-            if not server_time or not server_area: raise RuntimeError("Failed to retrieve time or area from https://data.video.iqiyi.com/v.f4v?src=iqiyi.com")
-            # --generate corresponding parameters
-            key = self._generatekey(server_time, urllib.parse.quote(url, safe="")); sign = self._generatesign(key)
-            # --post to parse API
-            data_json = {"tm": server_time, "url": urllib.parse.quote(url, safe=""), "key": key, "sign": sign}
-            (resp := self.post('https://cache.0567890.xyz:4433/Api', data=data_json, headers=headers, **request_overrides)).raise_for_status(); raw_data['API_resp'] = resp2json(resp=resp)
+            for _ in range(2):
+                server_clock = self.credential_cache.getorfetch('server_clock', lambda: self._fetchservertimeandarea(headers, request_overrides), ttl=1800)
+                server_time = str(int(time.time() * server_clock['time_scale']) + server_clock['time_offset']); raw_data = copy.deepcopy(server_clock['raw']); raw_data['time'] = server_time
+                # --generate corresponding parameters
+                key = self._generatekey(server_time, urllib.parse.quote(url, safe="")); sign = self._generatesign(key)
+                # --post to parse API
+                data_json = {"tm": server_time, "url": urllib.parse.quote(url, safe=""), "key": key, "sign": sign}
+                resp = self.post('https://cache.0567890.xyz:4433/Api', data=data_json, headers=headers, **request_overrides)
+                if not CredentialCache.shouldinvalidate(resp): break
+                self.credential_cache.invalidate('server_clock')
+            resp.raise_for_status(); raw_data['API_resp'] = resp2json(resp=resp)
             # --decrypt response
             decrypted_data = self._decryptresp(raw_data['API_resp']['data'], raw_data['API_resp']['key'], raw_data['API_resp']['iv']); raw_data['API_decrypt_resp'] = decrypted_data
             # --video title
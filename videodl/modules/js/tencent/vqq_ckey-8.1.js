@@ -512,15 +512,19 @@ function createGUID(a) {
 /////////////////////////
 
 async function processRequest(recordLine) {
-    var req = recordLine.trim().split(' ');  // Input Record Format: < platform appVer vid vURL referrer >
+    var req = recordLine.trim().split(' ');  // Input Record Format: < platform appVer vid vURL referrer >, prefixed by < requestId > in resident mode
+    var requestId = resident ? req.shift() : null;
     setDocument(req[3], req[4]);
 
-    await delay((Math.floor(Math.random() * 2) + 1) * 1000);  // sleep for 1 or 2s
+    if (!resident) await delay((Math.floor(Math.random() * 2) + 1) * 1000);  // sleep for 1 or 2s, a resident worker answers right away
     var tm = Math.floor(Date.now() / 1000).toString();
-    var cKey = getCkey(req[2], tm, req[1], guid, req[0]);
+    // a resident worker lives across many lookups, so every request gets its own guid and flowid like a fresh process would
+    var reqGuid = resident ? createGUID(16) : guid, reqFlowid = resident ? createGUID() : flowid;
+    var cKey = getCkey(req[2], tm, req[1], reqGuid, req[0]);
 
-    var resp = [cKey, tm, guid, flowid];
-    process.stdout.write(resp.join(' '));  // Output Record Format: < cKey tm guid flowid >
+    var resp = [cKey, tm, reqGuid, reqFlowid];
+    if (resident) resp.unshift(requestId);
+    process.stdout.write(resp.join(' '));  // Output Record Format: < cKey tm guid flowid >, prefixed by < requestId > in resident mode
     process.stdout.write('\n');
 }
 
@@ -532,18 +536,22 @@ async function delay(millis) {
     });
 }
 
+var resident = process.argv.includes('--resident');
 var guid = createGUID(16);
 var flowid = createGUID();
 
 process.stdin.setEncoding('utf8');
 process.stdout.setEncoding('utf8');
 
+var pending = '';
+
 process.stdin.on('readable', () => {
-    // read one record line fitting in the pipe buffer
-    var line, chunk, chunks=[];
+    // read every complete record line, batched requests put several lines in one chunk
+    var lines, chunk;
     while ((chunk = process.stdin.read()) !== null) {
-        chunks.push(chunk);
+        pending += chunk;
     }
-    line = chunks.join('').trim();
-    if (line) processRequest(line);
+    lines = pending.split('\n');
+    pending = lines.pop();
+    lines.forEach((line) => { if (line.trim()) processRequest(line); });
 });
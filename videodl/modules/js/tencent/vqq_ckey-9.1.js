@@ -392,16 +392,19 @@ function createGUID(a) {
 /////////////////////////
 
 async function processRequest(recordLine) {
-    var req = recordLine.trim().split(' ');  // Input Record Format: < platform appVer vid vURL referrer >
+    var req = recordLine.trim().split(' ');  // Input Record Format: < platform appVer vid vURL referrer >, prefixed by < requestId > in resident mode
+    var requestId = resident ? req.shift() : null;
     setDocument(req[3], req[4]);
-    var flowid = flowGuid + "_" + req[0];
+    // a resident worker lives across many lookups, so every request gets its own guid and flowid like a fresh process would
+    var reqGuid = resident ? createGUID() : guid, flowid = (resident ? createGUID() : flowGuid) + "_" + req[0];
 
-    await delay((Math.floor(Math.random() * 2) + 1) * 1000);  // sleep for 1 or 2s
+    if (!resident) await delay((Math.floor(Math.random() * 2) + 1) * 1000);  // sleep for 1 or 2s, a resident worker answers right away
     var tm = Math.floor(Date.now() / 1000);
-    var cKey = getCkey(req[0], req[1], req[2], "", guid, tm);
+    var cKey = getCkey(req[0], req[1], req[2], "", reqGuid, tm);
 
-    var resp = [cKey, tm, guid, flowid];
-    process.stdout.write(resp.join(' '));  // Output Record Format: < cKey tm guid flowid >
+    var resp = [cKey, tm, reqGuid, flowid];
+    if (resident) resp.unshift(requestId);
+    process.stdout.write(resp.join(' '));  // Output Record Format: < cKey tm guid flowid >, prefixed by < requestId > in resident mode
     process.stdout.write('\n');
 }
 
@@ -413,18 +416,22 @@ async function delay(millis) {
     });
 }
 
+var resident = process.argv.includes('--resident');
 var guid = createGUID();
 var flowGuid = createGUID();  // + "_" + platform
 
 process.stdin.setEncoding('utf8');
 process.stdout.setEncoding('utf8');
 
+var pending = '';
+
 process.stdin.on('readable', () => {
-    // read one record line fitting in the pipe buffer
-    var line, chunk, chunks=[];
+    // read every complete record line, batched requests put several lines in one chunk
+    var lines, chunk;
     while ((chunk = process.stdin.read()) !== null) {
-        chunks.push(chunk);
+        pending += chunk;
     }
-    line = chunks.join('').trim();
-    if (line) processRequest(line);
+    lines = pending.split('\n');
+    pending = lines.pop();
+    lines.forEach((line) => { if (line.trim()) processRequest(line); });
 });
@@ -9,10 +9,12 @@ WeChat Official Account (微信公众号):
 import re
 import json
 import math
+import hashlib
 import datetime
 import calendar
 import operator
 import itertools
+import threading
 import contextlib
 import email.utils
 import collections
@@ -356,15 +358,56 @@ _NAME_RE = r'[a-zA-Z_$][\w$]*'
 _MATCHING_PARENS = dict(zip(*zip('()', '{}', '[]')))
 _QUOTES = '\'"/'
 _NESTED_BRACKETS = r'[^[\]]+(?:\[[^[\]]+(?:\[[^\]]+\])?\])?'
+_ASSIGN_OPERATORS_RE = "|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))
+_STATEMENT_PREFIX_RE = re.compile(r'(?P<var>(?:var|const|let)\s)|return(?:\s+|(?=["\'])|$)|(?P<throw>throw\s+)')
+_BLOCK_RE = re.compile(r'''(?x)
+    (?P<try>try)\s*\{|
+    (?P<if>if)\s*\(|
+    (?P<switch>switch)\s*\(|
+    (?P<for>for)\s*\(
+    ''')
+_ASSIGN_RE = re.compile(fr'''(?x)
+    (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
+    (?P<op>{_ASSIGN_OPERATORS_RE})?
+    =(?!=)(?P<expr>.*)$
+    ''')
+_INCREMENT_RE = re.compile(rf'''(?x)
+    (?P<pre_sign>\+\+|--)(?P<var1>{_NAME_RE})|
+    (?P<var2>{_NAME_RE})(?P<post_sign>\+\+|--)''')
+_EXPRESSION_RE = re.compile(fr'''(?x)
+    (?P<assign>
+        (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
+        (?P<op>{_ASSIGN_OPERATORS_RE})?
+        =(?!=)(?P<expr>.*)$
+    )|(?P<return>
+        (?!if|return|true|false|null|undefined|NaN)(?P<name>{_NAME_RE})$
+    )|(?P<attribute>
+        (?P<var>{_NAME_RE})(?:
+            (?P<nullish>\?)?\.(?P<member>[^(]+)|
+            \[(?P<member2>{_NESTED_BRACKETS})\]
+        )\s*
+    )|(?P<indexing>
+        (?P<in>{_NAME_RE})\[(?P<idx>.+)\]$
+    )|(?P<function>
+        (?P<fname>{_NAME_RE})\((?P<args>.*)\)$
+    )''')
 
 
 '''JSInterpreter'''
 class JSInterpreter:
     __named_object_counter = 0
     _RE_FLAGS = {'d': 1024, 'g': 2048, 'i': re.I, 'm': re.M, 's': re.S, 'u': re.U, 'y': 4096}
+    MAX_CACHED_PLAYERS = 4
+    MAX_PARSE_CACHE_ENTRIES = 65536
+    _interpreters: "collections.OrderedDict[str, JSInterpreter]" = collections.OrderedDict()
+    _interpreters_lock = threading.Lock()
+    _code_keys: "collections.OrderedDict[int, tuple[str, str]]" = collections.OrderedDict()
     def __init__(self, code, objects=None):
         self.code, self._functions = code, {}
         self._objects = {} if objects is None else objects
+        self._call_lock, self._compiled_functions = threading.RLock(), {}
+        # tokenised statements live on the interpreter, so they are freed together with the player it was built for
+        self._separate_cache, self._split_operator_cache = {}, {}
     '''Exception'''
     class Exception(Exception):
         def __init__(self, msg, expr=None, *args, **kwargs):
@@ -389,8 +432,15 @@ class JSInterpreter:
             flags |= cls._RE_FLAGS[ch]
         return flags, expr[idx + 1:]
     '''_separate'''
+    def _separate(self, expr, delim=',', max_split=None):
+        # the same statements are split again on every call and loop iteration, so memoise the pure tokenisation
+        if (separated := self._separate_cache.get((expr, delim, max_split))) is None:
+            if len(self._separate_cache) >= JSInterpreter.MAX_PARSE_CACHE_ENTRIES: self._separate_cache.clear()
+            separated = self._separate_cache[(expr, delim, max_split)] = tuple(JSInterpreter._separateuncached(expr, delim, max_split))
+        return separated
+    '''_separateuncached'''
     @staticmethod
-    def _separate(expr, delim=',', max_split=None):
+    def _separateuncached(expr, delim=',', max_split=None):
         OP_CHARS = '+-*/%&|^=<>!,;{}:['
         if not expr: return
         counters = {k: 0 for k in _MATCHING_PARENS.values()}
@@ -421,13 +471,12 @@ class JSInterpreter:
             if max_split and splits >= max_split: break
         yield expr[start:]
     '''_separateatparen'''
-    @classmethod
-    def _separateatparen(cls, expr, delim=None):
+    def _separateatparen(self, expr, delim=None):
         if delim is None:
             delim = expr and _MATCHING_PARENS[expr[0]]
-        separated = list(cls._separate(expr, delim, 1))
+        separated = list(self._separate(expr, delim, 1))
         if len(separated) < 2:
-            raise cls.Exception(f'No terminating paren {delim}', expr)
+            raise self.Exception(f'No terminating paren {delim}', expr)
         return separated[0][1:].strip(), separated[1].strip()
     '''_operator'''
     def _operator(self, op, left_val, right_expr, expr, local_vars, allow_recursion):
@@ -455,6 +504,18 @@ class JSInterpreter:
         except TypeError: return self._namedobject(namespace, obj)
     '''handleoperators'''
     def handleoperators(self, expr, local_vars, allow_recursion):
+        if (split := self._splitoperator(expr)) is None: return
+        op, left_expr, right_expr = split
+        left_val = self.interpretexpression(left_expr, local_vars, allow_recursion)
+        return self._operator(op, left_val, right_expr, expr, local_vars, allow_recursion), True
+    '''_splitoperator'''
+    def _splitoperator(self, expr):
+        if expr in self._split_operator_cache: return self._split_operator_cache[expr]
+        if len(self._split_operator_cache) >= JSInterpreter.MAX_PARSE_CACHE_ENTRIES: self._split_operator_cache.clear()
+        split = self._split_operator_cache[expr] = self._splitoperatoruncached(expr)
+        return split
+    '''_splitoperatoruncached'''
+    def _splitoperatoruncached(self, expr):
         for op in _ALL_OPERATORS:
             separated = list(self._separate(expr, op))
             right_expr = separated.pop()
@@ -464,8 +525,7 @@ class JSInterpreter:
                 right_expr = f'{op}{right_expr}'
                 if op != '-': right_expr = f'{separated.pop()}{op}{right_expr}'
             if not separated: continue
-            left_val = self.interpretexpression(op.join(separated), local_vars, allow_recursion)
-            return self._operator(op, left_val, right_expr, expr, local_vars, allow_recursion), True
+            return op, op.join(separated), right_expr
     '''interpretstatement'''
     def interpretstatement(self, stmt, local_vars, allow_recursion=100):
         if allow_recursion < 0: raise self.Exception('Recursion limit reached')
@@ -476,7 +536,7 @@ class JSInterpreter:
         for sub_stmt in sub_statements:
             ret, should_return = self.interpretstatement(sub_stmt, local_vars, allow_recursion)
             if should_return: return ret, should_return
-        m = re.match(r'(?P<var>(?:var|const|let)\s)|return(?:\s+|(?=["\'])|$)|(?P<throw>throw\s+)', stmt)
+        m = _STATEMENT_PREFIX_RE.match(stmt)
         if m:
             expr = stmt[len(m.group(0)):].strip()
             if m.group('throw'): raise JSThrow(self.interpretexpression(expr, local_vars, allow_recursion))
@@ -532,12 +592,7 @@ class JSInterpreter:
             inner, outer = self._separateatparen(expr)
             name = self._namedobject(local_vars, [self.interpretexpression(item, local_vars, allow_recursion) for item in self._separate(inner)])
             expr = name + outer
-        m = re.match(r'''(?x)
-                (?P<try>try)\s*\{|
-                (?P<if>if)\s*\(|
-                (?P<switch>switch)\s*\(|
-                (?P<for>for)\s*\(
-                ''', expr)
+        m = _BLOCK_RE.match(expr)
         md = m.groupdict() if m else {}
         if md.get('if'):
             cndn, expr = self._separateatparen(expr[m.end() - 1:])
@@ -623,12 +678,7 @@ class JSInterpreter:
                 ret, should_abort = self.interpretstatement(sub_expr, local_vars, allow_recursion)
                 if should_abort: return ret, True
             return ret, False
-        p =fr'''(?x)
-                (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
-                (?P<op>{"|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))})?
-                =(?!=)(?P<expr>.*)$
-            '''
-        m = re.match(p, expr)
+        m = _ASSIGN_RE.match(expr)
         if m:
             left_val = local_vars.get(m.group('out'))
             if not m.group('index'):
@@ -641,9 +691,7 @@ class JSInterpreter:
             idx = int(idx)
             left_val[idx] = self._operator(m.group('op'), self._index(left_val, idx), m.group('expr'), expr, local_vars, allow_recursion)
             return left_val[idx], should_return
-        for m in re.finditer(rf'''(?x)
-                (?P<pre_sign>\+\+|--)(?P<var1>{_NAME_RE})|
-                (?P<var2>{_NAME_RE})(?P<post_sign>\+\+|--)''', expr):
+        for m in _INCREMENT_RE.finditer(expr):
             var = m.group('var1') or m.group('var2')
             start, end = m.span()
             sign = m.group('pre_sign') or m.group('post_sign')
@@ -652,23 +700,7 @@ class JSInterpreter:
             if m.group('pre_sign'): ret = local_vars[var]
             expr = expr[:start] + self._dump(ret, local_vars) + expr[end:]
         if not expr: return None, should_return
-        m = re.match(fr'''(?x)
-            (?P<assign>
-                (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
-                (?P<op>{"|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))})?
-                =(?!=)(?P<expr>.*)$
-            )|(?P<return>
-                (?!if|return|true|false|null|undefined|NaN)(?P<name>{_NAME_RE})$
-            )|(?P<attribute>
-                (?P<var>{_NAME_RE})(?:
-                    (?P<nullish>\?)?\.(?P<member>[^(]+)|
-                    \[(?P<member2>{_NESTED_BRACKETS})\]
-                )\s*
-            )|(?P<indexing>
-                (?P<in>{_NAME_RE})\[(?P<idx>.+)\]$
-            )|(?P<function>
-                (?P<fname>{_NAME_RE})\((?P<args>.*)\)$
-            )''', expr)
+        m = _EXPRESSION_RE.match(expr)
         if m and m.group('assign'):
             left_val = local_vars.get(m.group('out'))
             if not m.group('index'):
@@ -887,7 +919,36 @@ class JSInterpreter:
         return self.buildfunction(argnames, code, local_vars, *global_stack)
     '''callfunction'''
     def callfunction(self, funcname, *args):
-        return self.extractfunction(funcname)(args)
+        return self.cachedfunction(self.code, funcname)(args)
+    '''_codekey'''
+    @classmethod
+    def _codekey(cls, code):
+        # hashing a multi MB player costs milliseconds, so the digest is remembered per code object (the entry pins it, keeping its id valid)
+        with cls._interpreters_lock:
+            if (entry := cls._code_keys.get(id(code))) is not None and entry[0] is code: return entry[1]
+        key = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        with cls._interpreters_lock:
+            cls._code_keys[id(code)] = (code, key); cls._code_keys.move_to_end(id(code))
+            while len(cls._code_keys) > cls.MAX_CACHED_PLAYERS * 2: cls._code_keys.popitem(last=False)
+        return key
+    '''cachedfunction'''
+    @classmethod
+    def cachedfunction(cls, code, funcname):
+        # extracted functions are reused across Cipher instances, keyed by the hash of the player source
+        key = cls._codekey(code)
+        with cls._interpreters_lock:
+            if (jsi := cls._interpreters.get(key)) is None:
+                jsi = cls._interpreters[key] = cls(code)
+                while len(cls._interpreters) > cls.MAX_CACHED_PLAYERS: cls._interpreters.popitem(last=False)
+            cls._interpreters.move_to_end(key)
+        with jsi._call_lock:
+            if funcname not in jsi._compiled_functions: jsi._compiled_functions[funcname] = (jsi.extractfunction(funcname), jsi.__named_object_counter)
+            func, named_object_base = jsi._compiled_functions[funcname]
+        # the built functions keep their arguments in a shared scope, calls into one player are therefore serialised. Temporary object
+        # names restart after the ones taken by nested functions, so repeated calls produce identical statements and hit the parse caches
+        def lockedfunc(*args, **kwargs):
+            with jsi._call_lock: jsi.__named_object_counter = named_object_base; return func(*args, **kwargs)
+        return FunctionWithRepr(lockedfunc, repr(func))
     '''buildfunction'''
     def buildfunction(self, argnames, code, *global_stack):
         global_stack = list(global_stack) or [{}]
@@ -9,26 +9,26 @@ WeChat Official Account (微信公众号):
 import os
 import re
 import copy
-import m3u8
 import random
 import base64
 import pickle
+import time
 import shutil
 import requests
 import subprocess
 from pathlib import Path
+from itertools import chain
 from rich.text import Text
-from urllib.parse import urljoin
+from collections import deque
 from fake_useragent import UserAgent
 from platformdirs import user_log_dir
-from m3u8.model import InitializationSection
 from ..utils.youtubeutils import Stream as YouTubeStreamObj
 from pathvalidate import sanitize_filepath, sanitize_filename
 from ..utils.domains import obtainhostname, hostmatchessuffix
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Callable, Mapping, Optional, TYPE_CHECKING
 from rich.progress import Progress, TextColumn, BarColumn, DownloadColumn, TransferSpeedColumn, TimeRemainingColumn, TimeElapsedColumn, ProgressColumn, Task
-from ..utils import touchdir, useparseheaderscookies, usedownloadheaderscookies, usesearchheaderscookies, cookies2dict, generateuniquetmppath, shortenpathsinvideoinfos, optionalimport, optionalimportfrom, cookies2string, safeunlinkpathobj, LoggerHandle, VideoInfo, FileTypeSniffer
+from ..utils import touchdir, useparseheaderscookies, usedownloadheaderscookies, usesearchheaderscookies, cookies2dict, generateuniquetmppath, shortenpathsinvideoinfos, optionalimport, optionalimportfrom, cookies2string, safeunlinkpathobj, LoggerHandle, VideoInfo, FileTypeSniffer, CredentialCache, M3U8StreamParser, VariantSelector
 from ..utils.cmd import MergeCCTVTsFilesFFmpegCommand, DownloadFromLocalTxtFileFFmpegCommand, DownloadWithFFmpegCommand, DownloadWithNM3U8DLRECommand, DownloadWithAria2cCommand, MergeVideoAudioAudioTranscodeFFmpegCommand, MergeVideoAudioCopyFFmpegCommand, MergeVideoAudioFullTranscodeFFmpegCommand, RemuxCopyFFmpegCommand
 
 
@@ -52,19 +52,26 @@ class BaseVideoClient():
     LESHI_BASE64_ENCODE_PATTERN = re.compile(r'data:[^;]+;base64,([A-Za-z0-9+/=]+)')
     BILIBILI_REFERENCE_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36', 'Referer': 'https://www.bilibili.com/'}
     WEIBO_REFERENCE_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36', 'Referer': 'https://weibo.com/'}
+    MIRROR_MIN_THROUGHPUT = 512 * 1024
+    MIRROR_THROUGHPUT_WINDOW = 8.0
     def __init__(self, auto_set_proxies: bool = False, random_update_ua: bool = False, enable_parse_curl_cffi: bool = False, enable_search_curl_cffi: bool = False, enable_download_curl_cffi: bool = False,
                  max_retries: int = 5, maintain_session: bool = False, logger_handle: LoggerHandle = None, disable_print: bool = False, work_dir: str = 'videodl_outputs', freeproxy_settings: dict = None, 
-                 default_search_cookies: dict = None, default_download_cookies: dict = None, default_parse_cookies: dict = None):
+                 default_search_cookies: dict = None, default_download_cookies: dict = None, default_parse_cookies: dict = None, mirror_min_throughput: float = None, mirror_throughput_window: float = None,
+                 variant_deadline: float = None, variant_bandwidth_budget: float = None):
         # set up work dir
         touchdir(work_dir)
         # io attributes
         self.work_dir = work_dir
+        self.credential_cache = CredentialCache(cache_dir=os.path.join(work_dir, '.credentials'), namespace=self.source)
         # logging attributes
         self.disable_print = disable_print
         self.logger_handle = logger_handle if logger_handle else LoggerHandle()
         # http requests attributes
         self.max_retries = max(max_retries, 1)
         self.maintain_session = maintain_session
+        self.mirror_min_throughput = self.MIRROR_MIN_THROUGHPUT if mirror_min_throughput is None else float(mirror_min_throughput)
+        self.mirror_throughput_window = self.MIRROR_THROUGHPUT_WINDOW if mirror_throughput_window is None else max(float(mirror_throughput_window), 0.5)
+        self.variant_selector = VariantSelector(deadline=variant_deadline, bandwidth_budget=variant_bandwidth_budget)
         # --proxies
         self.auto_set_proxies = auto_set_proxies
         self.freeproxy_settings = freeproxy_settings or {}
@@ -111,6 +118,13 @@ class BaseVideoClient():
             directory, file_name = os.path.split(file_path); file_name_without_ext, ext = os.path.splitext(file_name)
             unique_file_path = os.path.join(directory, f"{file_name_without_ext} ({same_name_file_idx}){ext}"); same_name_file_idx += 1
         return unique_file_path
+    '''_selectvariant'''
+    def _selectvariant(self, variants: list[dict], video_info: VideoInfo = None, duration: float = None, extra_bandwidth: float = 0.0, is_hls: bool = False, request_overrides: dict = None) -> dict:
+        headers, cookies, request_overrides = self.default_download_headers, self.default_download_cookies, request_overrides or {}
+        resolve_func = (lambda variant: M3U8StreamParser.summarize(variant['uri'], headers=headers, cookies=cookies, request_overrides=request_overrides)) if is_hls else None
+        chosen, decision = self.variant_selector.select(variants, duration=duration, extra_bandwidth=extra_bandwidth, resolve_func=resolve_func, headers=headers, cookies=cookies, request_overrides=request_overrides)
+        if decision and video_info is not None: video_info.update(dict(variant_selection=decision))
+        return chosen
     '''_search'''
     @usesearchheaderscookies
     def _search(self, keyword: str) -> list[VideoInfo]:
@@ -147,12 +161,14 @@ class BaseVideoClient():
         assert isinstance(video_info.download_url, YouTubeStreamObj)
         # start to download
         try:
-            content_length, chunk_size = int(float(video_info.download_url.filesize or 0)), video_info.chunk_size
+            content_length, chunk_size, stream = int(float(video_info.download_url.filesize or 0)), video_info.chunk_size, video_info.download_url
             desc_name = f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15] + '...'}" if len(os.path.basename(video_info.save_path)) > 15 else f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15]}"
             total_bytes, downloaded_bytes = content_length if content_length > 0 else None, 0
             video_task_id = progress.add_task(desc_name, total=total_bytes, kind="download")
+            mirrors = [stream.url] + list(video_info.download_url_mirrors or stream.mirrorurls())
+            chunks = self._iterchunkswithfailover(mirrors, lambda url, offset: stream.iterchunks(chunk_size=chunk_size, url=url, start=offset), state={'total': total_bytes, 'url': None})
             with open(video_info.save_path, "wb") as fp:
-                for chunk in video_info.download_url.iterchunks(chunk_size=chunk_size):
+                for chunk in chunks:
                     if chunk: fp.write(chunk); downloaded_bytes += len(chunk); total_bytes is None and progress.update(video_task_id, total=downloaded_bytes); progress.update(video_task_id, advance=len(chunk))
             downloaded_video_infos.append(video_info)
         except Exception as err:
@@ -171,14 +187,20 @@ class BaseVideoClient():
         shutil.rmtree(ts_work_dir, ignore_errors=True); touchdir(ts_work_dir); video_info.identifier = sanitize_filename(str(video_info.identifier))
         node_script = Path(__file__).resolve().parents[2] / "modules" / "js" / "cctv" / "decrypt.js"
         # start to download
-        loaded_m3u8_url, processed_files_fp = m3u8.load(video_info.download_url), open(os.path.join(ts_work_dir, f'{video_info.identifier}.txt'), 'w')
-        desc_name = f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15] + '...'}" if len(os.path.basename(video_info.save_path)) > 15 else f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15]}"
-        video_task_id = progress.add_task(desc_name, total=len(loaded_m3u8_url.segments), kind="m3u8download")
-        for seg_idx, segment in enumerate(loaded_m3u8_url.segments):
-            cmd = ["node", node_script, segment.absolute_uri, os.path.join(ts_work_dir, f"segment_{seg_idx:08d}.mp4")]
-            try: subprocess.run(cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='ignore'); progress.update(video_task_id, advance=1); processed_files_fp.write(f"file 'segment_{seg_idx:08d}.mp4'\n")
-            except subprocess.CalledProcessError as err: self.logger_handle.error(f'{self.source}._downloadfromcctv >>> {segment.absolute_uri} (Error: {err})', disable_print=self.disable_print); progress.update(video_task_id, advance=1)
-        processed_files_fp.close(); merge_ts_files_cmd = MergeCCTVTsFilesFFmpegCommand().build(video_info=video_info, ts_work_dir=ts_work_dir, mods=video_info.ffmpeg_settings)
+        # segments are handed over while the playlist is still being read, the total grows as the background reader parses it
+        (resp := self.get(video_info.download_url, stream=True, **request_overrides)).raise_for_status(); processed_files_fp = open(os.path.join(ts_work_dir, f'{video_info.identifier}.txt'), 'w')
+        # closing the playlist response on every exit also stops the background reader from draining it
+        try:
+            segments = M3U8StreamParser.iterinbackground((parser := M3U8StreamParser(resp.url or video_info.download_url)).iterbytes(resp.iter_content(chunk_size=65536)))
+            desc_name = f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15] + '...'}" if len(os.path.basename(video_info.save_path)) > 15 else f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15]}"
+            video_task_id = progress.add_task(desc_name, total=None, kind="m3u8download")
+            for seg_idx, segment in enumerate(segments):
+                cmd = ["node", node_script, segment.uri, os.path.join(ts_work_dir, f"segment_{seg_idx:08d}.mp4")]; progress.update(video_task_id, total=max(parser.num_segments, seg_idx + 1))
+                try: subprocess.run(cmd, check=True, capture_output=True, text=True, encoding='utf-8', errors='ignore'); progress.update(video_task_id, advance=1); processed_files_fp.write(f"file 'segment_{seg_idx:08d}.mp4'\n")
+                except subprocess.CalledProcessError as err: self.logger_handle.error(f'{self.source}._downloadfromcctv >>> {segment.uri} (Error: {err})', disable_print=self.disable_print); progress.update(video_task_id, advance=1)
+        finally:
+            resp.close(); processed_files_fp.close()
+        merge_ts_files_cmd = MergeCCTVTsFilesFFmpegCommand().build(video_info=video_info, ts_work_dir=ts_work_dir, mods=video_info.ffmpeg_settings)
         try: subprocess.run(merge_ts_files_cmd, check=True, capture_output=(True if self.disable_print else False), text=True, encoding='utf-8', errors='ignore'); shutil.rmtree(ts_work_dir, ignore_errors=True); downloaded_video_infos.append(video_info)
         except subprocess.CalledProcessError as err: self.logger_handle.error(f'{self.source}._downloadfromcctv >>> {video_info.download_url} (Error: {err})', disable_print=self.disable_print)
         # return
@@ -191,22 +213,31 @@ class BaseVideoClient():
         (video_info := copy.deepcopy(video_info)).save_path = self._ensureuniquefilepath(video_info.save_path)
         request_overrides = dict(request_overrides or {}); touchdir(os.path.dirname(video_info.save_path))
         # start to download
+        resp, tmp_fp_obj = None, None
         try:
-            (resp := self.get((download_url := video_info.download_url), **request_overrides)).raise_for_status()
-            if (loaded_m3u8_obj := m3u8.loads(resp.content.decode("utf-8", errors="ignore"), uri=download_url)).playlists:
-                download_url = (best := max(loaded_m3u8_obj.playlists, key=lambda p: p.stream_info.bandwidth or 0)).absolute_uri or urljoin(download_url, best.uri)
-                (resp := self.get(download_url, **request_overrides)).raise_for_status(); loaded_m3u8_obj = m3u8.loads(resp.content.decode("utf-8", errors="ignore"), uri=download_url)
+            (resp := self.get((download_url := video_info.download_url), stream=True, **request_overrides)).raise_for_status()
+            segments = (parser := M3U8StreamParser(resp.url or download_url)).iterbytes(resp.iter_content(chunk_size=65536))
+            if (first_segment := next(segments, None)) is None and parser.variants:
+                variants = [{'uri': v['uri'], 'bandwidth': int(v['attrs'].get('BANDWIDTH') or 0), 'score': int(v['attrs'].get('BANDWIDTH') or 0)} for v in parser.variants]
+                resp.close(); download_url = self._selectvariant(variants, video_info=video_info, is_hls=True, request_overrides=request_overrides)['uri']
+                (resp := self.get(download_url, stream=True, **request_overrides)).raise_for_status()
+                segments = (parser := M3U8StreamParser(resp.url or download_url)).iterbytes(resp.iter_content(chunk_size=65536)); first_segment = next(segments, None)
+            segments = chain(() if first_segment is None else (first_segment,), M3U8StreamParser.iterinbackground(segments))
             desc_name = f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15] + '...'}" if len(os.path.basename(video_info.save_path)) > 15 else f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15]}"
-            video_task_id, tmp_download_path, seen_init = progress.add_task(desc_name, total=len(loaded_m3u8_obj.segments), kind="m3u8download"), Path(video_info.save_path).with_suffix(".tmp.mp4"), set(); tmp_fp_obj = tmp_download_path.open('wb')
-            for _, segment in enumerate(loaded_m3u8_obj.segments):
-                init_section: InitializationSection = getattr(segment, "init_section", None)
-                if init_section and init_section.uri and (init_url := (init_section.absolute_uri or urljoin(download_url, init_section.uri))) not in seen_init: tmp_fp_obj.write(self.get(init_url, **request_overrides).content); seen_init.add(init_url)
-                tmp_fp_obj.write(self.get(segment.absolute_uri or urljoin(download_url, segment.uri), **request_overrides).content); progress.update(video_task_id, advance=1)
-            tmp_fp_obj.close(); remux_copy_cmd = RemuxCopyFFmpegCommand().build(tmp_download_path, video_info.save_path, mods=video_info.ffmpeg_settings)
+            video_task_id, tmp_download_path, seen_init = progress.add_task(desc_name, total=None, kind="m3u8download"), Path(video_info.save_path).with_suffix(".tmp.mp4"), set(); tmp_fp_obj = tmp_download_path.open('wb')
+            for seg_idx, segment in enumerate(segments):
+                progress.update(video_task_id, total=max(parser.num_segments, seg_idx + 1))
+                if segment.init_section and segment.init_section['uri'] and (init_url := segment.init_section['uri']) not in seen_init: tmp_fp_obj.write(self.get(init_url, **request_overrides).content); seen_init.add(init_url)
+                tmp_fp_obj.write(self.get(segment.uri, **request_overrides).content); progress.update(video_task_id, advance=1)
+            resp.close(); tmp_fp_obj.close(); remux_copy_cmd = RemuxCopyFFmpegCommand().build(tmp_download_path, video_info.save_path, mods=video_info.ffmpeg_settings)
             subprocess.run(remux_copy_cmd, check=True, capture_output=(True if self.disable_print else False), text=True, encoding='utf-8', errors='ignore')
             safeunlinkpathobj(tmp_download_path, max_retries=20, delay=0.2); downloaded_video_infos.append(video_info)
         except Exception as err:
             self.logger_handle.error(f'{self.source}._downloadfromdailymotion >>> {video_info.download_url} (Error: {err})', disable_print=self.disable_print)
+        finally:
+            # closing the playlist response on every exit also stops the background reader from draining it
+            if resp is not None: resp.close()
+            if tmp_fp_obj is not None: tmp_fp_obj.close()
         # return
         return downloaded_video_infos
     '''_downloadfromlocaltxtfilewithffmpeg'''
@@ -304,12 +335,12 @@ class BaseVideoClient():
         request_overrides = dict(request_overrides or {}); touchdir(os.path.dirname(video_info.save_path))
         if video_info.audio_save_path: touchdir(os.path.dirname(video_info.audio_save_path))
         # download video
-        audio_download_url = video_info.pop('audio_download_url'); audio_save_path = video_info.pop('audio_save_path'); audio_ext = video_info.pop('audio_ext'); guess_audio_ext_result = video_info.pop('guess_audio_ext_result')
+        audio_download_url = video_info.pop('audio_download_url'); audio_download_url_mirrors = video_info.pop('audio_download_url_mirrors'); audio_save_path = video_info.pop('audio_save_path'); audio_ext = video_info.pop('audio_ext'); guess_audio_ext_result = video_info.pop('guess_audio_ext_result')
         downloaded_video_infos: list[VideoInfo] = self._download(video_info=video_info, video_info_index=video_info_index, downloaded_video_infos=downloaded_video_infos, request_overrides=request_overrides, progress=progress)
         downloaded_video_info = [dvi for dvi in downloaded_video_infos if (dvi.identifier == video_info.identifier)]
         # download audio
         audio_info = VideoInfo(
-            source=video_info.source, download_url=audio_download_url, save_path=audio_save_path, ext=audio_ext, identifier=f'audio-{video_info.identifier}', guess_video_ext_result=guess_audio_ext_result,
+            source=video_info.source, download_url=audio_download_url, download_url_mirrors=audio_download_url_mirrors, save_path=audio_save_path, ext=audio_ext, identifier=f'audio-{video_info.identifier}', guess_video_ext_result=guess_audio_ext_result,
             default_download_headers=video_info.default_audio_download_headers, default_download_cookies=video_info.default_audio_download_cookies
         )
         downloaded_audio_infos = self._download(video_info=audio_info, video_info_index=video_info_index, downloaded_video_infos=[], request_overrides=request_overrides, progress=progress)
@@ -323,7 +354,7 @@ class BaseVideoClient():
             if MergeVideoAudioCopyFFmpegCommand.hasaudiostream(file_path_for_merge_video_audio) or (not shutil.which('ffprobe')): break
         shutil.move(file_path_for_merge_video_audio, video_save_path); os.path.exists(audio_save_path) and os.remove(audio_save_path)
         # return
-        downloaded_video_info[0].audio_download_url, downloaded_video_info[0].audio_save_path = audio_download_url, audio_save_path
+        downloaded_video_info[0].audio_download_url, downloaded_video_info[0].audio_download_url_mirrors, downloaded_video_info[0].audio_save_path = audio_download_url, audio_download_url_mirrors, audio_save_path
         downloaded_video_info[0].audio_ext, downloaded_video_info[0].guess_audio_ext_result = audio_ext, guess_audio_ext_result
         return downloaded_video_infos
     '''_download'''
@@ -365,20 +396,60 @@ class BaseVideoClient():
         request_overrides['headers'] = copy.deepcopy(video_info.default_download_headers or request_overrides.get('headers') or self.default_headers or {})
         request_overrides['cookies'] = copy.deepcopy(video_info.default_download_cookies or request_overrides.get('cookies') or self.default_cookies or {})
         try:
-            try: (resp := self.get(video_info.download_url, stream=True, **request_overrides)).raise_for_status()
-            except Exception: (resp := self.get(video_info.download_url, stream=True, verify=False, **request_overrides)).raise_for_status()
-            content_length, chunk_size = int(float(resp.headers.get("Content-Length", 0) or 0)), video_info.chunk_size
+            chunks = self._iterchunkswithmirrors([video_info.download_url] + list(video_info.download_url_mirrors or []), request_overrides=request_overrides, chunk_size=video_info.chunk_size, state=(state := {'total': None, 'url': None}))
+            first_chunk = next(chunks, b'')
             desc_name = f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15] + '...'}" if len(os.path.basename(video_info.save_path)) > 15 else f"[{video_info_index+1}] {os.path.basename(video_info.save_path)[:15]}"
-            total_bytes, downloaded_bytes = content_length if content_length > 0 else None, 0
+            total_bytes, downloaded_bytes = state['total'], 0
             video_task_id = progress.add_task(desc_name, total=total_bytes, kind="download")
             with open(video_info.save_path, "wb") as fp:
-                for chunk in resp.iter_content(chunk_size=chunk_size):
+                for chunk in chain((first_chunk,), chunks):
                     if chunk: fp.write(chunk); downloaded_bytes += len(chunk); total_bytes is None and progress.update(video_task_id, total=downloaded_bytes); progress.update(video_task_id, advance=len(chunk))
             downloaded_video_infos.append(video_info)
         except Exception as err:
             self.logger_handle.error(f'{self.source}._download >>> {video_info.download_url} (Error: {err})', disable_print=self.disable_print)
         # return
         return downloaded_video_infos
+    '''_iterchunkswithfailover'''
+    def _iterchunkswithfailover(self, urls: list, open_func: Callable[[Any, int], Any], state: dict):
+        urls, offset = list(dict.fromkeys(url for url in urls if url)), 0
+        for mirror_idx, url in enumerate(urls):
+            is_last_mirror, chunks = (mirror_idx == len(urls) - 1), None
+            try:
+                # throughput is measured against the newest sample that is at least one window old, which also works when a single chunk spans several windows
+                chunks, state['url'], window = open_func(url, offset), url, deque([(time.perf_counter(), offset)])
+                for chunk in chunks:
+                    if not chunk: continue
+                    offset += len(chunk); yield chunk
+                    window.append(((now := time.perf_counter()), offset))
+                    while len(window) > 2 and now - window[1][0] >= self.mirror_throughput_window: window.popleft()
+                    if is_last_mirror or (elapsed := now - window[0][0]) < self.mirror_throughput_window or (throughput := (offset - window[0][1]) / elapsed) >= self.mirror_min_throughput: continue
+                    self.logger_handle.warning(f'{self.source}._iterchunkswithfailover >>> {url} (Warning: throughput {throughput / 1024:.1f}KB/s is below the floor, switching to the next mirror at byte {offset})', disable_print=self.disable_print)
+                    break
+                else:
+                    if state.get('total') and offset < state['total']: raise IOError(f'connection closed at byte {offset} of {state["total"]}')
+                    return
+            except Exception as err:
+                if is_last_mirror: raise
+                self.logger_handle.warning(f'{self.source}._iterchunkswithfailover >>> {url} (Warning: {err}, switching to the next mirror at byte {offset})', disable_print=self.disable_print)
+            finally:
+                chunks is not None and hasattr(chunks, 'close') and chunks.close()
+    '''_iterchunkswithmirrors'''
+    def _iterchunkswithmirrors(self, urls: list[str], request_overrides: dict, chunk_size: int, state: dict):
+        '''_openmirror'''
+        def _openmirror(url: str, offset: int):
+            (headers := dict(request_overrides.get('headers') or {})).update({'Range': f'bytes={offset}-'} if offset > 0 else {})
+            mirror_request_overrides, resp = {**request_overrides, 'headers': headers}, None
+            try:
+                try: (resp := self.get(url, stream=True, **mirror_request_overrides)).raise_for_status()
+                except Exception: (resp := self.get(url, stream=True, verify=False, **mirror_request_overrides)).raise_for_status()
+                # a mirror that ignores the range header would restart from byte zero, so it cannot continue a partial download
+                if offset > 0 and resp.status_code != 206: raise RuntimeError(f'mirror does not support range continuation (status={resp.status_code})')
+                if state.get('total') is None and (m := re.search(r'/(\d+)\s*$', resp.headers.get('Content-Range', ''))): state['total'] = int(m.group(1))
+                elif state.get('total') is None and offset == 0 and (content_length := int(float(resp.headers.get('Content-Length', 0) or 0))) > 0: state['total'] = content_length
+                yield from resp.iter_content(chunk_size=chunk_size)
+            finally:
+                resp is not None and hasattr(resp, 'close') and resp.close()
+        return self._iterchunkswithfailover(urls, _openmirror, state)
     '''download'''
     @usedownloadheaderscookies
     def download(self, video_infos: list[VideoInfo], num_threadings: int = 5, request_overrides: dict = None) -> list[VideoInfo]:
@@ -8,23 +8,52 @@ WeChat Official Account (微信公众号):
 '''
 import os
 import re
-import copy
 from contextlib import suppress
 from .base import BaseVideoClient
 from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
 from ..utils.domains import BILIBILI_SUFFIXES
-from ..utils import legalizestring, resp2json, useparseheaderscookies, yieldtimerelatedtitle, safeextractfromdict, taskprogress, FileTypeSniffer, VideoInfo
+from ..utils import legalizestring, resp2json, useparseheaderscookies, yieldtimerelatedtitle, safeextractfromdict, taskprogress, FileTypeSniffer, VideoInfo, HostConcurrencyLimiter, MirrorProber
 
 
 '''BilibiliVideoClient'''
 class BilibiliVideoClient(BaseVideoClient):
     source = 'BilibiliVideoClient'
+    MAX_PAGE_WORKERS = 8
+    HOST_LIMITER = HostConcurrencyLimiter(max_per_host=4, min_interval=0.05)
+    PROBE_MIRRORS = True
+    PCDN_HOST_PATTERN = re.compile(r'(?:mcdn\.bilivideo\.(?:cn|com)|szbdyd\.com|^\d{1,3}(?:\.\d{1,3}){3})(?::\d+)?$')
     def __init__(self, **kwargs):
         super(BilibiliVideoClient, self).__init__(**kwargs)
         self.default_parse_headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36', 'Referer': 'https://www.bilibili.com/',}
         self.default_download_headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36', 'Referer': 'https://www.bilibili.com/',}
         self.default_headers = self.default_parse_headers
         self._initsession()
+    '''get'''
+    def get(self, url, **kwargs):
+        with BilibiliVideoClient.HOST_LIMITER.slot(url): return super(BilibiliVideoClient, self).get(url, **kwargs)
+    '''_collectmirrors'''
+    @staticmethod
+    def _collectmirrors(item: dict) -> list[str]:
+        urls = [item.get('baseUrl') or item.get('base_url') or item.get('url')] + list(item.get('backupUrl') or item.get('backup_url') or [])
+        return list(dict.fromkeys(url for url in urls if isinstance(url, str) and url))
+    '''_rankmirrors'''
+    def _rankmirrors(self, urls: list[str], request_overrides: dict = None) -> list[str]:
+        # pcdn nodes (mcdn / szbdyd / bare ip:port) usually trickle below 1MB/s, so they go last before probing and stay last if probing fails
+        urls = sorted(dict.fromkeys(urls), key=lambda url: bool(BilibiliVideoClient.PCDN_HOST_PATTERN.search(urlparse(url).netloc)))
+        if not BilibiliVideoClient.PROBE_MIRRORS or len(urls) <= 1: return urls
+        return MirrorProber.rank(urls, headers=self.default_download_headers, cookies=self.default_download_cookies, request_overrides={k: v for k, v in (request_overrides or {}).items() if k in {'proxies', 'verify'}})
+    '''_parseitemsconcurrently'''
+    def _parseitemsconcurrently(self, items: list, parse_func):
+        # pages are resolved on a bounded pool under the shared bilibili limiter, results are yielded in the original order
+        executor = ThreadPoolExecutor(max_workers=max(1, min(BilibiliVideoClient.MAX_PAGE_WORKERS, len(items))), thread_name_prefix='videodl-bilibili')
+        with taskprogress(description='Possible Multiple Videos Detected >>> Parsing Concurrently', total=len(items)) as progress:
+            try:
+                futures = [executor.submit(parse_func, item) for item in items]
+                for future in futures: future.add_done_callback(lambda _: progress.advance(1))
+                for future in futures: yield future.result()
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
     '''_parsefromcommonurl'''
     def _parsefromcommonurl(self, url: str, request_overrides: dict = None):
         # prepare
@@ -36,22 +65,49 @@ class BilibiliVideoClient(BaseVideoClient):
             part_id = int(part_id[0]) if (part_id := parse_qs(urlparse(url).query, keep_blank_values=True).get('p', None)) and isinstance(part_id, list) and str(part_id[0]).lstrip("+-").isdigit() else None
             if prefix.upper() in ['BV']: (resp := self.get(f"https://api.bilibili.com/x/web-interface/view?bvid=BV{video_id}", **request_overrides)).raise_for_status(); raw_data = resp2json(resp=resp)
             elif prefix.upper() in ['AV']: (resp := self.get(f"https://api.bilibili.com/x/web-interface/view?aid={video_id}", **request_overrides)).raise_for_status(); video_id = (raw_data := resp2json(resp=resp))['data']['bvid']
-            with taskprogress(description='Possible Multiple Videos Detected >>> Parsing One by One', total=len((extracted_video_items := raw_data['data']["pages"]))) as progress:
-                for video_idx, extracted_video_item in enumerate(extracted_video_items):
-                    if (part_id and video_idx + 1 != part_id) or (not isinstance(extracted_video_item, dict)): progress.advance(1); continue
-                    with suppress(Exception): resp = None; (resp := self.get(f"https://api.bilibili.com/x/player/playurl?otype=json&fnver=0&fnval=0&qn=80&bvid={video_id}&cid={extracted_video_item['cid']}&platform=html5", **request_overrides)).raise_for_status()
-                    if not locals().get('resp') or not hasattr(locals().get('resp'), 'text'): progress.advance(1); continue
-                    (page_raw_data := resp2json(resp=resp))['x/web-interface/view'] = copy.deepcopy(raw_data)
-                    (video_page_info := copy.deepcopy(video_info)).update(dict(raw_data=page_raw_data, download_url=(download_url := max(page_raw_data['data']['durl'], key=lambda x: x['size'])['url'])))
-                    video_title = legalizestring((f"EP{len(video_infos)+1}-{extracted_video_item.get('part')}" if len(raw_data['data']["pages"]) > 1 else safeextractfromdict(raw_data, ['data', 'title'], None)) or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                    guess_video_ext_result = FileTypeSniffer.getfileextensionfromurl(url=download_url, headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
-                    if (ext := guess_video_ext_result['ext'] if guess_video_ext_result['ext'] and guess_video_ext_result['ext'] != 'NULL' else video_page_info['ext']) in {'m4s'}: ext = 'mp4'
-                    video_page_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{ext}'), ext=ext, guess_video_ext_result=guess_video_ext_result, identifier=f"{video_id}-{extracted_video_item['cid']}", cover_url=safeextractfromdict(extracted_video_item, ['first_frame'], None) or safeextractfromdict(page_raw_data['x/web-interface/view'], ['data', 'pic'], None))); video_infos.append(video_page_info); progress.advance(1)
+            extracted_video_items = [item for video_idx, item in enumerate(raw_data['data']["pages"]) if isinstance(item, dict) and not (part_id and video_idx + 1 != part_id)]
+            '''_parsepage'''
+            def _parsepage(extracted_video_item: dict) -> VideoInfo | None:
+                resp = None
+                with suppress(Exception): (resp := self.get(f"https://api.bilibili.com/x/player/playurl?otype=json&fnver=0&fnval=0&qn=80&bvid={video_id}&cid={extracted_video_item['cid']}&platform=html5", **request_overrides)).raise_for_status()
+                if resp is None or not hasattr(resp, 'text'): return None
+                # the series level payload is shared by reference across pages instead of being deep copied per page
+                (page_raw_data := resp2json(resp=resp))['x/web-interface/view'] = raw_data
+                mirrors = self._rankmirrors(self._collectmirrors(max(page_raw_data['data']['durl'], key=lambda x: x['size'])), request_overrides=request_overrides)
+                (video_page_info := VideoInfo(source=self.source)).update(dict(raw_data=page_raw_data, download_url=(download_url := mirrors[0]), download_url_mirrors=mirrors[1:]))
+                guess_video_ext_result = FileTypeSniffer.getfileextensionfromurl(url=download_url, headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
+                if (ext := guess_video_ext_result['ext'] if guess_video_ext_result['ext'] and guess_video_ext_result['ext'] != 'NULL' else video_page_info['ext']) in {'m4s'}: ext = 'mp4'
+                video_page_info.update(dict(ext=ext, guess_video_ext_result=guess_video_ext_result, identifier=f"{video_id}-{extracted_video_item['cid']}", cover_url=safeextractfromdict(extracted_video_item, ['first_frame'], None) or safeextractfromdict(raw_data, ['data', 'pic'], None)))
+                return video_page_info
+            for extracted_video_item, video_page_info in zip(extracted_video_items, self._parseitemsconcurrently(extracted_video_items, _parsepage)):
+                if video_page_info is None: continue
+                video_title = legalizestring((f"EP{len(video_infos)+1}-{extracted_video_item.get('part')}" if len(raw_data['data']["pages"]) > 1 else safeextractfromdict(raw_data, ['data', 'title'], None)) or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
+                video_page_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{video_page_info.ext}'))); video_infos.append(video_page_info)
         except Exception as err:
             video_info.update(dict(err_msg=(err_msg := f'{self.source}._parsefromcommonurl >>> {url} (Error: {err})'))); video_infos.append(video_info)
             self.logger_handle.error(err_msg, disable_print=self.disable_print)
         # return
         return video_infos
+    '''_parsedashepisode'''
+    def _parsedashepisode(self, page_raw_data: dict, dash_path: list, video_title: str, identifier, cover_url: str, audio_extra_paths: list = None, request_overrides: dict = None) -> VideoInfo:
+        video_page_info, request_overrides = VideoInfo(source=self.source, raw_data=page_raw_data), request_overrides or {}
+        formats = [{'mirrors': self._collectmirrors(item), 'filesize': item.get('size') or 0, 'width': item.get('width') or 0, 'height': item.get('height') or 0, 'bandwidth': item.get('bandwidth') or 0} for item in safeextractfromdict(page_raw_data, dash_path + ['video'], []) if isinstance(item, dict)]
+        formats: list[dict] = [dict(item, score=(item["width"]*item["height"], item["filesize"]), probe_url=item['mirrors'][0]) for item in sorted(formats, key=lambda x: (x["width"]*x["height"], x["filesize"]), reverse=True) if item.get('mirrors')]
+        audio_bandwidth = max([item.get('bandwidth') or 0 for path in (audio_extra_paths or []) + [dash_path + ['audio']] for item in (safeextractfromdict(page_raw_data, path, []) or []) if isinstance(item, dict)], default=0)
+        best_format = self._selectvariant(formats, video_info=video_page_info, duration=safeextractfromdict(page_raw_data, dash_path + ['duration'], None), extra_bandwidth=audio_bandwidth, request_overrides=request_overrides)
+        mirrors = self._rankmirrors(best_format['mirrors'], request_overrides=request_overrides)
+        video_page_info.update(dict(download_url=(download_url := mirrors[0]), download_url_mirrors=mirrors[1:]))
+        guess_video_ext_result = FileTypeSniffer.getfileextensionfromurl(url=download_url, headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
+        if (ext := guess_video_ext_result['ext'] if guess_video_ext_result['ext'] and guess_video_ext_result['ext'] != 'NULL' else video_page_info['ext']) in ['m4s']: ext = 'mp4'
+        video_page_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{ext}'), ext=ext, guess_video_ext_result=guess_video_ext_result, identifier=identifier, cover_url=cover_url))
+        audio_formats = [{'mirrors': self._collectmirrors(item), 'filesize': item.get('size') or 0} for item in [a for path in (audio_extra_paths or []) + [dash_path + ['audio']] for a in (safeextractfromdict(page_raw_data, path, []) or [])] if isinstance(item, dict)]
+        audio_formats: list[dict] = [item for item in sorted(audio_formats, key=lambda x: x["filesize"], reverse=True) if item.get('mirrors')]
+        if len(audio_formats) == 0: return video_page_info
+        audio_mirrors = self._rankmirrors(audio_formats[0]['mirrors'], request_overrides=request_overrides)
+        guess_audio_ext_result = FileTypeSniffer.getfileextensionfromurl(url=audio_mirrors[0], headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
+        if (audio_ext := guess_audio_ext_result['ext'] if guess_audio_ext_result['ext'] and guess_audio_ext_result['ext'] != 'NULL' else video_page_info.audio_ext) in ['m4s']: audio_ext = 'm4a'
+        video_page_info.update(dict(audio_download_url=audio_mirrors[0], audio_download_url_mirrors=audio_mirrors[1:], guess_audio_ext_result=guess_audio_ext_result, audio_ext=audio_ext, audio_save_path=os.path.join(self.work_dir, self.source, f'{video_title}.audio.{audio_ext}')))
+        return video_page_info
     '''_parsefrombangumiepurl'''
     def _parsefrombangumiepurl(self, url: str, request_overrides: dict = None):
         # prepare
@@ -63,26 +119,16 @@ class BilibiliVideoClient(BaseVideoClient):
             (resp := self.get('https://api.bilibili.com/pgc/view/web/season', params={'ep_id': episode_id}, **request_overrides)).raise_for_status()
             result_episodes = safeextractfromdict((raw_data := resp2json(resp=resp)), ['result', 'episodes'], [])
             result_episodes += [ep for item in safeextractfromdict(raw_data, ['result', 'section'], []) for ep in dict(item).get('episodes', [])]
-            with taskprogress(description='Possible Multiple Videos Detected >>> Parsing One by One', total=len(result_episodes)) as progress:
-                for _, result_episode in enumerate(result_episodes):
-                    if (not isinstance(result_episode, dict)) or (str(result_episode['ep_id']) != episode_id): progress.advance(1); continue
-                    with suppress(Exception): resp = None; (resp := self.get(f"https://api.bilibili.com/pgc/player/web/v2/playurl?fnval=12240&ep_id={str(result_episode['ep_id'])}", **request_overrides)).raise_for_status()
-                    if not locals().get('resp') or not hasattr(locals().get('resp'), 'text'): progress.advance(1); continue
-                    (page_raw_data := resp2json(resp=resp))['pgc/view/web/season'] = copy.deepcopy(raw_data)
-                    (video_page_info := copy.deepcopy(video_info)).update(dict(raw_data=page_raw_data))
-                    formats = [{'url': item.get('baseUrl') or item.get('base_url') or item.get('url'), 'filesize': item.get('size') or 0, 'width': item.get('width') or 0, 'height': item.get('height') or 0} for item in page_raw_data['result']['video_info']['dash']['video'] if isinstance(item, dict)]
-                    formats: list[dict] = [item for item in sorted(formats, key=lambda x: (x["width"]*x["height"], x["filesize"]), reverse=True) if item.get('url')]
-                    video_page_info.update(dict(download_url=(download_url := formats[0]['url'])))
-                    video_title = legalizestring(result_episode.get('share_copy') or result_episode.get('show_title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                    guess_video_ext_result = FileTypeSniffer.getfileextensionfromurl(url=download_url, headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
-                    if (ext := guess_video_ext_result['ext'] if guess_video_ext_result['ext'] and guess_video_ext_result['ext'] != 'NULL' else video_page_info['ext']) in ['m4s']: ext = 'mp4'
-                    video_page_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{ext}'), ext=ext, guess_video_ext_result=guess_video_ext_result, identifier=episode_id, cover_url=safeextractfromdict(result_episode, ['cover'], None)))
-                    audio_formats = [{'url': item.get('baseUrl') or item.get('base_url') or item.get('url'), 'filesize': item.get('size') or 0} for item in (safeextractfromdict(page_raw_data, ['result', 'video_info', 'dash', 'dolby', 'audio'], []) + safeextractfromdict(page_raw_data, ['result', 'video_info', 'dash', 'audio'], [])) if isinstance(item, dict)]
-                    audio_formats: list[dict] = [item for item in sorted(audio_formats, key=lambda x: x["filesize"], reverse=True) if item.get('url')]
-                    if len(audio_formats) == 0: video_infos.append(video_page_info); progress.advance(1); continue
-                    guess_audio_ext_result = FileTypeSniffer.getfileextensionfromurl(url=audio_formats[0]['url'], headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
-                    if (audio_ext := guess_audio_ext_result['ext'] if guess_audio_ext_result['ext'] and guess_audio_ext_result['ext'] != 'NULL' else video_info.audio_ext) in ['m4s']: audio_ext = 'm4a'
-                    video_page_info.update(dict(audio_download_url=audio_formats[0]['url'], guess_audio_ext_result=guess_audio_ext_result, audio_ext=audio_ext, audio_save_path=os.path.join(self.work_dir, self.source, f'{video_title}.audio.{audio_ext}'))); video_infos.append(video_page_info); progress.advance(1)
+            result_episodes = [result_episode for result_episode in result_episodes if isinstance(result_episode, dict) and str(result_episode['ep_id']) == episode_id]
+            '''_parseepisode'''
+            def _parseepisode(result_episode: dict) -> VideoInfo | None:
+                resp = None
+                with suppress(Exception): (resp := self.get(f"https://api.bilibili.com/pgc/player/web/v2/playurl?fnval=12240&ep_id={str(result_episode['ep_id'])}", **request_overrides)).raise_for_status()
+                if resp is None or not hasattr(resp, 'text'): return None
+                (page_raw_data := resp2json(resp=resp))['pgc/view/web/season'] = raw_data
+                video_title = legalizestring(result_episode.get('share_copy') or result_episode.get('show_title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
+                return self._parsedashepisode(page_raw_data, ['result', 'video_info', 'dash'], video_title, episode_id, safeextractfromdict(result_episode, ['cover'], None), [['result', 'video_info', 'dash', 'dolby', 'audio']], request_overrides)
+            video_infos.extend(video_page_info for video_page_info in self._parseitemsconcurrently(result_episodes, _parseepisode) if video_page_info is not None)
         except Exception as err:
             video_info.update(dict(err_msg=(err_msg := f'{self.source}._parsefrombangumiepurl >>> {url} (Error: {err})'))); video_infos.append(video_info)
             self.logger_handle.error(err_msg, disable_print=self.disable_print)
@@ -99,26 +145,16 @@ class BilibiliVideoClient(BaseVideoClient):
             (resp := self.get('https://api.bilibili.com/pgc/web/season/section', params={'season_id': ss_id}, **request_overrides)).raise_for_status()
             result_episodes: list[dict] = safeextractfromdict((raw_data := resp2json(resp=resp)), ['result', 'main_section', 'episodes'], [])
             result_episodes += [ep for item in safeextractfromdict(raw_data, ['result', 'section'], []) if isinstance(item, dict) for ep in item.get('episodes', [])]
-            with taskprogress(description='Possible Multiple Videos Detected >>> Parsing One by One', total=len(result_episodes)) as progress:
-                for _, result_episode in enumerate(result_episodes):
-                    with suppress(Exception): resp = None; (resp := self.get(f"https://api.bilibili.com/pgc/player/web/v2/playurl?fnval=12240&ep_id={result_episode['id']}", **request_overrides)).raise_for_status()
-                    if not locals().get('resp') or not hasattr(locals().get('resp'), 'text'): progress.advance(1); continue
-                    (page_raw_data := resp2json(resp=resp))['pgc/web/season/section'] = copy.deepcopy(raw_data)
-                    if not safeextractfromdict(page_raw_data, ['result', 'video_info', 'dash', 'video'], []): progress.advance(1); continue
-                    (video_page_info := copy.deepcopy(video_info)).update(dict(raw_data=page_raw_data))
-                    formats = [{'url': item.get('baseUrl') or item.get('base_url'), 'filesize': item.get('size'), 'width': item.get('width'), 'height': item.get('height')} for item in page_raw_data['result']['video_info']['dash']['video'] if isinstance(item, dict)]
-                    formats: list[dict] = [item for item in sorted(formats, key=lambda x: (x["width"]*x["height"], x["filesize"]), reverse=True) if item.get('url')]
-                    video_page_info.update(dict(download_url=(download_url := formats[0]['url'])))
-                    video_title = legalizestring(result_episode.get('long_title') or result_episode.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                    guess_video_ext_result = FileTypeSniffer.getfileextensionfromurl(url=download_url, headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
-                    if (ext := guess_video_ext_result['ext'] if guess_video_ext_result['ext'] and guess_video_ext_result['ext'] != 'NULL' else video_page_info['ext']) in ['m4s']: ext = 'mp4'
-                    video_page_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{ext}'), ext=ext, guess_video_ext_result=guess_video_ext_result, identifier=result_episode['id'], cover_url=safeextractfromdict(result_episode, ['cover'], None)))
-                    audio_formats = [{'url': item.get('baseUrl') or item.get('base_url') or item.get('url'), 'filesize': item.get('size') or 0} for item in (safeextractfromdict(page_raw_data, ['result', 'video_info', 'dash', 'dolby', 'audio'], []) + safeextractfromdict(page_raw_data, ['result', 'video_info', 'dash', 'audio'], [])) if isinstance(item, dict)]
-                    audio_formats: list[dict] = [item for item in sorted(audio_formats, key=lambda x: x["filesize"], reverse=True) if item.get('url')]
-                    if len(audio_formats) == 0: video_infos.append(video_page_info); progress.advance(1); continue
-                    guess_audio_ext_result = FileTypeSniffer.getfileextensionfromurl(url=audio_formats[0]['url'], headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
-                    if (audio_ext := guess_audio_ext_result['ext'] if guess_audio_ext_result['ext'] and guess_audio_ext_result['ext'] != 'NULL' else video_info.audio_ext) in ['m4s']: audio_ext = 'm4a'
-                    video_page_info.update(dict(audio_download_url=audio_formats[0]['url'], guess_audio_ext_result=guess_audio_ext_result, audio_ext=audio_ext, audio_save_path=os.path.join(self.work_dir, self.source, f'{video_title}.audio.{audio_ext}'))); video_infos.append(video_page_info); progress.advance(1)
+            '''_parseepisode'''
+            def _parseepisode(result_episode: dict) -> VideoInfo | None:
+                resp = None
+                with suppress(Exception): (resp := self.get(f"https://api.bilibili.com/pgc/player/web/v2/playurl?fnval=12240&ep_id={result_episode['id']}", **request_overrides)).raise_for_status()
+                if resp is None or not hasattr(resp, 'text'): return None
+                (page_raw_data := resp2json(resp=resp))['pgc/web/season/section'] = raw_data
+                if not safeextractfromdict(page_raw_data, ['result', 'video_info', 'dash', 'video'], []): return None
+                video_title = legalizestring(result_episode.get('long_title') or result_episode.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
+                return self._parsedashepisode(page_raw_data, ['result', 'video_info', 'dash'], video_title, result_episode['id'], safeextractfromdict(result_episode, ['cover'], None), [['result', 'video_info', 'dash', 'dolby', 'audio']], request_overrides)
+            video_infos.extend(video_page_info for video_page_info in self._parseitemsconcurrently(result_episodes, _parseepisode) if video_page_info is not None)
         except Exception as err:
             video_info.update(dict(err_msg=(err_msg := f'{self.source}._parsefrombangumissurl >>> {url} (Error: {err})'))); video_infos.append(video_info)
             self.logger_handle.error(err_msg, disable_print=self.disable_print)
@@ -133,27 +169,16 @@ class BilibiliVideoClient(BaseVideoClient):
         # try parse
         try:
             (resp := self.get(f"https://api.bilibili.com/pugv/view/web/season?ep_id={episode_id}", **request_overrides)).raise_for_status()
-            result_episodes = (raw_data := resp2json(resp=resp))['data']['episodes']
-            with taskprogress(description='Possible Multiple Videos Detected >>> Parsing One by One', total=len(result_episodes)) as progress:
-                for _, result_episode in enumerate(result_episodes):
-                    if (not isinstance(result_episode, dict)) or (str(result_episode['id']) != episode_id): progress.advance(1); continue
-                    with suppress(Exception): resp = None; (resp := self.get('https://api.bilibili.com/pugv/player/web/playurl', params={'avid': result_episode['aid'], 'cid': result_episode['cid'], 'ep_id': episode_id, 'fnval': 16, 'fourk': 1}, **request_overrides)).raise_for_status()
-                    if not locals().get('resp') or not hasattr(locals().get('resp'), 'text'): progress.advance(1); continue
-                    (page_raw_data := resp2json(resp=resp))['pugv/view/web/season'] = copy.deepcopy(raw_data)
-                    (video_page_info := copy.deepcopy(video_info)).update(dict(raw_data=page_raw_data))
-                    formats = [{'url': item.get('baseUrl') or item.get('base_url') or item.get('url'), 'filesize': item.get('size') or 0, 'width': item.get('width') or 0, 'height': item.get('height') or 0} for item in page_raw_data['data']['dash']['video'] if isinstance(item, dict)]
-                    formats: list[dict] = [item for item in sorted(formats, key=lambda x: (x["width"]*x["height"], x["filesize"]), reverse=True) if item.get('url')]
-                    video_page_info.update(dict(download_url=(download_url := formats[0]['url'])))
-                    video_title = legalizestring(result_episode.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                    guess_video_ext_result = FileTypeSniffer.getfileextensionfromurl(url=download_url, headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
-                    if (ext := guess_video_ext_result['ext'] if guess_video_ext_result['ext'] and guess_video_ext_result['ext'] != 'NULL' else video_page_info['ext']) in ['m4s']: ext = 'mp4'
-                    video_page_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{ext}'), ext=ext, guess_video_ext_result=guess_video_ext_result, identifier=episode_id, cover_url=safeextractfromdict(result_episode, ['cover'], None)))
-                    audio_formats = [{'url': item.get('baseUrl') or item.get('base_url') or item.get('url'), 'filesize': item.get('size') or 0} for item in safeextractfromdict(page_raw_data, ['data', 'dash', 'audio'], []) if isinstance(item, dict)]
-                    audio_formats: list[dict] = [item for item in sorted(audio_formats, key=lambda x: x["filesize"], reverse=True) if item.get('url')]
-                    if len(audio_formats) == 0: video_infos.append(video_page_info); progress.advance(1); continue
-                    guess_audio_ext_result = FileTypeSniffer.getfileextensionfromurl(url=audio_formats[0]['url'], headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
-                    if (audio_ext := guess_audio_ext_result['ext'] if guess_audio_ext_result['ext'] and guess_audio_ext_result['ext'] != 'NULL' else video_info.audio_ext) in ['m4s']: audio_ext = 'm4a'
-                    video_page_info.update(dict(audio_download_url=audio_formats[0]['url'], guess_audio_ext_result=guess_audio_ext_result, audio_ext=audio_ext, audio_save_path=os.path.join(self.work_dir, self.source, f'{video_title}.audio.{audio_ext}'))); video_infos.append(video_page_info); progress.advance(1)
+            raw_data = resp2json(resp=resp); result_episodes = [result_episode for result_episode in raw_data['data']['episodes'] if isinstance(result_episode, dict) and str(result_episode['id']) == episode_id]
+            '''_parseepisode'''
+            def _parseepisode(result_episode: dict) -> VideoInfo | None:
+                resp = None
+                with suppress(Exception): (resp := self.get('https://api.bilibili.com/pugv/player/web/playurl', params={'avid': result_episode['aid'], 'cid': result_episode['cid'], 'ep_id': episode_id, 'fnval': 16, 'fourk': 1}, **request_overrides)).raise_for_status()
+                if resp is None or not hasattr(resp, 'text'): return None
+                (page_raw_data := resp2json(resp=resp))['pugv/view/web/season'] = raw_data
+                video_title = legalizestring(result_episode.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
+                return self._parsedashepisode(page_raw_data, ['data', 'dash'], video_title, episode_id, safeextractfromdict(result_episode, ['cover'], None), None, request_overrides)
+            video_infos.extend(video_page_info for video_page_info in self._parseitemsconcurrently(result_episodes, _parseepisode) if video_page_info is not None)
         except Exception as err:
             video_info.update(dict(err_msg=(err_msg := f'{self.source}._parsefromcheeseepurl >>> {url} (Error: {err})'))); video_infos.append(video_info)
             self.logger_handle.error(err_msg, disable_print=self.disable_print)
@@ -46,7 +46,8 @@ class CCTVVideoClient(BaseVideoClient):
             manifest, download_urls, hls_candidates = raw_data.get('manifest') or {}, [], ['hls_h5e_url', 'hls_url']
             download_urls += [[hls_key, url] for hls_key in hls_candidates if (url := raw_data.get(hls_key) or manifest.get(hls_key))]
             hls_key, download_url = download_urls[0]; (resp := self.get(download_url, **request_overrides)).raise_for_status()
-            download_url = CCTVHLSBestParser(f"{urlsplit(str(download_url)).scheme}://{urlsplit(str(download_url)).netloc}/").best(resp.text)['uri']
+            variants = CCTVHLSBestParser(f"{urlsplit(str(download_url)).scheme}://{urlsplit(str(download_url)).netloc}/").variants(resp.text)
+            download_url = self._selectvariant(variants, video_info=video_info, is_hls=True, request_overrides=request_overrides)['uri']
             video_info.update(dict(download_url=download_url, hls_key=hls_key))
             # --create video info's extra entries
             video_title = legalizestring(raw_data.get('title', null_backup_title), replace_null_string=null_backup_title).removesuffix('.')
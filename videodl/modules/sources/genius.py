@@ -45,7 +45,7 @@ class GeniusVideoClient(BaseVideoClient):
             player_url = BrightcoveSmuggler.smuggleurl(player_url, {'referrer': url}); request_overrides = copy.deepcopy(request_overrides)
             if 'headers' not in request_overrides: request_overrides['headers'] = copy.deepcopy(self.default_headers)
             if 'cookies' not in request_overrides: request_overrides['cookies'] = copy.deepcopy(self.default_cookies)
-            raw_data = BrightcoveSmuggler.extract(player_url=player_url, request_overrides=request_overrides); video_info.update(dict(raw_data=raw_data))
+            raw_data = BrightcoveSmuggler.extract(player_url=player_url, request_overrides=request_overrides, credential_cache=self.credential_cache); video_info.update(dict(raw_data=raw_data))
             download_url = raw_data['formats'][0]['url']; video_info.update(dict(download_url=download_url))
             video_title = legalizestring(video_title, replace_null_string=null_backup_title).removesuffix('.')
             guess_video_ext_result = FileTypeSniffer.getfileextensionfromurl(url=download_url, headers=self.default_download_headers, request_overrides=request_overrides, cookies=self.default_download_cookies)
@@ -8,12 +8,12 @@ WeChat Official Account (微信公众号):
 '''
 import os
 import re
-import copy
 from pathlib import Path
 from .base import BaseVideoClient
 from ..utils.cmd import DownloadWithNM3U8DLRECommand
-from ..utils import initcdm, closecdm, SearchPsshValueUtils
-from ..utils import legalizestring, useparseheaderscookies, yieldtimerelatedtitle, resp2json, safeextractfromdict, taskprogress, VideoInfo
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ..utils import acquirecontentkeys, ContentKeyStore, SearchPsshValueUtils
+from ..utils import legalizestring, useparseheaderscookies, yieldtimerelatedtitle, resp2json, safeextractfromdict, taskprogress, VideoInfo, HostConcurrencyLimiter
 
 
 '''PlayerPLVideoClient'''
@@ -26,12 +26,22 @@ class PlayerPLVideoClient(BaseVideoClient):
     SEASONS_URL = 'https://player.pl/playerapi/product/vod/serial/{show_id}/season/list'
     EPISODES_URL = 'https://player.pl/playerapi/product/vod/serial/{show_id}/season/{season_id}/episode/list'
     CDM_WVD_FILE_PATH = Path(__file__).resolve().parents[2] / "modules" / "cdm" / "charlespikachu_playerpl.wvd"
+    MAX_EPISODE_WORKERS = 8
+    MAX_REQUESTS_PER_HOST = 4
     def __init__(self, **kwargs):
         super(PlayerPLVideoClient, self).__init__(**kwargs)
         self.default_parse_headers = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"}
         self.default_download_headers = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"}
         self.default_headers = self.default_parse_headers
+        self.content_key_store = ContentKeyStore(cache_dir=os.path.join(self.work_dir, '.credentials'), namespace=f'{self.source}.widevine')
+        self.host_limiter = HostConcurrencyLimiter(max_per_host=PlayerPLVideoClient.MAX_REQUESTS_PER_HOST)
         self._initsession()
+    '''get'''
+    def get(self, url, **kwargs):
+        with self.host_limiter.slot(url): return super(PlayerPLVideoClient, self).get(url, **kwargs)
+    '''post'''
+    def post(self, url, **kwargs):
+        with self.host_limiter.slot(url): return super(PlayerPLVideoClient, self).post(url, **kwargs)
     '''_parsefromurlsinglevideo'''
     @useparseheaderscookies
     def _parsefromurlsinglevideo(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
@@ -61,10 +71,12 @@ class PlayerPLVideoClient(BaseVideoClient):
                 any(isinstance(v, dict) and (manifest_url := v.get('url')) for _, v in sources.items())
             raw_data['drm_details'], key = {'license_url': license_url, 'manifest_url': manifest_url, 'pssh_value': pssh_value}, None
             if pssh_value and license_url: 
-                cdm, cdm_session_id, challenge = initcdm(pssh_value, PlayerPLVideoClient.CDM_WVD_FILE_PATH)
-                (licence_resp := self.post(license_url, data=challenge, **request_overrides)).raise_for_status()
-                raw_data['LICENSE_URL_RESPONSE'] = licence_resp.content; video_info.update(dict(raw_data=raw_data))
-                key = list(set(closecdm(cdm, cdm_session_id, licence_resp.content)))[0]
+                '''_fetchlicense'''
+                def _fetchlicense(challenge: bytes, pssh_value: str) -> bytes:
+                    (licence_resp := self.post(license_url, data=challenge, **request_overrides)).raise_for_status()
+                    raw_data['LICENSE_URL_RESPONSE'] = licence_resp.content
+                    return licence_resp.content
+                key = acquirecontentkeys([pssh_value], PlayerPLVideoClient.CDM_WVD_FILE_PATH, _fetchlicense, key_store=self.content_key_store)[0]; video_info.update(dict(raw_data=raw_data))
             video_info.update(dict(download_url=manifest_url, nm3u8dlre_settings=DownloadWithNM3U8DLRECommand.addkeyafterretry(key_value=key)))
             cover_url = safeextractfromdict(raw_data, ['play_details', 'movie', 'info', 'media', 'thumbnail_big'], None) or safeextractfromdict(raw_data, ['play_details', 'movie', 'info', 'media', 'poster'], None)
             video_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{video_info.ext}'), identifier=item_id, cover_url=cover_url)); video_infos.append(video_info)
@@ -82,17 +94,22 @@ class PlayerPLVideoClient(BaseVideoClient):
             (resp := self.get(PlayerPLVideoClient.TRANSLATE_URL, params={'programId': clean_url.split(",")[-1], 'platform': PlayerPLVideoClient.PLATFORM}, **request_overrides)).raise_for_status()
             (resp := self.get(PlayerPLVideoClient.SERIAL_URL.format(show_id=(content_id := resp2json(resp=resp)['id'])), params={'platform': PlayerPLVideoClient.PLATFORM}, **request_overrides)).raise_for_status(); raw_data = resp2json(resp=resp)
             (resp := self.get(PlayerPLVideoClient.SEASONS_URL.format(show_id=content_id), params={'platform': PlayerPLVideoClient.PLATFORM}, **request_overrides)).raise_for_status(); raw_data['SEASONS_URL_RESPONSE'] = resp2json(resp=resp)
-            with taskprogress(description='Possible Multiple Seasons Detected >>> Parsing One by One', total=len((seasons := sorted(resp2json(resp=resp), key=lambda s: s["number"])))) as progress_season:
-                for season_idx, season in enumerate(seasons):
-                    (resp := self.get(PlayerPLVideoClient.EPISODES_URL.format(show_id=content_id, season_id=season["id"]), params={'platform': PlayerPLVideoClient.PLATFORM}, **request_overrides)).raise_for_status()
-                    with taskprogress(description=f'Possible Multiple Videos in Season {season_idx+1} Detected >>> Parsing One by One', total=len((episodes := sorted(resp2json(resp=resp), key=lambda e: e["episode"])))) as progress_eps:
-                        for episode_idx, episode in enumerate(episodes):
-                            (raw_data_eps := copy.deepcopy(raw_data)).update({'EPISODE_DETAILS': episode})
-                            video_info_eps = self._parsefromurlsinglevideo(episode["shareUrl"], request_overrides=request_overrides)
-                            if any((not info.with_valid_download_url) for info in (video_info_eps or [])): progress_eps.advance(1); continue
-                            video_info_eps[0].raw_data['ROOT'] = raw_data_eps; video_info_eps[0].title = f"S{season_idx+1}E{episode_idx+1} {video_info_eps[0].title}"
-                            video_info_eps[0].save_path = os.path.join(self.work_dir, self.source, f'{video_info_eps[0].title}.{video_info_eps[0].ext}'); video_infos.extend(video_info_eps); progress_eps.advance(1)
-                    progress_season.advance(1)
+            seasons = sorted(resp2json(resp=resp), key=lambda s: s["number"])
+            '''_listepisodes'''
+            def _listepisodes(season: dict) -> list[dict]:
+                (resp := self.get(PlayerPLVideoClient.EPISODES_URL.format(show_id=content_id, season_id=season["id"]), params={'platform': PlayerPLVideoClient.PLATFORM}, **request_overrides)).raise_for_status()
+                return sorted(resp2json(resp=resp), key=lambda e: e["episode"])
+            # episodes are resolved on a bounded pool, the per host limiter keeps api / cdn / license hosts from being flooded and results keep season order
+            with ThreadPoolExecutor(max_workers=PlayerPLVideoClient.MAX_EPISODE_WORKERS, thread_name_prefix='videodl-playerpl') as executor:
+                tasks = [(season_idx, episode_idx, season, episode) for season_idx, (season, episodes) in enumerate(zip(seasons, executor.map(_listepisodes, seasons))) for episode_idx, episode in enumerate(episodes)]
+                with taskprogress(description=f'Possible Multiple Videos in {len(seasons)} Seasons Detected >>> Parsing Concurrently', total=len(tasks)) as progress_eps:
+                    futures, results = {executor.submit(self._parsefromurlsinglevideo, task[3]["shareUrl"], request_overrides=request_overrides): idx for idx, task in enumerate(tasks)}, [None] * len(tasks)
+                    for future in as_completed(futures): results[futures[future]] = future.result(); progress_eps.advance(1)
+            for (season_idx, episode_idx, season, episode), video_info_eps in zip(tasks, results):
+                if not video_info_eps or any((not info.with_valid_download_url) for info in video_info_eps): continue
+                # the series payload is shared by reference, every episode only carries its own season / episode slice
+                video_info_eps[0].raw_data['ROOT'] = {'SERIES': raw_data, 'SEASON': season, 'EPISODE_DETAILS': episode}; video_info_eps[0].title = f"S{season_idx+1}E{episode_idx+1} {video_info_eps[0].title}"
+                video_info_eps[0].save_path = os.path.join(self.work_dir, self.source, f'{video_info_eps[0].title}.{video_info_eps[0].ext}'); video_infos.extend(video_info_eps)
         else:
             video_infos = self._parsefromurlsinglevideo(url=url, request_overrides=request_overrides)
         return video_infos
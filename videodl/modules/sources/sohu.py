@@ -43,11 +43,11 @@ class SohuVideoClient(BaseVideoClient):
             # --request again using new vid with higher video quality
             (resp := self.get(f'http://my.tv.sohu.com/play/videonew.do?vid={vid}&referer=http://my.tv.sohu.com', **request_overrides)).raise_for_status()
             raw_data[f'{vid}_videonew.do'] = resp2json(resp=resp); video_info.update(dict(raw_data=raw_data))
-            mp4_palyurls, download_urls, parsed_download_urls = raw_data[f'{vid}_videonew.do']["data"]["mp4PlayUrl"], [], []
+            mp4_palyurls, download_urls, parsed_download_urls, download_url_mirrors = raw_data[f'{vid}_videonew.do']["data"]["mp4PlayUrl"], [], [], []
             download_urls.extend(("https:" + u) if u.startswith("//") else u for u in mp4_palyurls if u and isinstance(u, str))
             # --some download urls need parse twice
             for download_url in download_urls:
-                with suppress(Exception): (resp := self.get(download_url, **request_overrides)).raise_for_status(); download_url = resp2json(resp=resp)['servers'][0]['url']; parsed_download_urls.append(download_url)
+                with suppress(Exception): (resp := self.get(download_url, **request_overrides)).raise_for_status(); server_urls = [s['url'] for s in resp2json(resp=resp)['servers'] if isinstance(s, dict) and s.get('url')]; download_url = server_urls[0]; parsed_download_urls.append(download_url); download_url_mirrors.append(server_urls[1:])
             if parsed_download_urls: download_urls = [p_down_url for p_down_url in parsed_download_urls if p_down_url]
             # --construct other video info
             video_title = legalizestring(safeextractfromdict(raw_data, ['data', 'tvName'], None) or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
@@ -55,7 +55,7 @@ class SohuVideoClient(BaseVideoClient):
             video_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.mp4'), ext='mp4', vid=vid, identifier=vid, cover_url=cover_url))
             # --if multiple video split
             if len(download_urls) == 1:
-                video_info.update(dict(download_url=download_urls[0]))
+                video_info.update(dict(download_url=download_urls[0], download_url_mirrors=download_url_mirrors[0] if len(download_url_mirrors) == 1 else []))
             else:
                 touchdir(os.path.dirname((ffmpeg_target_file_path := os.path.join(self.work_dir, self.source, f'{vid}.txt'))))
                 with open(ffmpeg_target_file_path, "w", encoding="utf-8") as fp: fp.writelines(f"{url}\n" for url in download_urls)
@@ -90,11 +90,11 @@ class SohuVideoClient(BaseVideoClient):
             params = {'vid': vid, 'ver': '1', 'ssl': '1', 'uid': '17636986544987061902', 'pflag': 'pch5', 'prod': 'h5n', 'platform_source': 'pc'}
             (resp := self.get('https://hot.vrs.sohu.com/vrs_pc_play.action', params=params, **request_overrides)).raise_for_status()
             raw_data[f'{vid}_vrs_pc_play.action'] = resp2json(resp=resp); video_info.update(dict(raw_data=raw_data))
-            mp4_palyurls, download_urls, parsed_download_urls = raw_data[f'{vid}_vrs_pc_play.action']["data"]["mp4PlayUrl"], [], []
+            mp4_palyurls, download_urls, parsed_download_urls, download_url_mirrors = raw_data[f'{vid}_vrs_pc_play.action']["data"]["mp4PlayUrl"], [], [], []
             download_urls.extend(("https:" + u) if u.startswith("//") else u for u in mp4_palyurls if u and isinstance(u, str))
             # --some download urls need parse twice
             for download_url in download_urls:
-                with suppress(Exception): (resp := self.get(download_url, **request_overrides)).raise_for_status(); download_url = resp2json(resp=resp)['servers'][0]['url']; parsed_download_urls.append(download_url)
+                with suppress(Exception): (resp := self.get(download_url, **request_overrides)).raise_for_status(); server_urls = [s['url'] for s in resp2json(resp=resp)['servers'] if isinstance(s, dict) and s.get('url')]; download_url = server_urls[0]; parsed_download_urls.append(download_url); download_url_mirrors.append(server_urls[1:])
             if parsed_download_urls: download_urls = [p_down_url for p_down_url in parsed_download_urls if p_down_url]
             # --construct other video info
             video_title = legalizestring(safeextractfromdict(raw_data, ['data', 'tvName'], None) or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
@@ -102,7 +102,7 @@ class SohuVideoClient(BaseVideoClient):
             video_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.mp4'), ext='mp4', vid=vid, identifier=vid, cover_url=cover_url))
             # --if multiple video split
             if len(download_urls) == 1:
-                video_info.update(dict(download_url=download_urls[0]))
+                video_info.update(dict(download_url=download_urls[0], download_url_mirrors=download_url_mirrors[0] if len(download_url_mirrors) == 1 else []))
             else:
                 touchdir(os.path.dirname((ffmpeg_target_file_path := os.path.join(self.work_dir, self.source, f'{vid}.txt'))))
                 with open(ffmpeg_target_file_path, "w", encoding="utf-8") as fp: fp.writelines(f"{url}\n" for url in download_urls)
@@ -14,14 +14,112 @@ import copy
 import math
 import json
 import random
+import atexit
+import hashlib
 import string
+import threading
 import subprocess
 from pathlib import Path
+from itertools import count
+from contextlib import suppress
 from bs4 import BeautifulSoup
 from .base import BaseVideoClient
 from urllib.parse import urlencode, urljoin
+from concurrent.futures import ThreadPoolExecutor
 from ..utils.domains import TENCENT_SUFFIXES
-from ..utils import naivejstojson, legalizestring, intornone, useparseheaderscookies, safeextractfromdict, yieldtimerelatedtitle, taskprogress, naivedetermineext, traverseobj, floatornone, VideoInfo, AESAlgorithmWrapper, SpinWithBackoff, TencentHLSHelper
+from ..utils import naivejstojson, legalizestring, intornone, useparseheaderscookies, safeextractfromdict, yieldtimerelatedtitle, taskprogress, naivedetermineext, traverseobj, floatornone, VideoInfo, AESAlgorithmWrapper, SpinWithBackoff, TencentHLSHelper, TencentCKeyWasmRuntime
+
+
+'''TencentCKeyAESRuntime'''
+class TencentCKeyAESRuntime():
+    # constants of js/tencent/vqq_ckey-8.5.js, whose getCkey is an aes-128-cbc encrypted json record
+    KEY = bytes.fromhex('2A5AA60178AA6C8DA662E443773A6C4E')
+    IV = bytes.fromhex('CFAC216FAA2D396013575D4055C63350')
+    SDK_VERSION = '1.0.1'
+    NONCE_ALPHABET = 'ABCEFGHIJKLNOPQRSTVWXYZabcefgijklmnpqrsuvwxz0124679'
+    _instance: 'TencentCKeyAESRuntime' = None
+    '''isavailable'''
+    @staticmethod
+    def isavailable() -> bool:
+        return True
+    '''getinstance'''
+    @classmethod
+    def getinstance(cls) -> 'TencentCKeyAESRuntime':
+        cls._instance = cls._instance or cls()
+        return cls._instance
+    '''createguid'''
+    @staticmethod
+    def createguid(length: int = 32) -> str:
+        return ''.join(f'{random.randrange(16):x}' for _ in range(length))
+    '''getckey'''
+    def getckey(self, platform: str | int, app_version: str, vid: str, guid: str, tm: int, h38: str = '', nonce: str = None) -> str:
+        nonce = nonce or ''.join(random.choice(TencentCKeyAESRuntime.NONCE_ALPHABET) for _ in range(11))
+        record = {'vid': vid, 'sdkVer': TencentCKeyAESRuntime.SDK_VERSION, 'nonce': nonce, 'rand': hashlib.md5(f'{nonce}1234'.encode('utf-8')).hexdigest()[:8], 'appVer': app_version, 'guid': guid, 'platform': str(platform), 'ts': str(tm), 'h38': h38, 'sj': '', 'bj': '', 'os': '{}'}
+        return '--01' + AESAlgorithmWrapper.aescbcencryptbytes(json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), TencentCKeyAESRuntime.KEY, TencentCKeyAESRuntime.IV).hex().upper()
+    '''computeckeys'''
+    def computeckeys(self, platform: str, app_version: str, vid: str, vurl: str, referrer: str, num: int = 1) -> list[list[str]]:
+        # same record layout as the node worker, < cKey tm guid flowid >, with fresh ids per ckey like the resident script
+        tm, records = int(time.time()), []
+        for _ in range(num):
+            guid, flowid = self.createguid(16), self.createguid(32)
+            records.append([self.getckey(platform, app_version, vid, guid, tm, h38=self.createguid(38)), str(tm), guid, flowid])
+        return records
+
+
+'''TencentCKeyNodeWorker'''
+class TencentCKeyNodeWorker():
+    READ_TIMEOUT = 15.0
+    def __init__(self, js_file_path: str | Path):
+        self.js_file_path = js_file_path
+        self.proc: subprocess.Popen = None
+        self.pending: dict[str, list] = {}
+        self.request_ids = count()
+        self.lock = threading.Lock()
+        # registered once per worker, respawned processes are looked up at exit instead of pinning every dead popen
+        atexit.register(self.close)
+    '''_start'''
+    def _start(self) -> subprocess.Popen:
+        if self.proc is not None and self.proc.poll() is None: return self.proc
+        self.proc = subprocess.Popen(['node', str(self.js_file_path), '--resident'], bufsize=1, universal_newlines=True, encoding='utf-8', stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        threading.Thread(target=self._readloop, args=(self.proc,), name='videodl-tencent-ckey-reader', daemon=True).start()
+        return self.proc
+    '''_readloop'''
+    def _readloop(self, proc: subprocess.Popen):
+        # responses carry the request id, so callers only hold the lock while writing and never across the round trip
+        with suppress(Exception):
+            for line in proc.stdout:
+                if len(fields := line.split()) != 5: continue
+                with self.lock: waiter = self.pending.pop(fields[0], None)
+                if waiter is not None: waiter[1] = fields[1:]; waiter[0].set()
+        with self.lock: waiters = [self.pending.pop(request_id) for request_id, waiter in list(self.pending.items()) if waiter[2] is proc]
+        for waiter in waiters: waiter[0].set()
+    '''kill'''
+    def kill(self, proc: subprocess.Popen):
+        with self.lock:
+            if self.proc is proc: self.proc = None
+        if proc.poll() is not None: return
+        try: proc.kill(); proc.wait(timeout=5)
+        except Exception: pass
+    '''close'''
+    def close(self):
+        if (proc := self.proc) is not None: self.kill(proc)
+    '''compute'''
+    def compute(self, ckey_req: str, num: int = 1, timeout: float = None) -> list[list[str]]:
+        timeout = timeout or TencentCKeyNodeWorker.READ_TIMEOUT
+        for _ in range(2):
+            with self.lock:
+                proc, waiters = self._start(), {str(next(self.request_ids)): [threading.Event(), None, None] for _ in range(num)}
+                for waiter in waiters.values(): waiter[2] = proc
+                self.pending.update(waiters)
+                try: proc.stdin.write(''.join(f'{request_id} {ckey_req}\n' for request_id in waiters)); proc.stdin.flush()
+                except (OSError, ValueError): pass
+            deadline = time.time() + timeout
+            if all(waiter[0].wait(max(deadline - time.time(), 0.0)) and waiter[1] for waiter in waiters.values()): return [waiter[1] for waiter in waiters.values()]
+            with self.lock:
+                for request_id in waiters: self.pending.pop(request_id, None)
+            # a hung or dead worker is killed, the retry starts a fresh one
+            self.kill(proc)
+        raise RuntimeError(f'Fail to compute ckey with {self.js_file_path}')
 
 
 '''TencentVQQVideoClient: https://github.com/Jesseatgao/movie-downloader/blob/master/mdl/sites/vqq.py'''
@@ -69,6 +167,10 @@ class TencentVQQVideoClient(BaseVideoClient):
     CKEY_FOR_ENCRYPT_JS_FILE_PATH = Path(__file__).resolve().parents[2] / "modules" / "js" / "tencent" / f'vqq_ckey-{CKEY_FOR_ENCRYPT_VERION}.js'
     APP_VERSION = ENCRYPTVER_to_APPVER[CKEY_FOR_ENCRYPT_VERION]
     DEVICE_ID = "".join([f"{h:x}" for h in [math.floor(random.random() * 16) for _ in range(16)]])
+    CKEY_BATCH_SIZE = 8
+    CKEY_INPROCESS_RUNTIMES = {'8.5': TencentCKeyAESRuntime, '9.1': TencentCKeyWasmRuntime}
+    _ckey_node_worker: TencentCKeyNodeWorker = None
+    _ckey_node_lock = threading.Lock()
     def __init__(self, **kwargs):
         super(TencentVQQVideoClient, self).__init__(**kwargs)
         self.default_parse_headers = {
@@ -88,6 +190,19 @@ class TencentVQQVideoClient(BaseVideoClient):
             for cookie_name in login_token: login_token.update({cookie_name: cookies.get('vqq_' + cookie_name, '')})
         login_token['main_login'] = 'qq'
         return login_token
+    '''_computeckeys'''
+    @staticmethod
+    def _computeckeys(vid, vurl, referrer, num: int = 1) -> list[list[str]]:
+        # 8.5 is computed in python and 9.1 through ckey.wasm when wasmtime is installed, the node worker stays as the fallback
+        if (runtime_cls := TencentVQQVideoClient.CKEY_INPROCESS_RUNTIMES.get(TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION)) and runtime_cls.isavailable():
+            try: return runtime_cls.getinstance().computeckeys(TencentVQQVideoClient.QQVideoPlatforms.P10201, TencentVQQVideoClient.APP_VERSION, vid, vurl, referrer, num=num)
+            except Exception: pass
+        ckey_req = ' '.join([TencentVQQVideoClient.QQVideoPlatforms.P10201, TencentVQQVideoClient.APP_VERSION, vid, vurl, referrer])
+        # one resident node worker serves all parses, requests are matched by id so concurrent lookups overlap
+        with TencentVQQVideoClient._ckey_node_lock:
+            if TencentVQQVideoClient._ckey_node_worker is None: TencentVQQVideoClient._ckey_node_worker = TencentCKeyNodeWorker(TencentVQQVideoClient.CKEY_FOR_ENCRYPT_JS_FILE_PATH)
+        try: return TencentVQQVideoClient._ckey_node_worker.compute(ckey_req, num=num)
+        except RuntimeError as err: raise RuntimeError(f'Fail to compute ckey for {vid} with {TencentVQQVideoClient.CKEY_FOR_ENCRYPT_JS_FILE_PATH}') from err
     '''_getvideourlsp10801'''
     def _getvideourlsp10801(self, vid, definition, vurl, referrer, request_overrides: dict = None):
         urls, ext, format_name, request_overrides = [], None, None, request_overrides or {}
@@ -176,115 +291,103 @@ class TencentVQQVideoClient(BaseVideoClient):
     '''_getvideourlsp10201'''
     def _getvideourlsp10201(self, vid, definition, vurl, referrer, request_overrides: dict = None):
         urls, ext, format_name, request_overrides = [], None, None, request_overrides or {}
-        cmd_nodejs = ['node', TencentVQQVideoClient.CKEY_FOR_ENCRYPT_JS_FILE_PATH]
-        with subprocess.Popen(cmd_nodejs, bufsize=1, universal_newlines=True, encoding='utf-8', stdin=subprocess.PIPE, stdout=subprocess.PIPE) as node_proc:
-            ckey_req = ' '.join([TencentVQQVideoClient.QQVideoPlatforms.P10201, TencentVQQVideoClient.APP_VERSION, vid, vurl, referrer])
-            node_proc.stdin.write(ckey_req); node_proc.stdin.write(r'\n'); node_proc.stdin.flush()
-            ckey_resp = node_proc.stdout.readline().rstrip(r'\r\n'); ckey, tm, guid, flowid = ckey_resp.split()
-            vinfoparam = {
-                'otype': 'ojson', 'isHLS': 1, 'charge': 0, 'fhdswitch': 0, 'show1080p': 1, 'defnpayver': 7, 'sdtfrom': 'v1010', 'host': 'v.qq.com', 'vid': vid, 'defn': definition, 'platform': TencentVQQVideoClient.QQVideoPlatforms.P10201, 'appVer': TencentVQQVideoClient.APP_VERSION, 
-                'refer': referrer, 'ehost': vurl, 'logintoken': json.dumps(self._getlogintokenfromcookies(self.default_cookies), separators=(',', ':')), 'encryptVer': TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION, 'guid': guid, 'flowid': flowid, 'tm': tm, 'cKey': ckey, 'dtype': 1,
-            }
-            params = {'buid': 'vinfoad', 'vinfoparam': urlencode(vinfoparam)}
-            try:
-                (resp := self.post(TencentVQQVideoClient.VIDEO_CONFIG_URL, json=params, **request_overrides)).raise_for_status()
-                try: data: dict = (d := json.loads(resp.text)) and json.loads(d.get('vinfo'))
-                except json.JSONDecodeError as e: return format_name, ext, urls
-                if not (data and data.get('dltype')): return format_name, ext, urls
-                url_prefixes: list[str] = [url for d in safeextractfromdict(data, ['vl', 'vi', 0, 'ul', 'ui'], []) if isinstance(d, dict) and (url := d.get('url'))]
-                if not (chosen_url_prefixes := [prefix for prefix in url_prefixes if prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]): chosen_url_prefixes = url_prefixes
-                chosen_url_prefixes += [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
-                formats = {fmt.get('name'): fmt.get('id') for fmt in safeextractfromdict(data, ['fl', 'fi'], [])}
-                ret_defn = definition if definition in formats else self._pickhighestdefinition(formats)
-                new_format_id = formats.get(ret_defn) or TencentVQQVideoClient.VQQ_FORMAT_IDS_DEFAULT[TencentVQQVideoClient.QQVideoPlatforms.P10201][ret_defn]
-                vfilename = safeextractfromdict(data, ['vl', 'vi', 0, 'fn'], ''); vfn = vfilename.split('.'); ext = vfn[-1]
-                fmt_prefix = vfn[1][0] if len(vfn) == 3 else 'p'; vfmt_new = fmt_prefix + str(new_format_id % 10000)
-                orig_format_id = self._getorigformatid(data, TencentVQQVideoClient.QQVideoPlatforms.P10201)
-                fc = safeextractfromdict(data, ['vl', 'vi', 0, 'cl', 'fc'], None)
-                keyid: str = safeextractfromdict(data, ['vl', 'vi', 0, 'cl', 'ci', 0, 'keyid'], None) if fc else safeextractfromdict(data, ['vl', 'vi', 0, 'cl', 'keyid'], None)
-                keyid = keyid.split('.'); keyid[1] = str(orig_format_id); keyid = '.'.join(keyid); max_fc = 80
-                for idx in range(1, max_fc + 1):
-                    keyid_new = keyid.split('.'); keyid_new[0] = vfn[0]
-                    if len(keyid_new) == 3: keyid_new = '.'.join([keyid_new[0], vfmt_new, str(idx)])
-                    else: (int(keyid_new[1]) != new_format_id) and (vfn.__setitem__(1, vfn[1][0] + str(new_format_id)) if len(vfn) == 3 else vfn.insert(1, vfmt_new)); keyid_new = '.'.join(vfn[:-1])
-                    cfilename = f"{keyid_new}.{ext}"; ckey_req = ' '.join([TencentVQQVideoClient.QQVideoPlatforms.P10201, TencentVQQVideoClient.APP_VERSION, vid, vurl, referrer, r'\n'])
-                    node_proc.stdin.write(ckey_req); node_proc.stdin.flush()
-                    ckey_resp = node_proc.stdout.readline().rstrip(r'\r\n'); ckey, tm, guid, flowid = ckey_resp.split()
-                    vkeyparam = {'otype': 'ojson', 'vid': vid, 'format': new_format_id, 'filename': cfilename, 'platform': TencentVQQVideoClient.QQVideoPlatforms.P10201, 'appVer': TencentVQQVideoClient.APP_VERSION, 'sdtfrom': 'v1010', 'guid': guid, 'flowid': flowid, 'tm': tm, 'refer': referrer, 'ehost': vurl, 'logintoken': json.dumps(self._getlogintokenfromcookies(self.default_cookies), separators=(',', ':')), 'encryptVer': TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION, 'cKey': ckey}
-                    params = {'buid': 'onlyvkey', 'vkeyparam': urlencode(vkeyparam)}
-                    try:
-                        (resp := self.post(TencentVQQVideoClient.VIDEO_CONFIG_URL, json=params, **request_overrides)).raise_for_status()
-                        try: key_data: dict = (d := json.loads(resp.text)) and json.loads(d.get('vkey'))
-                        except json.JSONDecodeError: return format_name, ext, urls
-                        if key_data and isinstance(key_data, dict):
-                            if not key_data.get('key'): break
-                            keyid = key_data.get('keyid'); keyid_nseg = len(keyid.split('.'))
-                            if (fn := key_data.get('filename')): cfilename = ('.'.join((p := fn.split('.'))[:-1] + [str(idx), p[-1]]) if keyid_nseg == 3 else fn)
-                            url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010&vkey=%s' % (url_prefix, cfilename, key_data.get('key')) for url_prefix in chosen_url_prefixes])
-                            if url_mirrors: urls.append(url_mirrors)
-                            if fc == idx or (not fc and keyid_nseg != 3): break
-                    except:
-                        return format_name, ext, urls
-                if len(urls) > 0: format_name = ret_defn
-            except: pass
+        ckey, tm, guid, flowid = self._computeckeys(vid, vurl, referrer)[0]
+        vinfoparam = {
+            'otype': 'ojson', 'isHLS': 1, 'charge': 0, 'fhdswitch': 0, 'show1080p': 1, 'defnpayver': 7, 'sdtfrom': 'v1010', 'host': 'v.qq.com', 'vid': vid, 'defn': definition, 'platform': TencentVQQVideoClient.QQVideoPlatforms.P10201, 'appVer': TencentVQQVideoClient.APP_VERSION, 
+            'refer': referrer, 'ehost': vurl, 'logintoken': json.dumps(self._getlogintokenfromcookies(self.default_cookies), separators=(',', ':')), 'encryptVer': TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION, 'guid': guid, 'flowid': flowid, 'tm': tm, 'cKey': ckey, 'dtype': 1,
+        }
+        params = {'buid': 'vinfoad', 'vinfoparam': urlencode(vinfoparam)}
+        try:
+            (resp := self.post(TencentVQQVideoClient.VIDEO_CONFIG_URL, json=params, **request_overrides)).raise_for_status()
+            try: data: dict = (d := json.loads(resp.text)) and json.loads(d.get('vinfo'))
+            except json.JSONDecodeError as e: return format_name, ext, urls
+            if not (data and data.get('dltype')): return format_name, ext, urls
+            url_prefixes: list[str] = [url for d in safeextractfromdict(data, ['vl', 'vi', 0, 'ul', 'ui'], []) if isinstance(d, dict) and (url := d.get('url'))]
+            if not (chosen_url_prefixes := [prefix for prefix in url_prefixes if prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]): chosen_url_prefixes = url_prefixes
+            chosen_url_prefixes += [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
+            formats = {fmt.get('name'): fmt.get('id') for fmt in safeextractfromdict(data, ['fl', 'fi'], [])}
+            ret_defn = definition if definition in formats else self._pickhighestdefinition(formats)
+            new_format_id = formats.get(ret_defn) or TencentVQQVideoClient.VQQ_FORMAT_IDS_DEFAULT[TencentVQQVideoClient.QQVideoPlatforms.P10201][ret_defn]
+            vfilename = safeextractfromdict(data, ['vl', 'vi', 0, 'fn'], ''); vfn = vfilename.split('.'); ext = vfn[-1]
+            fmt_prefix = vfn[1][0] if len(vfn) == 3 else 'p'; vfmt_new = fmt_prefix + str(new_format_id % 10000)
+            orig_format_id = self._getorigformatid(data, TencentVQQVideoClient.QQVideoPlatforms.P10201)
+            fc = safeextractfromdict(data, ['vl', 'vi', 0, 'cl', 'fc'], None)
+            keyid: str = safeextractfromdict(data, ['vl', 'vi', 0, 'cl', 'ci', 0, 'keyid'], None) if fc else safeextractfromdict(data, ['vl', 'vi', 0, 'cl', 'keyid'], None)
+            keyid = keyid.split('.'); keyid[1] = str(orig_format_id); keyid = '.'.join(keyid); max_fc, ckeys = 80, []
+            for idx in range(1, max_fc + 1):
+                keyid_new = keyid.split('.'); keyid_new[0] = vfn[0]
+                if len(keyid_new) == 3: keyid_new = '.'.join([keyid_new[0], vfmt_new, str(idx)])
+                else: (int(keyid_new[1]) != new_format_id) and (vfn.__setitem__(1, vfn[1][0] + str(new_format_id)) if len(vfn) == 3 else vfn.insert(1, vfmt_new)); keyid_new = '.'.join(vfn[:-1])
+                cfilename = f"{keyid_new}.{ext}"; ckeys = ckeys or self._computeckeys(vid, vurl, referrer, num=max(1, min(TencentVQQVideoClient.CKEY_BATCH_SIZE, (fc or 1) - idx + 1))); ckey, tm, guid, flowid = ckeys.pop(0)
+                vkeyparam = {'otype': 'ojson', 'vid': vid, 'format': new_format_id, 'filename': cfilename, 'platform': TencentVQQVideoClient.QQVideoPlatforms.P10201, 'appVer': TencentVQQVideoClient.APP_VERSION, 'sdtfrom': 'v1010', 'guid': guid, 'flowid': flowid, 'tm': tm, 'refer': referrer, 'ehost': vurl, 'logintoken': json.dumps(self._getlogintokenfromcookies(self.default_cookies), separators=(',', ':')), 'encryptVer': TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION, 'cKey': ckey}
+                params = {'buid': 'onlyvkey', 'vkeyparam': urlencode(vkeyparam)}
+                try:
+                    (resp := self.post(TencentVQQVideoClient.VIDEO_CONFIG_URL, json=params, **request_overrides)).raise_for_status()
+                    try: key_data: dict = (d := json.loads(resp.text)) and json.loads(d.get('vkey'))
+                    except json.JSONDecodeError: return format_name, ext, urls
+                    if key_data and isinstance(key_data, dict):
+                        if not key_data.get('key'): break
+                        keyid = key_data.get('keyid'); keyid_nseg = len(keyid.split('.'))
+                        if (fn := key_data.get('filename')): cfilename = ('.'.join((p := fn.split('.'))[:-1] + [str(idx), p[-1]]) if keyid_nseg == 3 else fn)
+                        url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010&vkey=%s' % (url_prefix, cfilename, key_data.get('key')) for url_prefix in chosen_url_prefixes])
+                        if url_mirrors: urls.append(url_mirrors)
+                        if fc == idx or (not fc and keyid_nseg != 3): break
+                except:
+                    return format_name, ext, urls
+            if len(urls) > 0: format_name = ret_defn
+        except: pass
         return format_name, ext, urls
     '''_getvideourlsp10201ts'''
     def _getvideourlsp10201ts(self, vid, definition, vurl, referrer, request_overrides: dict = None):
         urls, ext, format_name, request_overrides = [], None, None, request_overrides or {}
-        cmd_nodejs = ['node', TencentVQQVideoClient.CKEY_FOR_ENCRYPT_JS_FILE_PATH]
-        with subprocess.Popen(cmd_nodejs, bufsize=1, universal_newlines=True, encoding='utf-8', stdin=subprocess.PIPE, stdout=subprocess.PIPE) as node_proc:
-            ckey_req = ' '.join([TencentVQQVideoClient.QQVideoPlatforms.P10201, TencentVQQVideoClient.APP_VERSION, vid, vurl, referrer])
-            node_proc.stdin.write(ckey_req); node_proc.stdin.write(r'\n'); node_proc.stdin.flush()
-            ckey_resp = node_proc.stdout.readline().rstrip(r'\r\n'); ckey, tm, guid, flowid = ckey_resp.split()
-            vinfoparam = {
-                'otype': 'ojson', 'isHLS': 1, 'charge': 0, 'fhdswitch': 0, 'show1080p': 1, 'defnpayver': 7, 'sdtfrom': 'v1010', 'host': 'v.qq.com', 'vid': vid, 'defn': definition, 'platform': TencentVQQVideoClient.QQVideoPlatforms.P10201, 'appVer': TencentVQQVideoClient.APP_VERSION,
-                'refer': referrer, 'ehost': vurl, 'logintoken': json.dumps(self._getlogintokenfromcookies(self.default_cookies), separators=(',', ':')), 'encryptVer': TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION, 'guid': guid, 'flowid': flowid, 'tm': tm, 'cKey': ckey, 'dtype': 3,
-                'spau': 1, 'spaudio': 68, 'spwm': 1, 'sphls': 2, 'sphttps': 1, 'clip': 4, 'spsrt': 2, 'spvvpay': 1, 'spadseg': 3, 'spav1': 15, 'hevclv': 28, 'spsfrhdr': 100, 'spvideo': 1044,
-            }
-            params = {'buid': 'vinfoad', 'vinfoparam': urlencode(vinfoparam)}
-            try:
-                (resp := self.post(TencentVQQVideoClient.VIDEO_CONFIG_URL, json=params, **request_overrides)).raise_for_status()
-                try: data: dict = (d := json.loads(resp.text)) and json.loads(d.get('vinfo'))
-                except json.JSONDecodeError as e: return format_name, ext, urls
-                if not (data and data.get('dltype')): return format_name, ext, urls
-                url_prefixes = [(u if u.endswith('/') else u[:u.rfind('/') + 1]) for d in safeextractfromdict(data, ['vl', 'vi', 0, 'ul', 'ui'], []) if isinstance(d, dict) and (u := d.get('url'))]
-                chosen_url_prefixes = [prefix for prefix in url_prefixes if prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]
-                if not chosen_url_prefixes: chosen_url_prefixes = url_prefixes
-                chosen_url_prefixes += [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
-                drm, preview = safeextractfromdict(data, ['vl', 'vi', 0, 'drm'], None), data.get('preview')
-                formats_id2nm = {fmt.get('id'): fmt.get('name') for fmt in safeextractfromdict(data, ['fl', 'fi'], [])}
-                formats_nm2id = {fmt_nm: fmt_id for fmt_id, fmt_nm in formats_id2nm.items()}
-                keyid = safeextractfromdict(data, ['vl', 'vi', 0, 'keyid'], ''); vfilename = safeextractfromdict(data, ['vl', 'vi', 0, 'fn'], '')
-                vfn = vfilename.rpartition('.'); ext = vfn[-1]; ret_defn = ''
-                if ext == 'ts':
-                    if drm == 1 and not preview and not self.default_cookies: return format_name, ext, urls
-                    key_format_id = keyid.split('.')[-1]
-                    try: key_format_id = int(key_format_id); ret_defn = formats_id2nm.get(key_format_id) or ret_defn
-                    except ValueError: pass
-                    if not ret_defn:
-                        for format_defn in self._sortdefinitions(formats_nm2id):
-                            format_id = formats_nm2id.get(format_defn)
-                            ckey_req = ' '.join([TencentVQQVideoClient.QQVideoPlatforms.P10201, TencentVQQVideoClient.APP_VERSION, vid, vurl, referrer, r'\n'])
-                            node_proc.stdin.write(ckey_req); node_proc.stdin.flush()
-                            ckey_resp = node_proc.stdout.readline().rstrip(r'\r\n'); ckey, tm, guid, flowid = ckey_resp.split()
-                            vkeyparam = {'otype': 'ojson', 'vid': vid, 'format': format_id, 'filename': vfilename, 'platform': TencentVQQVideoClient.QQVideoPlatforms.P10201, 'appVer': TencentVQQVideoClient.APP_VERSION, 'sdtfrom': 'v1010', 'guid': guid, 'flowid': flowid, 'tm': tm, 'refer': referrer, 'ehost': vurl, 'logintoken': json.dumps(self._getlogintokenfromcookies(self.default_cookies), separators=(',', ':')), 'encryptVer': TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION, 'cKey': ckey}
-                            params = {'buid': 'onlyvkey', 'vkeyparam': urlencode(vkeyparam)}
-                            try:
-                                (resp := self.post(TencentVQQVideoClient.VIDEO_CONFIG_URL, json=params, **request_overrides)).raise_for_status()
-                                try: key_data: dict = (d := json.loads(resp.text)) and json.loads(d.get('vkey'))
-                                except json.JSONDecodeError: return format_name, ext, urls
-                                if key_data and isinstance(key_data, dict):
-                                    if not key_data.get('key'): return format_name, ext, urls
-                                    if key_data.get('filename', '') and key_data.get('filename', '') == vfilename: ret_defn = format_defn; break
-                            except:
-                                return format_name, ext, urls
-                    fc = safeextractfromdict(data, ['vl', 'vi', 0, 'fc'], None); start = 1
-                    for idx in range(start, fc + 1): vfilename_new = '.'.join([vfn[0], str(idx), 'ts']); url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010' % (prefix, vfilename_new) for prefix in chosen_url_prefixes]); urls.append(url_mirrors)
-                else:
-                    if drm == 1 and not self.default_cookies: return format_name, ext, urls
-                    return self._getvideourlsp10201(vid, definition, vurl, referrer, request_overrides)
-                format_name = ret_defn
-            except: pass
+        ckey, tm, guid, flowid = self._computeckeys(vid, vurl, referrer)[0]
+        vinfoparam = {
+            'otype': 'ojson', 'isHLS': 1, 'charge': 0, 'fhdswitch': 0, 'show1080p': 1, 'defnpayver': 7, 'sdtfrom': 'v1010', 'host': 'v.qq.com', 'vid': vid, 'defn': definition, 'platform': TencentVQQVideoClient.QQVideoPlatforms.P10201, 'appVer': TencentVQQVideoClient.APP_VERSION,
+            'refer': referrer, 'ehost': vurl, 'logintoken': json.dumps(self._getlogintokenfromcookies(self.default_cookies), separators=(',', ':')), 'encryptVer': TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION, 'guid': guid, 'flowid': flowid, 'tm': tm, 'cKey': ckey, 'dtype': 3,
+            'spau': 1, 'spaudio': 68, 'spwm': 1, 'sphls': 2, 'sphttps': 1, 'clip': 4, 'spsrt': 2, 'spvvpay': 1, 'spadseg': 3, 'spav1': 15, 'hevclv': 28, 'spsfrhdr': 100, 'spvideo': 1044,
+        }
+        params = {'buid': 'vinfoad', 'vinfoparam': urlencode(vinfoparam)}
+        try:
+            (resp := self.post(TencentVQQVideoClient.VIDEO_CONFIG_URL, json=params, **request_overrides)).raise_for_status()
+            try: data: dict = (d := json.loads(resp.text)) and json.loads(d.get('vinfo'))
+            except json.JSONDecodeError as e: return format_name, ext, urls
+            if not (data and data.get('dltype')): return format_name, ext, urls
+            url_prefixes = [(u if u.endswith('/') else u[:u.rfind('/') + 1]) for d in safeextractfromdict(data, ['vl', 'vi', 0, 'ul', 'ui'], []) if isinstance(d, dict) and (u := d.get('url'))]
+            chosen_url_prefixes = [prefix for prefix in url_prefixes if prefix[:prefix.find('/', 8)].endswith('.tc.qq.com')]
+            if not chosen_url_prefixes: chosen_url_prefixes = url_prefixes
+            chosen_url_prefixes += [prefix for prefix in url_prefixes if prefix not in chosen_url_prefixes]
+            drm, preview = safeextractfromdict(data, ['vl', 'vi', 0, 'drm'], None), data.get('preview')
+            formats_id2nm = {fmt.get('id'): fmt.get('name') for fmt in safeextractfromdict(data, ['fl', 'fi'], [])}
+            formats_nm2id = {fmt_nm: fmt_id for fmt_id, fmt_nm in formats_id2nm.items()}
+            keyid = safeextractfromdict(data, ['vl', 'vi', 0, 'keyid'], ''); vfilename = safeextractfromdict(data, ['vl', 'vi', 0, 'fn'], '')
+            vfn = vfilename.rpartition('.'); ext = vfn[-1]; ret_defn = ''
+            if ext == 'ts':
+                if drm == 1 and not preview and not self.default_cookies: return format_name, ext, urls
+                key_format_id = keyid.split('.')[-1]
+                try: key_format_id = int(key_format_id); ret_defn = formats_id2nm.get(key_format_id) or ret_defn
+                except ValueError: pass
+                if not ret_defn:
+                    sorted_defns = self._sortdefinitions(formats_nm2id); ckeys = self._computeckeys(vid, vurl, referrer, num=len(sorted_defns)) if sorted_defns else []
+                    for format_defn, (ckey, tm, guid, flowid) in zip(sorted_defns, ckeys):
+                        format_id = formats_nm2id.get(format_defn)
+                        vkeyparam = {'otype': 'ojson', 'vid': vid, 'format': format_id, 'filename': vfilename, 'platform': TencentVQQVideoClient.QQVideoPlatforms.P10201, 'appVer': TencentVQQVideoClient.APP_VERSION, 'sdtfrom': 'v1010', 'guid': guid, 'flowid': flowid, 'tm': tm, 'refer': referrer, 'ehost': vurl, 'logintoken': json.dumps(self._getlogintokenfromcookies(self.default_cookies), separators=(',', ':')), 'encryptVer': TencentVQQVideoClient.CKEY_FOR_ENCRYPT_VERION, 'cKey': ckey}
+                        params = {'buid': 'onlyvkey', 'vkeyparam': urlencode(vkeyparam)}
+                        try:
+                            (resp := self.post(TencentVQQVideoClient.VIDEO_CONFIG_URL, json=params, **request_overrides)).raise_for_status()
+                            try: key_data: dict = (d := json.loads(resp.text)) and json.loads(d.get('vkey'))
+                            except json.JSONDecodeError: return format_name, ext, urls
+                            if key_data and isinstance(key_data, dict):
+                                if not key_data.get('key'): return format_name, ext, urls
+                                if key_data.get('filename', '') and key_data.get('filename', '') == vfilename: ret_defn = format_defn; break
+                        except:
+                            return format_name, ext, urls
+                fc = safeextractfromdict(data, ['vl', 'vi', 0, 'fc'], None); start = 1
+                for idx in range(start, fc + 1): vfilename_new = '.'.join([vfn[0], str(idx), 'ts']); url_mirrors = '\t'.join(['%s%s?sdtfrom=v1010' % (prefix, vfilename_new) for prefix in chosen_url_prefixes]); urls.append(url_mirrors)
+            else:
+                if drm == 1 and not self.default_cookies: return format_name, ext, urls
+                return self._getvideourlsp10201(vid, definition, vurl, referrer, request_overrides)
+            format_name = ret_defn
+        except: pass
         return format_name, ext, urls
     '''_getvideourls'''
     def _getvideourls(self, vid, definition, vurl, referrer, request_overrides: dict = None):
@@ -417,7 +520,7 @@ class TencentVQQVideoClient(BaseVideoClient):
                     if not format_name: progress.advance(1); continue
                     raw_data['download_info'] = {'format_name': format_name, 'ext': ext, 'urls': urls}
                     download_url = os.path.join(self.work_dir, self.source, f"{raw_data['cover_id']}-{extracted_normal_id['V']}.m3u8")
-                    TencentHLSHelper.writevodm3u8(segments=urls, out_path=download_url, pick="best", strategy="global_host", probe_timeout=3.0, samples_per_host=2, probe_workers=16, probe_method="head_then_range_get")
+                    TencentHLSHelper.writevodm3u8(segments=urls, out_path=download_url, pick="best", strategy="global_host", probe_timeout=3.0, samples_per_host=2, probe_workers=16, probe_method="range_get_only", range_bytes=262144)
                     video_info_page.update(dict(raw_data=raw_data, download_url=download_url, title=f'EP{len(video_infos)+1}-{video_title}' if len(basic_info['normal_ids']) > 1 else video_title, save_path=os.path.join(self.work_dir, self.source, f'EP{len(video_infos)+1}-{video_title}' if len(basic_info['normal_ids']) > 1 else video_title), ext=ext, identifier=f"{raw_data['cover_id']}-{extracted_normal_id['V']}", enable_nm3u8dlre=True, cover_url=raw_data.get('image_url'))); video_infos.append(video_info_page); progress.advance(1)
         except Exception as err:
             video_info.update(dict(err_msg=(err_msg := f'{self.source}.parsefromurl >>> {url} (Error: {err})'))); video_infos.append(video_info)
@@ -434,6 +537,8 @@ class TencentVQQVideoClient(BaseVideoClient):
 '''TencentVideoClient'''
 class TencentVideoClient(BaseVideoClient):
     source = 'TencentVideoClient'
+    MAX_QUALITY_PROBE_WORKERS = 4
+    QUALITY_LADDER = ('suhd', 'uhd', 'dolby', 'hdr10', 'fhd', 'shd', 'hd', 'sd', 'ld')
     def __init__(self, **kwargs):
         super(TencentVideoClient, self).__init__(**kwargs)
         self.vqq_video_client = TencentVQQVideoClient(**kwargs); self.vqq_video_client.source = self.source
@@ -549,8 +654,10 @@ class TencentVideoClient(BaseVideoClient):
                 fmts, subs = TencentHLSHelper.naiveparsem3u8formats(url + (hls_info.get('pt', '') if isinstance(hls_info, dict) else '')); formats.extend(fmts)
                 for lang, sub_list in subs.items(): subtitles.setdefault(lang, []).extend(sub_list)
             else:
+                # every ui host serves the same progressive file, they are kept as ordered mirrors of one format instead of separate formats
                 fn = video_response.get('fn', ''); fvkey = video_response.get('fvkey', '')
-                formats.append({'url': f'{url}{fn}?vkey={fvkey}', 'ext': 'mp4'})
+                if (progressive_fmt := next((f for f in formats if 'mirrors' in f), None)): progressive_fmt['mirrors'].append(f'{url}{fn}?vkey={fvkey}'); continue
+                formats.append({'url': f'{url}{fn}?vkey={fvkey}', 'ext': 'mp4', 'mirrors': []})
         identifier, format_response = video_response.get('br'), {}
         for fi in traverseobj(api_response, ('fl', 'fi')) or []:
             if isinstance(fi, dict) and fi.get('br') == identifier: format_response = fi; break
@@ -564,17 +671,34 @@ class TencentVideoClient(BaseVideoClient):
             if not isinstance(subtitle, dict): continue
             subtitles.setdefault(subtitle.get('lang', 'unknown').lower(), []).append({'url': subtitle.get('url', ''), 'ext': 'srt' if subtitle.get('captionType') == 1 else 'vtt', 'protocol': 'm3u8_native' if naivedetermineext(subtitle.get('url', '')) == 'm3u8' else 'http'})
         return subtitles
+    '''_probevideoquality'''
+    def _probevideoquality(self, api_url, url, video_id, series_id, subtitle_format, video_quality, host, referer, app_version, platform, request_overrides: dict = None):
+        api_response = self._getvideoapiresponse(api_url, url, video_id, series_id, subtitle_format, 'hls', video_quality, host, referer, app_version, platform, request_overrides)
+        fmts, subs = self._extractvideoformatsandsubtitles(api_response)
+        return fmts, {**subs, **self._extractvideonativesubtitles(api_response)}
     '''_extractallvideoformatsandsubtitles'''
     def _extractallvideoformatsandsubtitles(self, api_url, url, video_id, series_id, host, referer, app_version, platform, request_overrides: dict = None):
-        api_responses = [self._getvideoapiresponse(api_url, url, video_id, series_id, 'srt', 'hls', 'hd', host, referer, app_version, platform, request_overrides)]
-        qualities = traverseobj(api_responses, (0, 'fl', 'fi', ..., 'name'))
+        probe_args, probe_results = (host, referer, app_version, platform, request_overrides), []
+        api_response = self._getvideoapiresponse(api_url, url, video_id, series_id, 'srt', 'hls', 'hd', host, referer, app_version, platform, request_overrides)
+        fmts, subs = self._extractvideoformatsandsubtitles(api_response); probe_results.append((fmts, {**subs, **self._extractvideonativesubtitles(api_response)}))
+        qualities = traverseobj(api_response, ('fl', 'fi', ..., 'name'))
         if not qualities: qualities = ['shd', 'fhd']
-        for q in qualities:
-            if q not in ('ld', 'sd', 'hd'): api_responses.append(self._getvideoapiresponse(api_url, url, video_id, series_id, 'vtt', 'hls', q, host, referer, app_version, platform, request_overrides))
+        qualities = sorted(dict.fromkeys(q for q in qualities if q not in ('ld', 'sd', 'hd')), key=lambda q: TencentVideoClient.QUALITY_LADDER.index(q) if q in TencentVideoClient.QUALITY_LADDER else len(TencentVideoClient.QUALITY_LADDER))
+        # probe the ladder concurrently and stop waiting once the best quality is confirmed as playable
+        if qualities:
+            executor = ThreadPoolExecutor(max_workers=min(len(qualities), TencentVideoClient.MAX_QUALITY_PROBE_WORKERS), thread_name_prefix='videodl-tencent-probe')
+            futures = [executor.submit(self._probevideoquality, api_url, url, video_id, series_id, 'vtt', q, *probe_args) for q in qualities]
+            try:
+                for idx, future in enumerate(futures):
+                    try: probe_results.append(future.result())
+                    except Exception: continue
+                    if any(not f.get('has_drm') for f in probe_results[-1][0]): probe_results.extend(f.result() for f in futures[idx+1:] if f.done() and not f.cancelled() and not f.exception()); break
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
         formats, subtitles = [], {}
-        for api_response in api_responses:
-            fmts, subs = self._extractvideoformatsandsubtitles(api_response); native_subs = self._extractvideonativesubtitles(api_response); formats.extend(fmts)
-            for lang, sub_list in {**subs, **native_subs}.items(): subtitles.setdefault(lang, []).extend(sub_list)
+        for fmts, subs in probe_results:
+            formats.extend(fmts)
+            for lang, sub_list in subs.items(): subtitles.setdefault(lang, []).extend(sub_list)
         return formats, subtitles
     '''_getvqqwebpagemetadata'''
     def _getvqqwebpagemetadata(self, webpage):
@@ -663,12 +787,12 @@ class TencentVideoClient(BaseVideoClient):
                 video_infos = []; raw_data = self._vqqextractvideo(url, request_overrides=request_overrides)
                 formats: list[dict] = raw_data['formats']; formats.sort(key=lambda f: ((f.get('width') or 0) * (f.get('height') or 0), f.get('vbr') or 0, f.get('abr') or 0, f.get('fps') or 0), reverse=True)
                 download_url, video_title = formats[0]['url'], legalizestring(raw_data.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                video_info.update(dict(raw_data=raw_data, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=raw_data['id'], enable_nm3u8dlre=True, cover_url=raw_data.get('thumbnail'))); video_infos.append(video_info)
+                video_info.update(dict(raw_data=raw_data, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=raw_data['id'], enable_nm3u8dlre=True, cover_url=raw_data.get('thumbnail'), download_url_mirrors=formats[0].get('mirrors') or [])); video_infos.append(video_info)
             elif re.match(r'https?://(?:www\.)?wetv\.vip/(?:[^?#]+/)?play' + r'/(?P<series_id>\w+)(?:-[^?#]+)?/(?P<id>\w+)(?:-[^?#]+)?', url):
                 raw_data = self._wetvextractepisode(url, request_overrides=request_overrides)
                 formats: list[dict] = raw_data['formats']; formats.sort(key=lambda f: ((f.get('width') or 0) * (f.get('height') or 0), f.get('vbr') or 0, f.get('abr') or 0, f.get('fps') or 0), reverse=True)
                 download_url, video_title = formats[0]['url'], legalizestring(raw_data.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                video_info.update(dict(raw_data=raw_data, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=raw_data['id'], enable_nm3u8dlre=True, cover_url=raw_data.get('thumbnail'))); video_infos.append(video_info)
+                video_info.update(dict(raw_data=raw_data, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=raw_data['id'], enable_nm3u8dlre=True, cover_url=raw_data.get('thumbnail'), download_url_mirrors=formats[0].get('mirrors') or [])); video_infos.append(video_info)
             elif re.match(r'https?://(?:www\.)?wetv\.vip/(?:[^?#]+/)?play' + r'/(?P<id>\w+)(?:-[^/?#]+)?/?(?:[?#]|$)', url):
                 raw_data = self._wetvextractseries(url, request_overrides=request_overrides)
                 if not (extracted_video_items := raw_data.get('entries')): return [video_info]
@@ -677,12 +801,12 @@ class TencentVideoClient(BaseVideoClient):
                         raw_data_item = self._wetvextractepisode(extracted_video_item, request_overrides=request_overrides)
                         formats: list[dict] = raw_data_item['formats']; formats.sort(key=lambda f: ((f.get('width') or 0) * (f.get('height') or 0), f.get('vbr') or 0, f.get('abr') or 0, f.get('fps') or 0), reverse=True)
                         download_url, video_title = formats[0]['url'], legalizestring(raw_data_item.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                        (video_info_item := copy.deepcopy(video_info)).update(dict(raw_data=raw_data_item, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=f"{raw_data['id']}-{raw_data_item['id']}", enable_nm3u8dlre=True, cover_url=raw_data_item.get('thumbnail'))); video_infos.append(video_info_item); progress.advance(1)
+                        (video_info_item := copy.deepcopy(video_info)).update(dict(raw_data=raw_data_item, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=f"{raw_data['id']}-{raw_data_item['id']}", enable_nm3u8dlre=True, cover_url=raw_data_item.get('thumbnail'), download_url_mirrors=formats[0].get('mirrors') or [])); video_infos.append(video_info_item); progress.advance(1)
             elif re.match(r'https?://(?:www\.)?iflix\.com/(?:[^?#]+/)?play' + r'/(?P<series_id>\w+)(?:-[^?#]+)?/(?P<id>\w+)(?:-[^?#]+)?', url):
                 raw_data = self._iflixextractepisode(url, request_overrides=request_overrides)
                 formats: list[dict] = raw_data['formats']; formats.sort(key=lambda f: ((f.get('width') or 0) * (f.get('height') or 0), f.get('vbr') or 0, f.get('abr') or 0, f.get('fps') or 0), reverse=True)
                 download_url, video_title = formats[0]['url'], legalizestring(raw_data.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                video_info.update(dict(raw_data=raw_data, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=raw_data['id'], enable_nm3u8dlre=True, cover_url=raw_data.get('thumbnail'))); video_infos.append(video_info)
+                video_info.update(dict(raw_data=raw_data, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=raw_data['id'], enable_nm3u8dlre=True, cover_url=raw_data.get('thumbnail'), download_url_mirrors=formats[0].get('mirrors') or [])); video_infos.append(video_info)
             elif re.match(r'https?://(?:www\.)?iflix\.com/(?:[^?#]+/)?play' + r'/(?P<id>\w+)(?:-[^/?#]+)?/?(?:[?#]|$)', url):
                 raw_data = self._iflixextractseries(url, request_overrides=request_overrides)
                 if not (extracted_video_items := raw_data.get('entries')): return [video_info]
@@ -691,7 +815,7 @@ class TencentVideoClient(BaseVideoClient):
                         raw_data_item = self._iflixextractepisode(extracted_video_item, request_overrides=request_overrides)
                         formats: list[dict] = raw_data_item['formats']; formats.sort(key=lambda f: ((f.get('width') or 0) * (f.get('height') or 0), f.get('vbr') or 0, f.get('abr') or 0, f.get('fps') or 0), reverse=True)
                         download_url, video_title = formats[0]['url'], legalizestring(raw_data_item.get('title') or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
-                        (video_info_item := copy.deepcopy(video_info)).update(dict(raw_data=raw_data_item, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=f"{raw_data['id']}-{raw_data_item['id']}", enable_nm3u8dlre=True, cover_url=raw_data_item.get('thumbnail'))); video_infos.append(video_info_item); progress.advance(1)
+                        (video_info_item := copy.deepcopy(video_info)).update(dict(raw_data=raw_data_item, download_url=download_url, title=video_title, save_path=os.path.join(self.work_dir, self.source, video_title), ext='mp4', identifier=f"{raw_data['id']}-{raw_data_item['id']}", enable_nm3u8dlre=True, cover_url=raw_data_item.get('thumbnail'), download_url_mirrors=formats[0].get('mirrors') or [])); video_infos.append(video_info_item); progress.advance(1)
         except Exception as err:
             video_info.update(dict(err_msg=(err_msg := f'{self.source}.parsefromurl >>> {url} (Error: {err})'))); video_infos.append(video_info)
             self.logger_handle.error(err_msg, disable_print=self.disable_print)
@@ -11,7 +11,7 @@ import re
 from pathlib import Path
 from contextlib import suppress
 from .base import BaseVideoClient
-from ..utils import initcdm, closecdm
+from ..utils import acquirecontentkeys, ContentKeyStore
 from ..utils.cmd import DownloadWithNM3U8DLRECommand
 from urllib.parse import urlparse, urlencode, urlunparse
 from ..utils import legalizestring, useparseheaderscookies, yieldtimerelatedtitle, resp2json, safeextractfromdict, VideoInfo
@@ -35,6 +35,7 @@ class WittyTVVideoClient(BaseVideoClient):
         self.default_parse_headers = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"}
         self.default_download_headers = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"}
         self.default_headers = self.default_parse_headers
+        self.content_key_store = ContentKeyStore(cache_dir=os.path.join(self.work_dir, '.credentials'), namespace=f'{self.source}.widevine')
         self._initsession()
     '''_getbearertoken'''
     def _getbearertoken(self, request_overrides: dict = None):
@@ -70,10 +71,12 @@ class WittyTVVideoClient(BaseVideoClient):
                 with suppress(Exception): candidate_url = urlunparse(parsed_url._replace(path="/".join([*path_parts[:-1], "_".join([resolution, *suffix_parts])]))); (resp := self.get(f"{candidate_url}?formats={media_selector['formats']}", **request_overrides)).raise_for_status(); pssh = min(re.findall(r"<cenc:pssh>(.+?)</cenc:pssh>", resp.text), key=len, default=None); result = (candidate_url, str(pssh) if pssh else None); break
             download_url, pssh_value = result; video_info.update(dict(download_url=download_url))
             release_pid, account = re.search(r"\|pid=(.*?)\|", raw_data['MANIFEST_URL_RESPONSE']).group(1), re.search(r"aid=(.*?)\|", raw_data['MANIFEST_URL_RESPONSE']).group(1)
-            cdm, cdm_session_id, challenge = initcdm(pssh_value, WittyTVVideoClient.CDM_WVD_FILE_PATH)
-            (licence := self.post(WittyTVVideoClient.LICENSE_URL, data=challenge, params={'releasePid': release_pid, 'account': WittyTVVideoClient.ACCOUNT_URL.format(a_id=account), 'schema': '1.0', 'token': self.BEARER_TOKEN}, **request_overrides)).raise_for_status()
-            raw_data['LICENSE_URL_RESPONSE'] = licence.content; video_info.update(dict(raw_data=raw_data))
-            key = list(set(closecdm(cdm, cdm_session_id, licence.content)))[0]
+            '''_fetchlicense'''
+            def _fetchlicense(challenge: bytes, pssh_value: str) -> bytes:
+                (licence := self.post(WittyTVVideoClient.LICENSE_URL, data=challenge, params={'releasePid': release_pid, 'account': WittyTVVideoClient.ACCOUNT_URL.format(a_id=account), 'schema': '1.0', 'token': self.BEARER_TOKEN}, **request_overrides)).raise_for_status()
+                raw_data['LICENSE_URL_RESPONSE'] = licence.content
+                return licence.content
+            key = acquirecontentkeys([pssh_value], WittyTVVideoClient.CDM_WVD_FILE_PATH, _fetchlicense, key_store=self.content_key_store)[0]; video_info.update(dict(raw_data=raw_data))
             cover_url = safeextractfromdict(raw_data, ['PROGRAM_URL_RESPONSE', 'thumbnails', 'image_horizontal_cover-704x396', 'url'], None)
             video_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{video_info.ext}'), identifier=content_id, nm3u8dlre_settings=DownloadWithNM3U8DLRECommand.addkeyafterretry(key_value=key), cover_url=cover_url)); video_infos.append(video_info)
         except Exception as err:
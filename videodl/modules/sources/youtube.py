@@ -7,23 +7,78 @@ WeChat Official Account (微信公众号):
     Charles的皮卡丘
 '''
 import os
+import time
 import requests
+import threading
 from contextlib import suppress
 from .base import BaseVideoClient
+from typing import Callable, Optional
+from requests.adapters import HTTPAdapter
 from ..utils.youtubeutils import YouTube
 from urllib.parse import parse_qs, urlparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from ..utils import legalizestring, useparseheaderscookies, yieldtimerelatedtitle, safeextractfromdict, resp2json, floatornone, VideoInfo
 
 
 '''YouTubeVideoClient'''
 class YouTubeVideoClient(BaseVideoClient):
     source = 'YouTubeVideoClient'
+    PROBE_TIMEOUT = 10
+    MAX_PROBE_WORKERS = 4
+    RESOLVER_HEDGE_DELAY = 2.0
+    NATIVE_HEDGE_DELAY = 4.0
+    RESOLVER_MAX_FAILURES = 2
+    RESOLVER_COOLDOWN = 600.0
+    _probe_session: requests.Session = None
+    _resolver_health: dict[str, dict] = {}
+    _lock = threading.Lock()
     def __init__(self, **kwargs):
         super(YouTubeVideoClient, self).__init__(**kwargs)
         self.default_parse_headers = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/146.0.0.0 Safari/537.36"}
         self.default_download_headers = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/146.0.0.0 Safari/537.36"}
         self.default_headers = self.default_parse_headers
         self._initsession()
+    '''_getprobesession'''
+    @staticmethod
+    def _getprobesession() -> requests.Session:
+        with YouTubeVideoClient._lock:
+            if YouTubeVideoClient._probe_session is None:
+                (session := requests.Session()).mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16)); session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+                YouTubeVideoClient._probe_session = session
+            return YouTubeVideoClient._probe_session
+    '''_isresolverhealthy'''
+    @staticmethod
+    def _isresolverhealthy(name: str) -> bool:
+        with YouTubeVideoClient._lock: health = dict(YouTubeVideoClient._resolver_health.get(name) or {})
+        # a dead resolver is skipped until its cooldown expires, then it gets one more chance
+        return health.get('failures', 0) < YouTubeVideoClient.RESOLVER_MAX_FAILURES or time.time() - health.get('failed_at', 0.0) > YouTubeVideoClient.RESOLVER_COOLDOWN
+    '''_recordresolver'''
+    @staticmethod
+    def _recordresolver(name: str, success: bool):
+        with YouTubeVideoClient._lock:
+            health = YouTubeVideoClient._resolver_health.setdefault(name, {'failures': 0, 'failed_at': 0.0})
+            if success: health.update(failures=0)
+            else: health.update(failures=health['failures'] + 1, failed_at=time.time())
+    '''_probeurl'''
+    def _probeurl(self, url: str, headers: dict, request_overrides: dict = None) -> bool:
+        (stream_headers := dict(headers)).update({"Range": "bytes=0-0"}); request_overrides = {'timeout': self.PROBE_TIMEOUT, **(request_overrides or {})}
+        with self._getprobesession().get(url, stream=True, headers=stream_headers, allow_redirects=True, verify=False, **request_overrides) as resp: resp.raise_for_status()
+        return True
+    '''_pickfirstvisitable'''
+    def _pickfirstvisitable(self, medias: list[dict], resolve_func: Callable[[dict], tuple[str, str]], headers: dict, request_overrides: dict = None) -> Optional[tuple[str, str]]:
+        if not medias: return None
+        def _resolveandprobe(media: dict):
+            download_url, ext = resolve_func(media); self._probeurl(download_url, headers, request_overrides)
+            return download_url, ext
+        executor = ThreadPoolExecutor(max_workers=min(self.MAX_PROBE_WORKERS, len(medias)), thread_name_prefix='videodl-youtube-probe')
+        try:
+            futures = [executor.submit(_resolveandprobe, media) for media in medias]
+            # medias are sorted best first, so the first one in order that validates is the best usable quality
+            for future in futures:
+                with suppress(Exception): return future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return None
     '''_parsefromurlwithytdown'''
     def _parsefromurlwithytdown(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
         # prepare
@@ -32,23 +87,17 @@ class YouTubeVideoClient(BaseVideoClient):
         headers = {"origin": "https://app.ytdown.to", "referer": "https://app.ytdown.to/en27/", "sec-ch-ua": "\"Google Chrome\";v=\"147\", \"Not.A/Brand\";v=\"8\", \"Chromium\";v=\"147\"", "sec-ch-ua-mobile": "?0", "sec-ch-ua-platform": "\"Windows\"", "sec-fetch-dest": "empty", "sec-fetch-mode": "cors", "sec-fetch-site": "same-origin", "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/147.0.0.0 Safari/537.36"}
         # try parse
         try:
-            (resp := requests.post('https://app.ytdown.to/proxy.php', data={'url': url}, headers=headers, **request_overrides)).raise_for_status()
+            (resp := (session := self._getprobesession()).post('https://app.ytdown.to/proxy.php', data={'url': url}, headers=headers, **request_overrides)).raise_for_status()
             video_info.update(dict(raw_data=(raw_data := resp2json(resp=resp))))
             video_medias = [item for item in raw_data['api']['mediaItems'] if isinstance(item, dict) and (str(item.get('type')).lower() in {'video'}) and str(item.get('mediaUrl')).startswith('http')]
             video_medias = sorted(video_medias, key=lambda item: floatornone(str(item.get('mediaFileSize')).split(' ')[0]), reverse=True)
             audio_medias = [item for item in raw_data['api']['mediaItems'] if isinstance(item, dict) and (str(item.get('type')).lower() in {'audio'}) and str(item.get('mediaUrl')).startswith('http')]
             audio_medias = sorted(audio_medias, key=lambda item: floatornone(str(item.get('mediaFileSize')).split(' ')[0]), reverse=True)
-            for video_media in video_medias:
-                (resp := requests.post('https://app.ytdown.to/proxy.php', data={'url': video_media['mediaUrl']}, headers=headers, **request_overrides)).raise_for_status()
-                download_url, ext, download_url_can_be_visited = resp2json(resp=resp)['api']['fileUrl'], str(video_media['mediaExtension']).lower(), False; (stream_headers := headers.copy()).update({"Range": "bytes=0-0"})
-                with suppress(Exception): resp = None; (resp := requests.get(download_url, stream=True, headers=stream_headers, allow_redirects=True, verify=False, **request_overrides)).raise_for_status(); download_url_can_be_visited = True
-                if hasattr(resp, 'text') and download_url_can_be_visited: break
-            for audio_media in audio_medias:
-                (resp := requests.post('https://app.ytdown.to/proxy.php', data={'url': audio_media['mediaUrl']}, headers=headers, **request_overrides)).raise_for_status()
-                audio_download_url, audio_ext, audio_download_url_can_be_visited = resp2json(resp=resp)['api']['fileUrl'], str(audio_media['mediaExtension']).lower(), False; (stream_headers := headers.copy()).update({"Range": "bytes=0-0"})
-                with suppress(Exception): resp = None; (resp := requests.get(audio_download_url, stream=True, headers=stream_headers, allow_redirects=True, verify=False, **request_overrides)).raise_for_status(); audio_download_url_can_be_visited = True
-                if hasattr(resp, 'text') and audio_download_url_can_be_visited: break
-            if not download_url_can_be_visited or not audio_download_url_can_be_visited: return []
+            def _resolvemedia(media: dict):
+                (resp := session.post('https://app.ytdown.to/proxy.php', data={'url': media['mediaUrl']}, headers=headers, **request_overrides)).raise_for_status()
+                return resp2json(resp=resp)['api']['fileUrl'], str(media['mediaExtension']).lower()
+            if not (picked := self._pickfirstvisitable(video_medias, _resolvemedia, headers, request_overrides)) or not (audio_picked := self._pickfirstvisitable(audio_medias, _resolvemedia, headers, request_overrides)): return []
+            (download_url, ext), (audio_download_url, audio_ext) = picked, audio_picked
             video_info.update(dict(download_url=download_url, ext=ext, audio_download_url=audio_download_url, audio_ext=audio_ext, default_download_headers=headers, default_audio_download_headers=headers))
             video_title = legalizestring(safeextractfromdict(raw_data, ['api', 'title'], None) or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
             video_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{ext}'), audio_save_path=os.path.join(self.work_dir, self.source, f'{video_title}.audio.{audio_ext}'), identifier=vid, cover_url=safeextractfromdict(raw_data, ['api', 'imagePreviewUrl'], None)))
@@ -66,21 +115,15 @@ class YouTubeVideoClient(BaseVideoClient):
         # try parse
         try:
             cookies = requests.utils.dict_from_cookiejar(requests.get('https://downr.org/.netlify/functions/analytics', headers=headers, **request_overrides).cookies)
-            (resp := requests.post('https://downr.org/.netlify/functions/nyt', headers=headers, cookies=cookies, json={"url": url}, **request_overrides)).raise_for_status()
+            (resp := self._getprobesession().post('https://downr.org/.netlify/functions/nyt', headers=headers, cookies=cookies, json={"url": url}, **request_overrides)).raise_for_status()
             video_info.update(dict(raw_data=(raw_data := resp2json(resp=resp))))
             video_medias: list[dict] = [item for item in raw_data['medias'] if item['type'] in ('video',)]
             video_medias: list[dict] = sorted(video_medias, key=lambda item: (item.get('height') * item.get('width'), item.get('bitrate')), reverse=True)
             audio_medias: list[dict] = [item for item in raw_data['medias'] if item['type'] in ('audio',)]
             audio_medias: list[dict] = sorted(audio_medias, key=lambda item: (item.get('bitrate'), float(item.get('audioSampleRate') or 0)), reverse=True)
-            for video_media in video_medias:
-                download_url, ext, download_url_can_be_visited = video_media['url'], video_media['ext'], False; (stream_headers := headers.copy()).update({"Range": "bytes=0-0"})
-                with suppress(Exception): resp = None; (resp := requests.get(download_url, stream=True, headers=stream_headers, allow_redirects=True, verify=False, **request_overrides)).raise_for_status(); download_url_can_be_visited = True
-                if hasattr(resp, 'text') and download_url_can_be_visited: break
-            for audio_media in audio_medias:
-                audio_download_url, audio_ext, audio_download_url_can_be_visited = audio_media['url'], audio_media['ext'], False; (stream_headers := headers.copy()).update({"Range": "bytes=0-0"})
-                with suppress(Exception): resp = None; (resp := requests.get(audio_download_url, stream=True, headers=stream_headers, allow_redirects=True, verify=False, **request_overrides)).raise_for_status(); audio_download_url_can_be_visited = True
-                if hasattr(resp, 'text') and audio_download_url_can_be_visited: break
-            if not download_url_can_be_visited or not audio_download_url_can_be_visited: return []
+            resolve_func = lambda media: (media['url'], media['ext'])
+            if not (picked := self._pickfirstvisitable(video_medias, resolve_func, headers, request_overrides)) or not (audio_picked := self._pickfirstvisitable(audio_medias, resolve_func, headers, request_overrides)): return []
+            (download_url, ext), (audio_download_url, audio_ext) = picked, audio_picked
             video_info.update(dict(download_url=download_url, ext=ext, audio_download_url=audio_download_url, audio_ext=audio_ext, default_download_headers=headers, default_audio_download_headers=headers))
             video_title = legalizestring(safeextractfromdict(raw_data, ['title'], None) or null_backup_title, replace_null_string=null_backup_title).removesuffix('.')
             video_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.{ext}'), audio_save_path=os.path.join(self.work_dir, self.source, f'{video_title}.audio.{audio_ext}'), identifier=vid, cover_url=safeextractfromdict(raw_data, ['thumbnail'], None)))
@@ -89,16 +132,11 @@ class YouTubeVideoClient(BaseVideoClient):
             self.logger_handle.error(err_msg, disable_print=self.disable_print)
         # return
         return [video_info]
-    '''parsefromurl'''
-    @useparseheaderscookies
-    def parsefromurl(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
+    '''_parsefromurlwithnative'''
+    def _parsefromurlwithnative(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
         # prepare
         if not self.belongto(url=url): return []
         request_overrides, video_info, null_backup_title = request_overrides or {}, VideoInfo(source=self.source), yieldtimerelatedtitle(self.source)
-        # try parse with some third part apis
-        for parser in [self._parsefromurlwithytdown, self._parsefromurlwithytdown, self._parsefromurlwithdownr]:
-            video_infos = parser(url, request_overrides)
-            if any(video_info.with_valid_download_url for video_info in (video_infos or [])): return video_infos
         # try parse with official apis
         try:
             vid = parse_qs(urlparse(url).query, keep_blank_values=True)['v'][0]
@@ -108,10 +146,46 @@ class YouTubeVideoClient(BaseVideoClient):
             cover_url = safeextractfromdict(raw_data, ['videoDetails', 'thumbnail', 'thumbnails', -1, 'url'], None)
             video_info.update(dict(title=video_title, save_path=os.path.join(self.work_dir, self.source, f'{video_title}.mp4'), ext='mp4', identifier=vid, cover_url=cover_url))
         except Exception as err:
-            video_info.update(dict(err_msg=(err_msg := f'{self.source}.parsefromurl >>> {url} (Error: {err})')))
+            video_info.update(dict(err_msg=(err_msg := f'{self.source}._parsefromurlwithnative >>> {url} (Error: {err})')))
             self.logger_handle.error(err_msg, disable_print=self.disable_print)
         # return
         return [video_info]
+    '''parsefromurl'''
+    @useparseheaderscookies
+    def parsefromurl(self, url: str, request_overrides: dict = None) -> list[VideoInfo]:
+        # prepare
+        if not self.belongto(url=url): return []
+        request_overrides, video_info = request_overrides or {}, VideoInfo(source=self.source)
+        # hedge the third part apis and the official apis, a later parser starts once the earlier ones are slow or have all failed
+        parsers = [(name, parser) for name, parser in [('ytdown', self._parsefromurlwithytdown), ('ytdown', self._parsefromurlwithytdown), ('downr', self._parsefromurlwithdownr)] if self._isresolverhealthy(name)]
+        parsers.append(('native', self._parsefromurlwithnative))
+        executor, pending, native_video_infos, attempts_left = ThreadPoolExecutor(max_workers=len(parsers), thread_name_prefix='videodl-youtube-resolver'), {}, None, {}
+        for name, _ in parsers: attempts_left[name] = attempts_left.get(name, 0) + 1
+        try:
+            for idx, (name, parser) in enumerate(parsers):
+                pending[executor.submit(parser, url, request_overrides)] = name
+                hedge_delay = self.NATIVE_HEDGE_DELAY if idx + 1 < len(parsers) and parsers[idx + 1][0] == 'native' else self.RESOLVER_HEDGE_DELAY
+                deadline = time.monotonic() + hedge_delay if idx < len(parsers) - 1 else None
+                while pending:
+                    done, _ = wait(list(pending), timeout=None if deadline is None else max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                    if not done: break
+                    for future in done:
+                        finished_name, video_infos = pending.pop(future), []
+                        try: video_infos = future.result()
+                        except Exception as err: self.logger_handle.error(f'{self.source}.parsefromurl >>> {url} ({finished_name} Error: {err})', disable_print=self.disable_print)
+                        success = any(video_info.with_valid_download_url for video_info in (video_infos or []))
+                        if finished_name == 'native': native_video_infos = video_infos
+                        elif success: self._recordresolver(finished_name, True)
+                        else:
+                            # a resolver only counts as failed for this url once all of its attempts failed
+                            attempts_left[finished_name] -= 1
+                            if attempts_left[finished_name] <= 0: self._recordresolver(finished_name, False)
+                        if success: return video_infos
+                    if not pending: break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        # return
+        return native_video_infos or [video_info]
     '''belongto'''
     @staticmethod
     def belongto(url: str, valid_domains: list[str] | set[str] = None):
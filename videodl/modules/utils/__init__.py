@@ -4,16 +4,20 @@ from .ip import RandomIPGenerator
 from .aes import AESAlgorithmWrapper
 from .smuggler import BrightcoveSmuggler
 from .modulebuilder import BaseModuleBuilder
+from .credentials import CredentialCache
+from .wasm import WasmModuleRuntime, TencentCKeyWasmRuntime
+from .mirrors import MirrorProber, HostScoreboard, VariantSelector
 from .progress import taskprogress, progresslog
-from .hls import CCTVHLSBestParser, TencentHLSHelper
-from .cdm import initcdm, closecdm, SearchPsshValueUtils
+from .hls import CCTVHLSBestParser, TencentHLSHelper, M3U8StreamParser, HLSSegment
+from .cdm import initcdm, closecdm, abortcdm, acquirecontentkeys, ContentKeyStore, WidevineCdmPool, SearchPsshValueUtils
 from .importutils import optionalimport, optionalimportfrom
 from .chromium import ChromiumDownloaderUtils, DrissionPageUtils
 from .logger import printtable, colorize, printfullline, LoggerHandle
+from .polling import AdaptivePoller, PollingScheduler, PollCancelledError
 from .io import touchdir, generateuniquetmppath, safeunlinkpathobj, FileLock
 from .cmd import CommandBuilder, CommandModsApplier, FFmpegCommandFactory, NM3U8DLRECommandFactory, Aria2cCommandFactory, CmdArg, CmdOp
 from .misc import (
     legalizestring, resp2json, usedownloadheaderscookies, useparseheaderscookies, usesearchheaderscookies, searchdictbykey, cookies2dict, cookies2string, 
     safeextractfromdict, yieldtimerelatedtitle, shortenpathsinvideoinfos, extracttitlefromurl, traverseobj, naivejstojson, floatornone, naivedetermineext, 
-    intornone, naivecleanhtml, FileTypeSniffer, SpinWithBackoff,
+    intornone, naivecleanhtml, FileTypeSniffer, SpinWithBackoff, HostConcurrencyLimiter,
 )
\ No newline at end of file
@@ -8,8 +8,58 @@ WeChat Official Account (微信公众号):
 '''
 import time
 import random
-from gmssl import sm3, func
-from typing import Union, Callable, List, Dict
+import struct
+from functools import lru_cache
+from typing import Union, Callable, List, Dict, Tuple
+
+
+'''settings'''
+SM3_IV = (0x7380166F, 0x4914B2B9, 0x172442D7, 0xDA8A0600, 0xA96F30BC, 0x163138AA, 0xE38DEE4D, 0xB0FB0E4E)
+SM3_T_ROTATED = tuple((((t := 0x79CC4519 if j < 16 else 0x7A879D8A) << (j % 32)) | (t >> (32 - j % 32))) & 0xFFFFFFFF for j in range(64))
+RC4_IDENTITY = tuple(range(256))
+BIG_ARRAY = (
+    121, 243,  55, 234, 103,  36,  47, 228,  30, 231, 106,   6, 115,  95,  78, 101, 250, 207, 198,  50, 139, 227, 220, 105,  97, 143,  34,  28, 194, 215,  18, 100, 159, 160,  43,   8, 169, 217, 180, 120,
+    247,  45,  90,  11,  27, 197,  46,   3,  84,  72,   5,  68,  62,  56, 221,  75, 144,  79,  73, 161, 178,  81,  64, 187, 134, 117, 186, 118,  16, 241, 130,  71,  89, 147, 122, 129,  65,  40,  88, 150,
+    110, 219, 199, 255, 181, 254,  48,   4, 195, 248, 208,  32, 116, 167,  69, 201,  17, 124, 125, 104,  96,  83,  80, 127, 236, 108, 154, 126, 204,  15,  20, 135, 112, 158,  13,   1, 188, 164, 210, 237,
+    222,  98, 212,  77, 253,  42, 170, 202,  26,  22,  29, 182, 251,  10, 173, 152,  58, 138,  54, 141, 185,  33, 157,  31, 252, 132, 233, 235, 102, 196, 191, 223, 240, 148,  39, 123,  92,  82, 128, 109,
+     57,  24,  38, 113, 209, 245,   2, 119, 153, 229, 189, 214, 230, 174, 232,  63,  52, 205,  86, 140,  66, 175, 111, 171, 246, 133, 238, 193,  99,  60,  74,  91, 225,  51,  76,  37, 145, 211, 166, 151,
+    213, 206,   0, 200, 244, 176, 218,  44, 184, 172,  49, 216,  93, 168,  53,  21, 183,  41,  67,  85, 224, 155, 226, 242,  87, 177, 146,  70, 190,  12, 162,  19, 137, 114,  25, 165, 163, 192,  23,  59,
+      9,  94, 179, 107,  35,   7, 142, 131, 239, 203, 149, 136,  61, 249,  14, 156
+)
+
+
+'''SM3'''
+class SM3:
+    '''compress'''
+    @staticmethod
+    def compress(state: Tuple[int, ...], block: bytes) -> Tuple[int, ...]:
+        w = list(struct.unpack('>16I', block))
+        for j in range(16, 68):
+            x = w[j - 16] ^ w[j - 9] ^ (((v := w[j - 3]) << 15 | v >> 17) & 0xFFFFFFFF); x ^= ((x << 15 | x >> 17) ^ (x << 23 | x >> 9)) & 0xFFFFFFFF
+            w.append(x ^ (((v := w[j - 13]) << 7 | v >> 25) & 0xFFFFFFFF) ^ w[j - 6])
+        a, b, c, d, e, f, g, h = state
+        # the boolean functions switch at round 16, two loops keep the branch out of the round body
+        for j in range(16):
+            a12 = (a << 12 | a >> 20) & 0xFFFFFFFF; ss1 = (a12 + e + SM3_T_ROTATED[j]) & 0xFFFFFFFF; ss1 = (ss1 << 7 | ss1 >> 25) & 0xFFFFFFFF
+            tt1 = ((a ^ b ^ c) + d + (ss1 ^ a12) + (w[j] ^ w[j + 4])) & 0xFFFFFFFF; tt2 = ((e ^ f ^ g) + h + ss1 + w[j]) & 0xFFFFFFFF
+            d, c, b, a = c, (b << 9 | b >> 23) & 0xFFFFFFFF, a, tt1
+            h, g, f, e = g, (f << 19 | f >> 13) & 0xFFFFFFFF, e, tt2 ^ ((tt2 << 9 | tt2 >> 23) & 0xFFFFFFFF) ^ ((tt2 << 17 | tt2 >> 15) & 0xFFFFFFFF)
+        for j in range(16, 64):
+            a12 = (a << 12 | a >> 20) & 0xFFFFFFFF; ss1 = (a12 + e + SM3_T_ROTATED[j]) & 0xFFFFFFFF; ss1 = (ss1 << 7 | ss1 >> 25) & 0xFFFFFFFF
+            tt1 = (((a & b) | (a & c) | (b & c)) + d + (ss1 ^ a12) + (w[j] ^ w[j + 4])) & 0xFFFFFFFF; tt2 = (((e & f) | (~e & g)) + h + ss1 + w[j]) & 0xFFFFFFFF
+            d, c, b, a = c, (b << 9 | b >> 23) & 0xFFFFFFFF, a, tt1
+            h, g, f, e = g, (f << 19 | f >> 13) & 0xFFFFFFFF, e, tt2 ^ ((tt2 << 9 | tt2 >> 23) & 0xFFFFFFFF) ^ ((tt2 << 17 | tt2 >> 15) & 0xFFFFFFFF)
+        return tuple(x ^ y for x, y in zip(state, (a, b, c, d, e, f, g, h)))
+    '''digest'''
+    @staticmethod
+    def digest(data: bytes) -> bytes:
+        data = bytes(data); padded = data + b'\x80' + b'\x00' * ((55 - len(data)) % 64) + struct.pack('>Q', len(data) * 8); state = SM3_IV
+        for offset in range(0, len(padded), 64): state = SM3.compress(state, padded[offset: offset + 64])
+        return struct.pack('>8I', *state)
+    '''hexdigest'''
+    @staticmethod
+    def hexdigest(data: bytes) -> str:
+        return SM3.digest(data).hex()
 
 
 '''StringProcessor'''
@@ -40,21 +90,18 @@ class StringProcessor:
 class CryptoUtility:
     def __init__(self, salt: str, custom_base64_alphabet: List[str]):
         self.salt, self.base64_alphabet = salt, custom_base64_alphabet
-        self.big_array = [
-            121, 243,  55, 234, 103,  36,  47, 228,  30, 231, 106,   6, 115,  95,  78, 101, 250, 207, 198,  50, 139, 227, 220, 105,  97, 143,  34,  28, 194, 215,  18, 100, 159, 160,  43,   8, 169, 217, 180, 120,
-            247,  45,  90,  11,  27, 197,  46,   3,  84,  72,   5,  68,  62,  56, 221,  75, 144,  79,  73, 161, 178,  81,  64, 187, 134, 117, 186, 118,  16, 241, 130,  71,  89, 147, 122, 129,  65,  40,  88, 150,
-            110, 219, 199, 255, 181, 254,  48,   4, 195, 248, 208,  32, 116, 167,  69, 201,  17, 124, 125, 104,  96,  83,  80, 127, 236, 108, 154, 126, 204,  15,  20, 135, 112, 158,  13,   1, 188, 164, 210, 237,
-            222,  98, 212,  77, 253,  42, 170, 202,  26,  22,  29, 182, 251,  10, 173, 152,  58, 138,  54, 141, 185,  33, 157,  31, 252, 132, 233, 235, 102, 196, 191, 223, 240, 148,  39, 123,  92,  82, 128, 109,
-             57,  24,  38, 113, 209, 245,   2, 119, 153, 229, 189, 214, 230, 174, 232,  63,  52, 205,  86, 140,  66, 175, 111, 171, 246, 133, 238, 193,  99,  60,  74,  91, 225,  51,  76,  37, 145, 211, 166, 151,
-            213, 206,   0, 200, 244, 176, 218,  44, 184, 172,  49, 216,  93, 168,  53,  21, 183,  41,  67,  85, 224, 155, 226, 242,  87, 177, 146,  70, 190,  12, 162,  19, 137, 114,  25, 165, 163, 192,  23,  59,
-              9,  94, 179, 107,  35,   7, 142, 131, 239, 203, 149, 136,  61, 249,  14, 156
-        ]
+        self.big_array = list(BIG_ARRAY)
     '''sm3toarray'''
     @staticmethod
     def sm3toarray(input_data: Union[str, List[int]]) -> List[int]:
         input_data_bytes = input_data.encode("utf-8") if isinstance(input_data, str) else bytes(input_data)
-        hex_result = sm3.sm3_hash(func.bytes_to_list(input_data_bytes))
-        return [int(hex_result[i : i + 2], 16) for i in range(0, len(hex_result), 2)]
+        return list(CryptoUtility._sm3cached(input_data_bytes))
+    '''_sm3cached'''
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _sm3cached(input_data_bytes: bytes) -> bytes:
+        # the body and user agent digests repeat across every signed request
+        return SM3.digest(input_data_bytes)
     '''addsalt'''
     def addsalt(self, param: str) -> str: return param + self.salt
     '''processparam'''
@@ -67,21 +114,26 @@ class CryptoUtility:
         return self.sm3toarray(processed_param)
     '''transformbytes'''
     def transformbytes(self, bytes_list: List[int]) -> str:
-        bytes_str, result_str, index_b, initial_value = StringProcessor.tocharstr(bytes_list), [], self.big_array[1], 0
-        for index, char in enumerate(bytes_str):
-            sum_initial = ((initial_value := self.big_array[index_b]), self.big_array.__setitem__(1, initial_value), self.big_array.__setitem__(index_b, index_b), index_b + initial_value)[-1] if index == 0 else initial_value + value_e
-            char_value = ord(char); sum_initial %= len(self.big_array); value_f = self.big_array[sum_initial]; encrypted_char = char_value ^ value_f; result_str.append(chr(encrypted_char))
-            value_e = self.big_array[(index + 2) % len(self.big_array)]; sum_initial = (index_b + value_e) % len(self.big_array); initial_value = self.big_array[sum_initial]
-            self.big_array[sum_initial] = self.big_array[(index + 2) % len(self.big_array)]; self.big_array[(index + 2) % len(self.big_array)] = initial_value; index_b = sum_initial
-        return "".join(result_str)
+        # the state permutation carries over between calls on the same instance, exactly like the original web implementation
+        if not bytes_list: return ""
+        big_array, size, result = self.big_array, len(self.big_array), []
+        index_b = big_array[1]; initial_value = big_array[index_b]; big_array[1] = initial_value; big_array[index_b] = index_b; sum_initial = index_b + initial_value
+        for index, char_value in enumerate(bytes_list):
+            if index: sum_initial = initial_value + value_e
+            result.append(char_value ^ big_array[sum_initial % size])
+            value_e = big_array[(index_2 := (index + 2) % size)]; sum_initial = (index_b + value_e) % size; initial_value = big_array[sum_initial]
+            big_array[sum_initial] = value_e; big_array[index_2] = initial_value; index_b = sum_initial
+        return StringProcessor.tocharstr(result)
     '''base64encode'''
     def base64encode(self, input_string: str, selected_alphabet: int = 0) -> str:
-        binary_string = "".join(["{:08b}".format(ord(char)) for char in input_string])
-        padding_length = (6 - len(binary_string) % 6) % 6; binary_string += "0" * padding_length
-        base64_indices = [int(binary_string[i : i + 6], 2) for i in range(0, len(binary_string), 6)]
-        output_string = "".join([self.base64_alphabet[selected_alphabet][index] for index in base64_indices])
-        output_string += "=" * (padding_length // 2)
-        return output_string
+        alphabet, value, bits, output = self.base64_alphabet[selected_alphabet], 0, 0, []
+        for char in input_string:
+            value, bits = (value << 8) | ord(char), bits + 8
+            while bits >= 6: bits -= 6; output.append(alphabet[(value >> bits) & 0x3F])
+            value &= (1 << bits) - 1
+        padding_length = (6 - bits) % 6
+        if bits: output.append(alphabet[(value << padding_length) & 0x3F])
+        return "".join(output) + "=" * (padding_length // 2)
     '''abogusencode'''
     def abogusencode(self, abogus_bytes_str: str, selected_alphabet: int) -> str:
         abogus = []
@@ -98,11 +150,17 @@ class CryptoUtility:
     '''rc4encrypt'''
     @staticmethod
     def rc4encrypt(key: bytes, plaintext: str) -> bytes:
-        S = list(range(256)); j = 0
-        for i in range(256): j = (j + S[i] + key[i % len(key)]) % 256; S[i], S[j] = S[j], S[i]
+        S = list(CryptoUtility.rc4schedule(bytes(key)))
         i = j = 0; ciphertext = []
         for char in plaintext: i = (i + 1) % 256; j = (j + S[i]) % 256; S[i], S[j] = S[j], S[i]; K = S[(S[i] + S[j]) % 256]; ciphertext.append(ord(char) ^ K)
         return bytes(ciphertext)
+    '''rc4schedule'''
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def rc4schedule(key: bytes) -> Tuple[int, ...]:
+        S = list(RC4_IDENTITY); j = 0
+        for i in range(256): j = (j + S[i] + key[i % len(key)]) % 256; S[i], S[j] = S[j], S[i]
+        return tuple(S)
 
 
 '''BrowserFingerprintGenerator'''
@@ -141,6 +199,7 @@ class BrowserFingerprintGenerator:
 
 '''ABogus'''
 class ABogus:
+    _ua_arrays: Dict[tuple, List[int]] = {}
     def __init__(self, fp: str = "", user_agent: str = "", options: List[int] = [0, 1, 14]):
         self.aid, self.pageId, self.salt, self.boe = 6383, 0, "cus", False
         self.ddrt, self.ic, self.paths = 8.5, 8.5, ["^/webcast/", "^/aweme/v1/", "^/aweme/v2/", "/v1/message/send", "^/live/", "^/captcha/", "^/ecom/"]
@@ -156,13 +215,23 @@ class ABogus:
     '''encodedata'''
     def encodedata(self, data: str, alphabet_index: int = 0) -> str:
         return self.crypto_utility.abogusencode(data, alphabet_index)
+    '''useragentarray'''
+    def useragentarray(self) -> List[int]:
+        # rc4, base64 and sm3 over the user agent only depend on the user agent, so they are computed once per process
+        if (key := (self.ua_key, self.user_agent)) not in ABogus._ua_arrays:
+            ABogus._ua_arrays[key] = self.crypto_utility.paramstoarray(self.crypto_utility.base64encode(StringProcessor.toordstr(self.crypto_utility.rc4encrypt(self.ua_key, self.user_agent)), 1), add_salt=False)
+        return ABogus._ua_arrays[key]
+    '''generateabogusbatch'''
+    def generateabogusbatch(self, params_list: List[str], body: str = "") -> List[tuple]:
+        array2, array3 = self.crypto_utility.paramstoarray(self.crypto_utility.paramstoarray(body)), self.useragentarray()
+        return [self.generateabogus(params, body, array2=array2, array3=array3) for params in params_list]
     '''generateabogus'''
-    def generateabogus(self, params: str, body: str = "") -> tuple:
+    def generateabogus(self, params: str, body: str = "", array2: List[int] = None, array3: List[int] = None) -> tuple:
         ab_dir = {8: 3, 15: {"aid": self.aid, "pageId": self.pageId, "boe": self.boe, "ddrt": self.ddrt, "paths": self.paths, "track": {"mode": 0, "delay": 300, "paths": []}, "dump": True, "rpU": ""}, 18: 44, 19: [1, 0, 1, 0, 1], 66: 0, 69: 0, 70: 0, 71: 0}
         start_encryption = int(time.time() * 1000)
         array1 = self.crypto_utility.paramstoarray(self.crypto_utility.paramstoarray(params))
-        array2 = self.crypto_utility.paramstoarray(self.crypto_utility.paramstoarray(body))
-        array3 = self.crypto_utility.paramstoarray(self.crypto_utility.base64encode(StringProcessor.toordstr(self.crypto_utility.rc4encrypt(self.ua_key, self.user_agent)), 1), add_salt=False)
+        array2 = array2 or self.crypto_utility.paramstoarray(self.crypto_utility.paramstoarray(body))
+        array3 = array3 or self.useragentarray()
         end_encryption = int(time.time() * 1000)
         ab_dir[20] = (start_encryption >> 24) & 255; ab_dir[21] = (start_encryption >> 16) & 255; ab_dir[22] = (start_encryption >> 8) & 255; ab_dir[23] = start_encryption & 255; ab_dir[24] = int(start_encryption / 256 / 256 / 256 / 256) >> 0; ab_dir[25] = int(start_encryption / 256 / 256 / 256 / 256 / 256) >> 0
         ab_dir[26] = (self.options[0] >> 24) & 255; ab_dir[27] = (self.options[0] >> 16) & 255; ab_dir[28] = (self.options[0] >> 8) & 255; ab_dir[29] = self.options[0] & 255
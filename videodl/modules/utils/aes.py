@@ -8,7 +8,11 @@ WeChat Official Account (微信公众号):
 '''
 import math
 import base64
-from Cryptodome.Cipher import AES
+from .importutils import optionalimportfrom
+
+
+'''optional fast backend'''
+AES = optionalimportfrom('Cryptodome.Cipher', 'AES')
 
 
 '''settings'''
@@ -60,6 +64,23 @@ RIJNDAEL_LOG_TABLE = (
 
 '''AESAlgorithmWrapper'''
 class AESAlgorithmWrapper:
+    # pycryptodome handles the bulk work when installed, the pure python code below stays as the byte for byte reference and fallback
+    USE_FAST_BACKEND = AES is not None
+    PADDING_BYTES = {'iso7816': 0x0, 'whitespace': 0x20, 'zero': 0x0}
+    '''_fastcipher'''
+    @staticmethod
+    def _fastcipher(key, mode, **kwargs):
+        if not AESAlgorithmWrapper.USE_FAST_BACKEND or AES is None: raise RuntimeError('Fast AES backend is unavailable')
+        return AES.new(bytes(key), mode, **kwargs)
+    '''_fastpad'''
+    @staticmethod
+    def _fastpad(data: bytes, padding_mode: str = 'pkcs7') -> bytes:
+        # mirrors padblock, only a trailing partial block is padded and a block aligned input gets no extra block
+        if not (padding_size := (BLOCK_SIZE_BYTES - len(data) % BLOCK_SIZE_BYTES) % BLOCK_SIZE_BYTES): return data
+        if padding_mode == 'pkcs7': return data + bytes([padding_size]) * padding_size
+        if padding_mode not in AESAlgorithmWrapper.PADDING_BYTES: raise NotImplementedError(f'Padding mode {padding_mode} is not implemented')
+        if padding_mode == 'iso7816': return data + b'\x80' + b'\x00' * (padding_size - 1)
+        return data + bytes([AESAlgorithmWrapper.PADDING_BYTES[padding_mode]]) * padding_size
     '''compatord'''
     @staticmethod
     def compatord(c):
@@ -207,6 +228,8 @@ class AESAlgorithmWrapper:
     '''aesecbencrypt'''
     @staticmethod
     def aesecbencrypt(data, key, iv: str = None):
+        try: return list(AESAlgorithmWrapper._fastcipher(key, AES.MODE_ECB).encrypt(AESAlgorithmWrapper._fastpad(bytes(data))))
+        except Exception: pass
         expanded_key, block_count, encrypted_data = AESAlgorithmWrapper.keyexpansion(key), math.ceil(len(data) / BLOCK_SIZE_BYTES), []
         for i in range(block_count):
             block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
@@ -215,6 +238,9 @@ class AESAlgorithmWrapper:
     '''aesecbdecrypt'''
     @staticmethod
     def aesecbdecrypt(data, key, iv: str = None):
+        if not len(data) % BLOCK_SIZE_BYTES:
+            try: return list(AESAlgorithmWrapper._fastcipher(key, AES.MODE_ECB).decrypt(bytes(data)))
+            except Exception: pass
         expanded_key, block_count, encrypted_data = AESAlgorithmWrapper.keyexpansion(key), math.ceil(len(data) / BLOCK_SIZE_BYTES), []
         for i in range(block_count):
             block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
@@ -223,6 +249,10 @@ class AESAlgorithmWrapper:
     '''aesctrencrypt'''
     @staticmethod
     def aesctrencrypt(data, key, iv):
+        # a full 16 byte initial value makes pycryptodome count over all 128 bits exactly like itervector, wrap around falls back
+        if len(iv) == BLOCK_SIZE_BYTES:
+            try: return list(AESAlgorithmWrapper._fastcipher(key, AES.MODE_CTR, nonce=b'', initial_value=bytes(iv)).encrypt(bytes(data)))
+            except Exception: pass
         expanded_key, block_count, counter, encrypted_data = AESAlgorithmWrapper.keyexpansion(key), math.ceil(len(data) / BLOCK_SIZE_BYTES), AESAlgorithmWrapper.itervector(iv), []
         for i in range(block_count):
             counter_block = next(counter)
@@ -238,6 +268,11 @@ class AESAlgorithmWrapper:
     '''aesgcmdecryptandverify'''
     @staticmethod
     def aesgcmdecryptandverify(data, key, tag, nonce):
+        if len(tag) == BLOCK_SIZE_BYTES:
+            try: return list(AESAlgorithmWrapper._fastcipher(key, AES.MODE_GCM, nonce=bytes(nonce)).decrypt_and_verify(bytes(data), bytes(tag)))
+            except ValueError as err:
+                if 'MAC check failed' in str(err): raise ValueError('Mismatching authentication tag')
+            except Exception: pass
         hash_subkey = AESAlgorithmWrapper.aesencrypt([0] * BLOCK_SIZE_BYTES, AESAlgorithmWrapper.keyexpansion(key))
         if len(nonce) == 12: j0 = [*nonce, 0, 0, 0, 1]
         else: fill = (BLOCK_SIZE_BYTES - (len(nonce) % BLOCK_SIZE_BYTES)) % BLOCK_SIZE_BYTES + 8; ghash_in = nonce + [0] * fill + list((8 * len(nonce)).to_bytes(8, 'big')); j0 = AESAlgorithmWrapper.ghash(hash_subkey, ghash_in)
@@ -250,6 +285,9 @@ class AESAlgorithmWrapper:
     '''aescbcencrypt'''
     @staticmethod
     def aescbcencrypt(data, key, iv, *, padding_mode='pkcs7'):
+        try: return list(AESAlgorithmWrapper._fastcipher(key, AES.MODE_CBC, iv=bytes(iv)).encrypt(AESAlgorithmWrapper._fastpad(bytes(data), padding_mode)))
+        except NotImplementedError: raise
+        except Exception: pass
         expanded_key, block_count, encrypted_data, previous_cipher_block = AESAlgorithmWrapper.keyexpansion(key), math.ceil(len(data) / BLOCK_SIZE_BYTES), [], iv
         for i in range(block_count):
             block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
@@ -261,10 +299,15 @@ class AESAlgorithmWrapper:
     '''aescbcencryptbytes'''
     @staticmethod
     def aescbcencryptbytes(data, key, iv, **kwargs):
-        return bytes(AESAlgorithmWrapper.aescbcencrypt(*map(list, (data, key, iv)), **kwargs))
+        try: return AESAlgorithmWrapper._fastcipher(key, AES.MODE_CBC, iv=bytes(iv)).encrypt(AESAlgorithmWrapper._fastpad(bytes(data), kwargs.get('padding_mode', 'pkcs7')))
+        except NotImplementedError: raise
+        except Exception: return bytes(AESAlgorithmWrapper.aescbcencrypt(*map(list, (data, key, iv)), **kwargs))
     '''aescbcdecrypt'''
     @staticmethod
     def aescbcdecrypt(data, key, iv):
+        if not len(data) % BLOCK_SIZE_BYTES:
+            try: return list(AESAlgorithmWrapper._fastcipher(key, AES.MODE_CBC, iv=bytes(iv)).decrypt(bytes(data)))
+            except Exception: pass
         expanded_key, block_count, decrypted_data, previous_cipher_block = AESAlgorithmWrapper.keyexpansion(key), math.ceil(len(data) / BLOCK_SIZE_BYTES), [], iv
         for i in range(block_count):
             block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
@@ -276,10 +319,10 @@ class AESAlgorithmWrapper:
     '''aescbcdecryptbytes'''
     @staticmethod
     def aescbcdecryptbytes(data, key, iv):
-        try: return AES.new(key, AES.MODE_CBC, iv).decrypt(data)
+        try: return AESAlgorithmWrapper._fastcipher(key, AES.MODE_CBC, iv=bytes(iv)).decrypt(bytes(data))
         except: return bytes(AESAlgorithmWrapper.aescbcdecrypt(*map(list, (data, key, iv))))
     '''aesgcmdecryptandverifybytes'''
     @staticmethod
     def aesgcmdecryptandverifybytes(data, key, tag, nonce):
-        try: return AES.new(key, AES.MODE_GCM, nonce).decrypt_and_verify(data, tag)
+        try: return AESAlgorithmWrapper._fastcipher(key, AES.MODE_GCM, nonce=bytes(nonce)).decrypt_and_verify(bytes(data), bytes(tag))
         except: return bytes(AESAlgorithmWrapper.aesgcmdecryptandverify(*map(list, (data, key, tag, nonce))))
\ No newline at end of file
@@ -9,43 +9,191 @@ WeChat Official Account (微信公众号):
 import re
 import base64
 import requests
+import threading
+from pathlib import Path
+from typing import Callable
+from .credentials import CredentialCache
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from pywidevine import PSSH, Cdm, Device
 
 
+'''WidevineCdmPool'''
+class WidevineCdmPool():
+    _devices: dict[str, Device] = {}
+    _idle_cdms: dict[str, list[Cdm]] = {}
+    _cdm_paths: dict[int, str] = {}
+    _lock = threading.Lock()
+    '''loaddevice'''
+    @staticmethod
+    def loaddevice(cdm_wvd_file_path: str) -> Device:
+        key = str(Path(cdm_wvd_file_path).resolve())
+        with WidevineCdmPool._lock:
+            if (device := WidevineCdmPool._devices.get(key)) is None:
+                device = Device.load(cdm_wvd_file_path); assert device.security_level == 3
+                WidevineCdmPool._devices[key] = device
+        return device
+    '''acquire'''
+    @staticmethod
+    def acquire(cdm_wvd_file_path: str) -> Cdm:
+        # a cdm is handed to one caller at a time, idle ones are reused so the device file is parsed once per process
+        device, key = WidevineCdmPool.loaddevice(cdm_wvd_file_path), str(Path(cdm_wvd_file_path).resolve())
+        with WidevineCdmPool._lock:
+            if (idle_cdms := WidevineCdmPool._idle_cdms.setdefault(key, [])): return idle_cdms.pop()
+        cdm = Cdm.from_device(device)
+        with WidevineCdmPool._lock: WidevineCdmPool._cdm_paths[id(cdm)] = key
+        return cdm
+    '''release'''
+    @staticmethod
+    def release(cdm: Cdm):
+        with WidevineCdmPool._lock:
+            if (key := WidevineCdmPool._cdm_paths.get(id(cdm))) is not None: WidevineCdmPool._idle_cdms.setdefault(key, []).append(cdm)
+
+
 '''initcdm'''
 def initcdm(pssh_value, cdm_wvd_file_path: str):
     if pssh_value is None: return
-    device = Device.load(cdm_wvd_file_path)
-    assert device.security_level == 3
     pssh_value = PSSH(pssh_value)
     if pssh_value.system_id == PSSH.SystemId.PlayReady: pssh_value.to_widevine()
-    cdm = Cdm.from_device(device)
-    cdm_session_id = cdm.open()
-    challenge = cdm.get_license_challenge(cdm_session_id, pssh_value)
+    cdm = WidevineCdmPool.acquire(cdm_wvd_file_path)
+    try: cdm_session_id = cdm.open(); challenge = cdm.get_license_challenge(cdm_session_id, pssh_value)
+    except Exception: WidevineCdmPool.release(cdm); raise
     return cdm, cdm_session_id, challenge
 
 
 '''closecdm'''
 def closecdm(cdm: Cdm, cdm_session_id, response):
-    cdm.parse_license(cdm_session_id, response)
-    keys = [f"{key.kid.hex}:{key.key.hex()}" for key in cdm.get_keys(cdm_session_id) if "CONTENT" in key.type]
-    cdm.close(cdm_session_id)
+    try:
+        cdm.parse_license(cdm_session_id, response)
+        keys = [f"{key.kid.hex}:{key.key.hex()}" for key in cdm.get_keys(cdm_session_id) if "CONTENT" in key.type]
+    finally:
+        cdm.close(cdm_session_id); WidevineCdmPool.release(cdm)
     return keys
 
 
+'''abortcdm'''
+def abortcdm(cdm: Cdm, cdm_session_id):
+    try: cdm.close(cdm_session_id)
+    except Exception: pass
+    WidevineCdmPool.release(cdm)
+
+
+'''ContentKeyStore'''
+class ContentKeyStore(CredentialCache):
+    def __init__(self, cache_dir: str, namespace: str = 'widevine', ttl: float = 30 * 86400.0, lock_timeout: float = 60.0):
+        super(ContentKeyStore, self).__init__(cache_dir=cache_dir, namespace=namespace, ttl=ttl, lock_timeout=lock_timeout)
+    '''kidsfrompssh'''
+    @staticmethod
+    def kidsfrompssh(pssh_value) -> list[str]:
+        try: return sorted({kid.hex for kid in PSSH(pssh_value).key_ids})
+        except Exception: return []
+    '''lookup'''
+    def lookup(self, pssh_value: str = None, kids: list[str] = None) -> list[str] | None:
+        kids = [str(kid).replace('-', '').lower() for kid in (kids or [])] or self.kidsfrompssh(pssh_value)
+        if kids and all((keys := {kid: self.get(f'kid:{kid}') for kid in kids}).values()): return [f'{kid}:{key}' for kid, key in keys.items()]
+        return (self.get(f'pssh:{pssh_value}') or None) if pssh_value else None
+    '''store'''
+    def store(self, pssh_value: str, keys: list[str]) -> list[str]:
+        if not keys: return keys
+        items = {f'kid:{kid}': key for kid, key in (item.split(':', 1) for item in keys)}
+        if pssh_value: items[f'pssh:{pssh_value}'] = list(keys)
+        self.setmany(items)
+        return keys
+
+
+'''acquirecontentkeys'''
+def acquirecontentkeys(pssh_values: list[str], cdm_wvd_file_path: str, fetchlicense: Callable[[bytes, str], bytes], key_store: ContentKeyStore = None, kids: list[str] = None, max_workers: int = 4) -> list[str]:
+    pssh_values, results = list(dict.fromkeys(pssh for pssh in (pssh_values or []) if pssh)), {}
+    # the license round trip is skipped for every pssh whose kids are all known already
+    for pssh_value in pssh_values:
+        if key_store is not None and (keys := key_store.lookup(pssh_value, kids if len(pssh_values) == 1 else None)): results[pssh_value] = keys
+    '''_acquire'''
+    def _acquire(pssh_value: str) -> list[str]:
+        cdm, cdm_session_id, challenge = initcdm(pssh_value, cdm_wvd_file_path)
+        try: response = fetchlicense(challenge, pssh_value)
+        except Exception: abortcdm(cdm, cdm_session_id); raise
+        keys = list(dict.fromkeys(closecdm(cdm, cdm_session_id, response)))
+        return key_store.store(pssh_value, keys) if key_store is not None else keys
+    if (missing := [pssh_value for pssh_value in pssh_values if pssh_value not in results]):
+        if len(missing) == 1: results[missing[0]] = _acquire(missing[0])
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as executor: results.update(zip(missing, executor.map(_acquire, missing)))
+    return list(dict.fromkeys(key for pssh_value in pssh_values for key in results.get(pssh_value, [])))
+
+
 '''SearchPsshValueUtils'''
 class SearchPsshValueUtils():
     PLAYREADY_SCHEME_ID = "9A04F079-9840-4286-AB92-E65BE0885F95"
-    '''getpsshfrominit'''
+    INIT_RANGE_BYTES = 64 * 1024
+    MAX_INIT_RANGE_BYTES = 32 * 1024 * 1024
+    PSSH_PARENT_BOXES = {b'moov', b'moof'}
+    _session: requests.Session = None
+    _lock = threading.Lock()
+    '''_getsession'''
     @staticmethod
-    def getpsshfrominit(init_url, request_overrides: dict = None):
-        request_overrides = request_overrides or {}
-        content, offsets, offset = requests.get(init_url, **request_overrides).content, [], 0
+    def _getsession() -> requests.Session:
+        with SearchPsshValueUtils._lock:
+            if SearchPsshValueUtils._session is None:
+                (session := requests.Session()).mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16)); session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+                SearchPsshValueUtils._session = session
+            return SearchPsshValueUtils._session
+    '''_fetchinit'''
+    @staticmethod
+    def _fetchinit(init_url, size: int, request_overrides: dict = None) -> tuple[bytes, bool]:
+        request_overrides = dict(request_overrides or {}); headers = dict(request_overrides.pop('headers', None) or {}); headers['Range'] = f'bytes=0-{size - 1}'
+        (resp := SearchPsshValueUtils._getsession().get(init_url, headers=headers, **request_overrides)).raise_for_status()
+        # anything but a 206 means the server ignored the range and sent the whole body
+        return resp.content, resp.status_code != 206 or len(resp.content) < size
+    '''_readboxheader'''
+    @staticmethod
+    def _readboxheader(data: bytes, offset: int, end: int) -> tuple[bytes, int, int] | None:
+        if offset + 8 > end: return None
+        size, box_type, header_size = int.from_bytes(data[offset: offset+4], byteorder='big'), data[offset+4: offset+8], 8
+        if size == 1:
+            if offset + 16 > end: return None
+            size, header_size = int.from_bytes(data[offset+8: offset+16], byteorder='big'), 16
+        elif size == 0: size = end - offset
+        if size < header_size: raise ValueError(f'Invalid ISO-BMFF box size {size} at offset {offset}')
+        return box_type, size, header_size
+    '''_findpsshboxes'''
+    @staticmethod
+    def _findpsshboxes(data: bytes, complete: bool) -> tuple[list[bytes], int | None]:
+        # walks the top level boxes, the second value is how many leading bytes are needed when the window cuts the tree short
+        pssh_boxes, offset = [], 0
+        while offset < len(data):
+            if (header := SearchPsshValueUtils._readboxheader(data, offset, len(data))) is None: return pssh_boxes, (None if complete else offset + 16)
+            box_type, size, header_size = header
+            if box_type in SearchPsshValueUtils.PSSH_PARENT_BOXES or box_type == b'pssh':
+                if offset + size > len(data): return pssh_boxes, (None if complete else offset + size)
+                if box_type == b'pssh': pssh_boxes.append(data[offset: offset+size])
+                child_offset = offset + header_size
+                while box_type != b'pssh' and (child := SearchPsshValueUtils._readboxheader(data, child_offset, offset + size)) is not None:
+                    if child[0] == b'pssh': pssh_boxes.append(data[child_offset: child_offset+child[1]])
+                    child_offset += child[1]
+                if box_type == b'moov': return pssh_boxes, None
+            offset += size
+        return pssh_boxes, (None if complete else offset + 16)
+    '''_scanpsshboxes'''
+    @staticmethod
+    def _scanpsshboxes(content: bytes) -> list[bytes]:
+        offsets, offset = [], 0
         while True:
             if (offset := content.find(b'pssh', offset)) == -1: break
             size = int.from_bytes(content[offset-4: offset], byteorder='big'); pssh_offset = offset - 4
-            offsets.append(content[pssh_offset: pssh_offset+size]); offset += size
-        pssh_list = [base64.b64encode(wv_offset).decode() for wv_offset in offsets]
+            offsets.append(content[pssh_offset: pssh_offset+size]); offset += max(size, 4)
+        return offsets
+    '''getpsshfrominit'''
+    @staticmethod
+    def getpsshfrominit(init_url, request_overrides: dict = None):
+        size = SearchPsshValueUtils.INIT_RANGE_BYTES
+        # only the leading bytes are requested, the window grows just when moov lies beyond it
+        while True:
+            content, complete = SearchPsshValueUtils._fetchinit(init_url, size, request_overrides)
+            try: pssh_boxes, required_size = SearchPsshValueUtils._findpsshboxes(content, complete)
+            except ValueError: pssh_boxes, required_size = SearchPsshValueUtils._scanpsshboxes(content), None
+            if complete or required_size is None or required_size > SearchPsshValueUtils.MAX_INIT_RANGE_BYTES: break
+            size = min(max(required_size, size * 2), SearchPsshValueUtils.MAX_INIT_RANGE_BYTES)
+        pssh_list = [base64.b64encode(wv_offset).decode() for wv_offset in (pssh_boxes or SearchPsshValueUtils._scanpsshboxes(content))]
         for pssh in pssh_list:
             if 70 < len(pssh) < 190: return pssh
         return None
@@ -8,14 +8,17 @@ WeChat Official Account (微信公众号):
 '''
 import os
 import sys
+import json
 import stat
 import time
 import socket
 import shutil
+import hashlib
 import zipfile
 import platform
 import tempfile
 import requests
+import threading
 from uuid import uuid4
 from .io import FileLock
 from pathlib import Path
@@ -26,6 +29,10 @@ from typing import Optional, Tuple, Callable, TYPE_CHECKING
 
 '''ChromiumDownloaderUtils'''
 class ChromiumDownloaderUtils():
+    VERSION_CACHE_FILENAME_TEMPLATE = ".version-cache-{channel}.json"
+    REFRESH_RETRY_BACKOFF = 600.0
+    _refresh_threads: dict[str, threading.Thread] = {}
+    _refresh_threads_lock = threading.Lock()
     '''defaulttargetdir'''
     @staticmethod
     def defaulttargetdir() -> Path:
@@ -96,25 +103,76 @@ class ChromiumDownloaderUtils():
         raise RuntimeError(f"Failed to download file from {url}: {last_exc}") from last_exc
     '''cleanupoldversions'''
     @staticmethod
-    def cleanupoldversions(base_platform_dir: Path, keep_version: str) -> None:
+    def cleanupoldversions(base_platform_dir: Path, keep_version: str, extra_keep_versions: tuple = ()) -> None:
         if not base_platform_dir.exists(): return
         for child in base_platform_dir.iterdir():
             if not child.is_dir(): continue
-            if (name := child.name) == keep_version: continue
+            if (name := child.name) == keep_version or name in extra_keep_versions: continue
             if name.startswith(".tmp-"): ChromiumDownloaderUtils.removetree(child); continue
             ChromiumDownloaderUtils.removetree(child)
-    '''autodownloadchrome'''
+    '''filesha256'''
     @staticmethod
-    def autodownloadchrome(target_dir: Optional[str] = None, channel: str = "Stable", force_redownload: bool = False, cleanup_old_versions: bool = False, lock_timeout: float = 300.0) -> str:
-        base_dir = Path(target_dir).resolve() if target_dir else ChromiumDownloaderUtils.defaulttargetdir().resolve()
-        base_dir.mkdir(parents=True, exist_ok=True); pf, exe_inside_package = ChromiumDownloaderUtils.resolveplatform()
+    def filesha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(chunk_size), b""): hasher.update(chunk)
+        return hasher.hexdigest()
+    '''versioncachepath'''
+    @staticmethod
+    def versioncachepath(platform_dir: Path, channel: str = "Stable") -> Path:
+        return platform_dir / ChromiumDownloaderUtils.VERSION_CACHE_FILENAME_TEMPLATE.format(channel=channel.lower())
+    '''saveversioncache'''
+    @staticmethod
+    def saveversioncache(platform_dir: Path, channel: str, version: str, exe_path: Path, checksum: str = None) -> dict:
+        st = (exe_path := Path(exe_path)).stat(); checksum = checksum or ChromiumDownloaderUtils.filesha256(exe_path)
+        cache = {"channel": channel, "version": version, "path": str(exe_path), "sha256": checksum, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "checked_at": time.time()}
+        cache_path = ChromiumDownloaderUtils.versioncachepath(platform_dir, channel); tmp_path = cache_path.with_name(f"{cache_path.name}.{uuid4().hex}.tmp")
+        try: tmp_path.write_text(json.dumps(cache, indent=2), encoding="utf-8"); os.replace(str(tmp_path), str(cache_path))
+        finally: tmp_path.unlink(missing_ok=True)
+        return cache
+    '''loadversioncache'''
+    @staticmethod
+    def loadversioncache(platform_dir: Path, channel: str = "Stable") -> Optional[dict]:
+        try: cache: dict = json.loads(ChromiumDownloaderUtils.versioncachepath(platform_dir, channel).read_text(encoding="utf-8"))
+        except Exception: return None
+        if not all(k in cache for k in ("version", "path", "sha256", "size", "mtime_ns", "checked_at")): return None
+        if not (exe_path := Path(cache["path"])).is_file(): return None
+        # unchanged stat means the binary is the one we hashed, only re-hash when it drifts
+        if (st := exe_path.stat()).st_size == cache["size"] and st.st_mtime_ns == cache["mtime_ns"]: return cache
+        try: checksum = ChromiumDownloaderUtils.filesha256(exe_path)
+        except Exception: return None
+        if checksum != cache["sha256"]: return None
+        cache.update(dict(size=st.st_size, mtime_ns=st.st_mtime_ns)); return cache
+    '''recordversioncheckfailure'''
+    @staticmethod
+    def recordversioncheckfailure(platform_dir: Path, channel: str, version_check_interval: float) -> None:
+        # failed checks also move checked_at, the retry delay doubles per consecutive failure up to version_check_interval
+        cache_path = ChromiumDownloaderUtils.versioncachepath(platform_dir, channel); tmp_path = cache_path.with_name(f"{cache_path.name}.{uuid4().hex}.tmp")
+        try: cache: dict = json.loads(cache_path.read_text(encoding="utf-8"))
+        except Exception: return
+        failures = int(cache.get("failures", 0)) + 1
+        cache.update(dict(checked_at=time.time(), failures=failures, retry_after=min(ChromiumDownloaderUtils.REFRESH_RETRY_BACKOFF * 2 ** (failures - 1), version_check_interval)))
+        try: tmp_path.write_text(json.dumps(cache, indent=2), encoding="utf-8"); os.replace(str(tmp_path), str(cache_path))
+        except Exception: pass
+        finally: tmp_path.unlink(missing_ok=True)
+    '''recordinstalledchrome'''
+    @staticmethod
+    def recordinstalledchrome(platform_dir: Path, channel: str, version: str, exe_path: Path) -> None:
+        cache = ChromiumDownloaderUtils.loadversioncache(platform_dir, channel)
+        reuse_checksum = cache["sha256"] if cache and cache["version"] == version and Path(cache["path"]) == Path(exe_path) else None
+        try: ChromiumDownloaderUtils.saveversioncache(platform_dir, channel, version, exe_path, checksum=reuse_checksum)
+        except Exception: pass
+    '''installchrome'''
+    @staticmethod
+    def installchrome(base_dir: Path, channel: str = "Stable", force_redownload: bool = False, cleanup_old_versions: bool = False, lock_timeout: float = 300.0, keep_versions: tuple = ()) -> str:
+        pf, exe_inside_package = ChromiumDownloaderUtils.resolveplatform()
         with requests.Session() as session:
             session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; autodownloadchrome/1.0)"})
             version, download_url = ChromiumDownloaderUtils.getstabledownloadinfo(session, pf, channel=channel)
             platform_dir = base_dir / pf; version_dir = platform_dir / version; final_exe = version_dir / f"chrome-{pf}" / exe_inside_package; lock_path = platform_dir / ".install.lock"
-            if final_exe.is_file() and not force_redownload: os.name != "nt" and ChromiumDownloaderUtils.makeexecutable(final_exe); return str(final_exe)
+            if final_exe.is_file() and not force_redownload: os.name != "nt" and ChromiumDownloaderUtils.makeexecutable(final_exe); ChromiumDownloaderUtils.recordinstalledchrome(platform_dir, channel, version, final_exe); return str(final_exe)
             with FileLock(lock_path, timeout=lock_timeout):
-                if final_exe.is_file() and not force_redownload: os.name != "nt" and ChromiumDownloaderUtils.makeexecutable(final_exe); return str(final_exe)
+                if final_exe.is_file() and not force_redownload: os.name != "nt" and ChromiumDownloaderUtils.makeexecutable(final_exe); ChromiumDownloaderUtils.recordinstalledchrome(platform_dir, channel, version, final_exe); return str(final_exe)
                 if force_redownload and version_dir.exists(): ChromiumDownloaderUtils.removetree(version_dir)
                 tmp_dir = platform_dir / f".tmp-{version}-{uuid4().hex}"; extract_dir = tmp_dir / "extract"; zip_path = tmp_dir / "chrome.zip"
                 try:
@@ -129,10 +187,39 @@ class ChromiumDownloaderUtils():
                     os.replace(str(extract_dir), str(version_dir))
                     if not final_exe.is_file(): raise FileNotFoundError(f"Chrome executable missing after install: {final_exe}")
                     if os.name != "nt": ChromiumDownloaderUtils.makeexecutable(final_exe)
-                    if cleanup_old_versions: ChromiumDownloaderUtils.cleanupoldversions(platform_dir, keep_version=version)
+                    ChromiumDownloaderUtils.recordinstalledchrome(platform_dir, channel, version, final_exe)
+                    if cleanup_old_versions: ChromiumDownloaderUtils.cleanupoldversions(platform_dir, keep_version=version, extra_keep_versions=tuple(keep_versions))
                     return str(final_exe)
                 finally:
                     ChromiumDownloaderUtils.removetree(tmp_dir)
+    '''refreshchromeinbackground'''
+    @staticmethod
+    def refreshchromeinbackground(base_dir: Path, channel: str = "Stable", cleanup_old_versions: bool = False, lock_timeout: float = 300.0, in_use_version: str = None, version_check_interval: float = 86400.0) -> threading.Thread:
+        key, platform_dir = f"{base_dir}::{channel}", base_dir / ChromiumDownloaderUtils.resolveplatform()[0]
+        '''refresh_func'''
+        def refresh_func():
+            # the version handed out to the caller may be running right now, so it is never removed by a background refresh
+            try: ChromiumDownloaderUtils.installchrome(base_dir, channel=channel, cleanup_old_versions=cleanup_old_versions, lock_timeout=lock_timeout, keep_versions=(in_use_version,) if in_use_version else ())
+            except Exception: ChromiumDownloaderUtils.recordversioncheckfailure(platform_dir, channel, version_check_interval)
+            finally:
+                with ChromiumDownloaderUtils._refresh_threads_lock: ChromiumDownloaderUtils._refresh_threads.pop(key, None)
+        with ChromiumDownloaderUtils._refresh_threads_lock:
+            if (thread := ChromiumDownloaderUtils._refresh_threads.get(key)) and thread.is_alive(): return thread
+            thread = threading.Thread(target=refresh_func, name=f"autodownloadchrome-{channel}", daemon=True); ChromiumDownloaderUtils._refresh_threads[key] = thread; thread.start()
+        return thread
+    '''autodownloadchrome'''
+    @staticmethod
+    def autodownloadchrome(target_dir: Optional[str] = None, channel: str = "Stable", force_redownload: bool = False, cleanup_old_versions: bool = False, lock_timeout: float = 300.0, version_check_interval: float = 86400.0, background_version_check: bool = True) -> str:
+        base_dir = Path(target_dir).resolve() if target_dir else ChromiumDownloaderUtils.defaulttargetdir().resolve()
+        base_dir.mkdir(parents=True, exist_ok=True); pf, _ = ChromiumDownloaderUtils.resolveplatform(); platform_dir = base_dir / pf
+        # cached binary is used directly, the remote version json is only consulted after version_check_interval seconds
+        if (not force_redownload) and (cache := ChromiumDownloaderUtils.loadversioncache(platform_dir, channel)):
+            if os.name != "nt": ChromiumDownloaderUtils.makeexecutable(Path(cache["path"]))
+            if time.time() - float(cache["checked_at"]) < min(float(cache.get("retry_after") or version_check_interval), version_check_interval): return cache["path"]
+            if background_version_check: ChromiumDownloaderUtils.refreshchromeinbackground(base_dir, channel=channel, cleanup_old_versions=cleanup_old_versions, lock_timeout=lock_timeout, in_use_version=cache["version"], version_check_interval=version_check_interval); return cache["path"]
+            try: return ChromiumDownloaderUtils.installchrome(base_dir, channel=channel, cleanup_old_versions=cleanup_old_versions, lock_timeout=lock_timeout)
+            except Exception: ChromiumDownloaderUtils.recordversioncheckfailure(platform_dir, channel, version_check_interval); return cache["path"]
+        return ChromiumDownloaderUtils.installchrome(base_dir, channel=channel, force_redownload=force_redownload, cleanup_old_versions=cleanup_old_versions, lock_timeout=lock_timeout)
 
 
 '''DrissionPageUtils'''
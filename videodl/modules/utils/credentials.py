@@ -0,0 +1,96 @@
+'''
+Function:
+    Implementation of Credential Cache Related Utils
+Author:
+    Zhenchao Jin
+WeChat Official Account (微信公众号):
+    Charles的皮卡丘
+'''
+import os
+import json
+import time
+import threading
+from uuid import uuid4
+from .io import FileLock
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+'''CredentialCache'''
+class CredentialCache():
+    INVALIDATING_STATUS_CODES = {401, 403}
+    FETCH_LOCK_TIMEOUT = 600.0
+    _memory: dict[tuple[str, str], tuple[Any, float]] = {}
+    _key_locks: dict[tuple[str, str], threading.Lock] = {}
+    _global_lock = threading.Lock()
+    def __init__(self, cache_dir: str, namespace: str, ttl: float = 1800.0, lock_timeout: float = 60.0, fetch_lock_timeout: float = None):
+        self.ttl = ttl
+        self.namespace = namespace
+        self.lock_timeout = lock_timeout
+        self.fetch_lock_timeout = max(CredentialCache.FETCH_LOCK_TIMEOUT if fetch_lock_timeout is None else fetch_lock_timeout, lock_timeout)
+        self.cache_path = Path(cache_dir) / f"{namespace}.json"
+        self.lock_path = Path(cache_dir) / f"{namespace}.lock"
+        self.fetch_lock_path = Path(cache_dir) / f"{namespace}.fetch.lock"
+    '''_keylock'''
+    def _keylock(self, key: str) -> threading.Lock:
+        with CredentialCache._global_lock: return CredentialCache._key_locks.setdefault((str(self.cache_path), key), threading.Lock())
+    '''_readfile'''
+    def _readfile(self) -> dict:
+        try: return json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except Exception: return {}
+    '''_writefile'''
+    def _writefile(self, data: dict) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True); tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{uuid4().hex}.tmp")
+        try: tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8"); os.replace(str(tmp_path), str(self.cache_path))
+        finally: tmp_path.unlink(missing_ok=True)
+    '''get'''
+    def get(self, key: str, default: Any = None) -> Any:
+        if (item := CredentialCache._memory.get((str(self.cache_path), key))) and item[1] > time.time(): return item[0]
+        if not (item := self._readfile().get(key)) or float(item.get("expires_at", 0)) <= time.time(): return default
+        CredentialCache._memory[(str(self.cache_path), key)] = (item["value"], float(item["expires_at"]))
+        return item["value"]
+    '''set'''
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> Any:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with FileLock(self.lock_path, timeout=self.lock_timeout):
+            (data := self._readfile())[key] = {"value": value, "expires_at": expires_at}
+            self._writefile({k: v for k, v in data.items() if float(v.get("expires_at", 0)) > time.time()})
+        CredentialCache._memory[(str(self.cache_path), key)] = (value, expires_at)
+        return value
+    '''setmany'''
+    def setmany(self, items: dict[str, Any], ttl: Optional[float] = None) -> dict[str, Any]:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with FileLock(self.lock_path, timeout=self.lock_timeout):
+            (data := self._readfile()).update({key: {"value": value, "expires_at": expires_at} for key, value in items.items()})
+            self._writefile({k: v for k, v in data.items() if float(v.get("expires_at", 0)) > time.time()})
+        for key, value in items.items(): CredentialCache._memory[(str(self.cache_path), key)] = (value, expires_at)
+        return items
+    '''invalidate'''
+    def invalidate(self, key: str) -> None:
+        CredentialCache._memory.pop((str(self.cache_path), key), None)
+        with FileLock(self.lock_path, timeout=self.lock_timeout):
+            if key in (data := self._readfile()): data.pop(key); self._writefile(data)
+    '''getorfetch'''
+    def getorfetch(self, key: str, fetch_func: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        # falsy values are never served or stored, a failed fetch must not pin a bad credential for the whole ttl
+        if value := self.get(key): return value
+        # single flight, threads wait on a per key lock and processes on the namespace fetch lock, which is held across slow fetches (e.g. a browser launch)
+        with self._keylock(key):
+            if value := self.get(key): return value
+            acquired = False
+            try:
+                with FileLock(self.fetch_lock_path, timeout=self.fetch_lock_timeout):
+                    acquired = True
+                    if value := self.get(key): return value
+                    return self._storefetched(key, fetch_func(), ttl=ttl)
+            except TimeoutError:
+                if acquired: raise
+            # another process held the fetch lock past the timeout, fetch without it rather than fail
+            return self._storefetched(key, fetch_func(), ttl=ttl)
+    '''_storefetched'''
+    def _storefetched(self, key: str, value: Any, ttl: Optional[float] = None) -> Any:
+        return self.set(key, value, ttl=ttl) if value else value
+    '''shouldinvalidate'''
+    @staticmethod
+    def shouldinvalidate(resp) -> bool:
+        return getattr(resp, "status_code", None) in CredentialCache.INVALIDATING_STATUS_CODES
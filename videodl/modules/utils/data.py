@@ -26,11 +26,14 @@ class VideoInfo(MutableMapping):
     # download info
     chunk_size: int = 1024 * 1024
     download_url: str = ""
+    download_url_mirrors: list = field(default_factory=list)
     default_download_headers: Any = None
     default_download_cookies: Any = None
     audio_download_url: str = ""
+    audio_download_url_mirrors: list = field(default_factory=list)
     default_audio_download_headers: Any = None
     default_audio_download_cookies: Any = None
+    variant_selection: Dict[str, Any] = field(default_factory=dict)
     # ext and save path
     ext: str = "mp4"
     save_path: str = ""
@@ -51,7 +54,7 @@ class VideoInfo(MutableMapping):
     identifier: str = ""
     # filed names
     _field_names: ClassVar[tuple[str, ...]] = (
-        "source", "raw_data", "title", "cover_url", "err_msg", "download_url", "default_download_headers", "default_download_cookies", "audio_download_url", "default_audio_download_headers", "default_audio_download_cookies", "ext", "save_path", 
+        "source", "raw_data", "title", "cover_url", "err_msg", "download_url", "download_url_mirrors", "default_download_headers", "default_download_cookies", "audio_download_url", "audio_download_url_mirrors", "default_audio_download_headers", "default_audio_download_cookies", "variant_selection", "ext", "save_path", 
         "guess_video_ext_result", "audio_ext", "audio_save_path", "guess_audio_ext_result", "download_with_ffmpeg", "ffmpeg_settings", "enable_nm3u8dlre", "nm3u8dlre_settings", "download_with_aria2c", "aria2c_settings", "identifier",
     )
     # with valid video download url
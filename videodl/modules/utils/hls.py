@@ -8,80 +8,100 @@ WeChat Official Account (微信公众号):
 '''
 from __future__ import annotations
 import re
-import ssl
 import time
+import queue
 import urllib
 import requests
-import statistics
-import urllib.error
+import threading
 import urllib.parse
-import urllib.request
 from pathlib import Path
 from collections import deque
 from contextlib import suppress
-from http.client import HTTPResponse
+from dataclasses import dataclass
+from .mirrors import HostScoreboard, MirrorProber
 from .misc import floatornone, intornone
 from urllib.parse import urlparse, urljoin
-from concurrent.futures import ThreadPoolExecutor, Future, as_completed
-from typing import Sequence, Union, Literal, Optional, Dict, List, Tuple
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Sequence, Union, Literal, Optional, Dict, List, Tuple, Iterable, Iterator
 
 
 '''TencentHLSHelper'''
 class TencentHLSHelper():
-    '''createsslcontext'''
+    DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36', 'Accept-Language': 'en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7', 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'}
+    TEXT_ENCODINGS = ('utf-8', 'gbk', 'gb2312', 'latin-1')
+    M3U8_ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=(?:"([^"]*?)"|([^,]*))')
+    _session: requests.Session = None
+    _lock = threading.Lock()
+    '''_getsession'''
     @staticmethod
-    def createsslcontext():
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        return ctx
-    '''naivedownloadwebpage'''
+    def _getsession() -> requests.Session:
+        # one pooled keep-alive session for every playlist / variant fetch, requests negotiates gzip and deflate on its own
+        with TencentHLSHelper._lock:
+            if TencentHLSHelper._session is None:
+                (session := requests.Session()).mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16)); session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+                session.headers.update(TencentHLSHelper.DEFAULT_HEADERS); TencentHLSHelper._session = session
+            return TencentHLSHelper._session
+    '''_request'''
     @staticmethod
-    def naivedownloadwebpage(url, headers: dict = None, query: dict = None):
-        if query: filtered_query = {k: v for k, v in query.items() if v is not None}; url = url + '?' + urllib.parse.urlencode(filtered_query)
-        (req := urllib.request.Request(url)).add_header('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        req.add_header('Accept-Language', 'en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7')
-        req.add_header('Accept', 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8')
-        if headers: tuple(req.add_header(k, v) for k, v in headers.items())
-        try: resp: HTTPResponse = urllib.request.urlopen(req, context=TencentHLSHelper.createsslcontext(), timeout=30)
-        except urllib.error.HTTPError as e: raise Exception(f'HTTP Error {e.code}: {e.reason} for URL {url}')
-        except urllib.error.URLError as e: raise Exception(f'URL Error: {e.reason} for URL {url}')
-        for encoding in ('utf-8', 'gbk', 'gb2312', 'latin-1'):
-            try: return resp.read().decode(encoding)
+    def _request(url, headers: dict = None, query: dict = None, stream: bool = False) -> requests.Response:
+        params = {k: v for k, v in query.items() if v is not None} if query else None
+        try:
+            try: resp = TencentHLSHelper._getsession().get(url, params=params, headers=headers, timeout=30, stream=stream)
+            except requests.exceptions.SSLError: resp = TencentHLSHelper._getsession().get(url, params=params, headers=headers, timeout=30, stream=stream, verify=False)
+        except requests.RequestException as e: raise Exception(f'URL Error: {e} for URL {url}')
+        if resp.status_code >= 400: resp.close(); raise Exception(f'HTTP Error {resp.status_code}: {resp.reason} for URL {url}')
+        return resp
+    '''_decodetext'''
+    @staticmethod
+    def _decodetext(content: bytes) -> str:
+        for encoding in TencentHLSHelper.TEXT_ENCODINGS:
+            try: return content.decode(encoding)
             except UnicodeDecodeError: continue
-        return resp.read().decode('utf-8', errors='replace')
+        return content.decode('utf-8', errors='replace')
+    '''naiveiterm3u8lines'''
+    @staticmethod
+    def naiveiterm3u8lines(url, headers: dict = None, query: dict = None) -> Iterator[str]:
+        with TencentHLSHelper._request(url, headers=headers, query=query, stream=True) as resp:
+            for raw_line in resp.iter_lines(chunk_size=16384):
+                if (line := TencentHLSHelper._decodetext(raw_line).strip()): yield line
     '''naiveparsem3u8attributes'''
     @staticmethod
     def naiveparsem3u8attributes(line):
-        return {m.group(1): (m.group(2) if m.group(2) is not None else m.group(3)) for m in re.finditer(r'([A-Z0-9-]+)=(?:"([^"]*?)"|([^,]*))', line)}
-    '''naiveparsem3u8formats'''
+        return {m.group(1): (m.group(2) if m.group(2) is not None else m.group(3)) for m in TencentHLSHelper.M3U8_ATTRIBUTE_PATTERN.finditer(line)}
+    '''naiveparsem3u8lines'''
     @staticmethod
-    def naiveparsem3u8formats(m3u8_url: str):
-        try: m3u8_text: str = TencentHLSHelper.naivedownloadwebpage(m3u8_url)
-        except Exception: return [{'url': m3u8_url, 'ext': 'mp4', 'protocol': 'm3u8'}], {}
-        if '#EXTM3U' not in m3u8_text: return [{'url': m3u8_url, 'ext': 'mp4', 'protocol': 'm3u8'}], {}
-        formats, subtitles, base_url, lines, i = [], {}, m3u8_url.rsplit('/', 1)[0] + '/', m3u8_text.strip().splitlines(), 0
-        while i < len(lines):
-            if (line := lines[i].strip()).startswith('#EXT-X-STREAM-INF:'):
-                attrs = TencentHLSHelper.naiveparsem3u8attributes(line[len('#EXT-X-STREAM-INF:'):]); i += 1
-                if i < len(lines):
-                    if not (stream_url := lines[i].strip()).startswith('http'): stream_url = urllib.parse.urljoin(base_url, stream_url)
-                    fmt = {'url': stream_url, 'ext': 'mp4', 'protocol': 'm3u8_native'}
-                    if 'BANDWIDTH' in attrs: fmt['tbr'] = floatornone(attrs['BANDWIDTH'], scale=1000)
-                    if 'RESOLUTION' in attrs: (res := attrs.get('RESOLUTION')) and ('x' in res) and (lambda w, h: fmt.update({'width': intornone(w), 'height': intornone(h)}))(*res.split('x', 1))
-                    formats.append(fmt)
+    def naiveparsem3u8lines(lines: Iterable[str], base_url: str):
+        # single pass state machine, attribute regexes only run on the two tag types we care about
+        formats, subtitles, pending_attrs, lines = [], {}, None, iter(lines)
+        if not next(lines, '').lstrip('\ufeff').startswith('#EXTM3U'): return None, None
+        for line in lines:
+            if not line.startswith('#'):
+                if pending_attrs is None: continue
+                fmt = {'url': line if line.startswith('http') else urllib.parse.urljoin(base_url, line), 'ext': 'mp4', 'protocol': 'm3u8_native'}
+                if 'BANDWIDTH' in pending_attrs: fmt['tbr'] = floatornone(pending_attrs['BANDWIDTH'], scale=1000)
+                if 'x' in (res := pending_attrs.get('RESOLUTION') or ''): w, h = res.split('x', 1); fmt.update({'width': intornone(w), 'height': intornone(h)})
+                formats.append(fmt); pending_attrs = None
+            elif line.startswith('#EXT-X-STREAM-INF:'):
+                pending_attrs = TencentHLSHelper.naiveparsem3u8attributes(line[len('#EXT-X-STREAM-INF:'):])
             elif line.startswith('#EXT-X-MEDIA:') and 'TYPE=SUBTITLES' in line:
                 attrs = TencentHLSHelper.naiveparsem3u8attributes(line[len('#EXT-X-MEDIA:'):]); sub_url: str = attrs.get('URI', '')
                 if sub_url and not sub_url.startswith('http'): sub_url = urllib.parse.urljoin(base_url, sub_url)
                 lang = attrs.get('LANGUAGE', attrs.get('NAME', 'und')).lower().strip('"')
                 if sub_url: subtitles.setdefault(lang, []).append({'url': sub_url, 'ext': 'vtt'})
-            i += 1
+        return formats, subtitles
+    '''naiveparsem3u8formats'''
+    @staticmethod
+    def naiveparsem3u8formats(m3u8_url: str):
+        try: formats, subtitles = TencentHLSHelper.naiveparsem3u8lines(TencentHLSHelper.naiveiterm3u8lines(m3u8_url), base_url=m3u8_url.rsplit('/', 1)[0] + '/')
+        except Exception: return [{'url': m3u8_url, 'ext': 'mp4', 'protocol': 'm3u8'}], {}
+        if formats is None: return [{'url': m3u8_url, 'ext': 'mp4', 'protocol': 'm3u8'}], {}
         if not formats: formats.append({'url': m3u8_url, 'ext': 'mp4', 'protocol': 'm3u8_native'})
         return formats, subtitles
     '''writevodm3u8'''
     @staticmethod
     def writevodm3u8(segments: Sequence[str], out_path: Union[str, Path], *, seg_duration: float = 10.0, pick: Union[int, Literal["best"]] = 0, strategy: Literal["global_host", "per_segment"] = "global_host", media_sequence: int = 1, playlist_type_vod: bool = True, strict: bool = True, verbose: bool = False, 
-                     probe_method: Literal["head_then_range_get", "range_get_only"] = "head_then_range_get", probe_timeout: float = 5.0, probe_workers: int = 16, samples_per_host: int = 2, range_bytes: int = 1024, default_headers: dict = None, default_cookies: dict = None, request_overrides: dict = None) -> Path:
+                     probe_method: Literal["head_then_range_get", "range_get_only"] = "head_then_range_get", probe_timeout: float = 5.0, probe_workers: int = 16, samples_per_host: int = 2, range_bytes: int = 1024, default_headers: dict = None, default_cookies: dict = None, request_overrides: dict = None, scoreboard: HostScoreboard = None, explore_budget: int = None) -> Path:
         # init
         default_headers, default_cookies, request_overrides = default_headers or {}, default_cookies or {}, request_overrides or {}
         out_path = Path(out_path); out_path.parent.mkdir(parents=True, exist_ok=True)
@@ -95,55 +115,54 @@ class TencentHLSHelper():
             if (parts := [p.replace(" ", "") for p in parts if p.startswith(("http://", "https://"))]): parsed.append(parts)
         if strict and not parsed: raise ValueError("no valid http(s) URLs found in `segments`.")
         # probe function definition
-        def probe_once_func(url: str) -> Tuple[bool, float, Optional[int], Optional[str]]:
-            def head_func() -> Tuple[bool, float, Optional[int], Optional[str]]:
+        def probe_once_func(url: str) -> Tuple[bool, float, Optional[int], Optional[str], Optional[float]]:
+            def head_func() -> Tuple[bool, float, Optional[int], Optional[str], Optional[float]]:
                 t0 = time.perf_counter()
-                try: resp = requests.head(url, headers=default_headers, timeout=probe_timeout, allow_redirects=True, cookies=default_cookies, **request_overrides); elapsed = time.perf_counter() - t0; return (resp.status_code in ok_statuses, elapsed, resp.status_code, None)
-                except requests.RequestException as err: elapsed = time.perf_counter() - t0; return (False, elapsed, None, f"{type(err).__name__}: {err}")
-            def range_get_func() -> Tuple[bool, float, Optional[int], Optional[str]]:
-                t0, headers = time.perf_counter(), dict(default_headers); headers["Range"] = f"bytes=0-{max(0, range_bytes-1)}"
+                try: resp = requests.head(url, headers=default_headers, timeout=probe_timeout, allow_redirects=True, cookies=default_cookies, **request_overrides); elapsed = time.perf_counter() - t0; return (resp.status_code in ok_statuses, elapsed, resp.status_code, None, None)
+                except requests.RequestException as err: elapsed = time.perf_counter() - t0; return (False, elapsed, None, f"{type(err).__name__}: {err}", None)
+            def range_get_func() -> Tuple[bool, float, Optional[int], Optional[str], Optional[float]]:
+                t0, headers, received, first_byte_at = time.perf_counter(), dict(default_headers), 0, None; headers["Range"] = f"bytes=0-{max(0, range_bytes-1)}"
                 try:
-                    resp = requests.get(url, headers=headers, timeout=probe_timeout, allow_redirects=True, stream=True, cookies=default_cookies, **request_overrides)
-                    with suppress(Exception): next(resp.iter_content(chunk_size=1), b"")
-                    elapsed = time.perf_counter() - t0; return (resp.status_code in ok_statuses, elapsed, resp.status_code, None)
+                    with requests.get(url, headers=headers, timeout=probe_timeout, allow_redirects=True, stream=True, cookies=default_cookies, **request_overrides) as resp:
+                        # the probed range is read in full, ttfb comes from the first chunk and throughput from the body after it
+                        with suppress(Exception):
+                            for chunk in resp.iter_content(chunk_size=16384):
+                                if not chunk: continue
+                                first_byte_at = first_byte_at or time.perf_counter(); received += len(chunk)
+                                if received >= range_bytes or time.perf_counter() - t0 > probe_timeout: break
+                        finished_at = time.perf_counter(); ok = resp.status_code in ok_statuses
+                        throughput = received / max(finished_at - first_byte_at, 1e-3) if ok and received else None
+                        return (ok, (first_byte_at or finished_at) - t0, resp.status_code, None, throughput)
                 except requests.RequestException as err:
                     elapsed = time.perf_counter() - t0
-                    return (False, elapsed, None, f"{type(err).__name__}: {err}")
+                    return (False, elapsed, None, f"{type(err).__name__}: {err}", None)
             if probe_method == "range_get_only": return range_get_func()
-            ok, elapsed, code, err = head_func()
-            if ok: return ok, elapsed, code, err
+            ok, elapsed, code, err, throughput = head_func()
+            if ok: return ok, elapsed, code, err, throughput
             return range_get_func()
-        # probe pick best function
-        def probe_pick_best_func(parts: List[str]) -> str:
-            best_u, best_t = None, float("inf")
-            with ThreadPoolExecutor(max_workers=min(len(parts), max(1, probe_workers))) as ex:
-                futs = {ex.submit(probe_once_func, u): u for u in parts}
-                for fut in as_completed(futs):
-                    u = futs[fut]; ok, elapsed, code, err = fut.result()
-                    if verbose: print(f"[probe seg] ok={ok} t={elapsed:.3f}s code={code} url={u} err={err}")
-                    if ok and elapsed < best_t: best_t, best_u = elapsed, u
-            return best_u if best_u is not None else parts[0]
         # pick based on given arguments
         if pick != "best": idx = int(pick); chosen_urls = [pick_index_func(parts, idx) for parts in parsed]
         else:
-            if strategy == "per_segment": chosen_urls = [probe_pick_best_func(parts) for parts in parsed]
-            else:
-                host_samples: Dict[str, List[str]] = {}
-                deque(((h:=host_func(u)) and ((lst:=host_samples.setdefault(h, [])) is not None) and (len(lst) < samples_per_host) and (lst.append(u) or True) for parts in parsed for u in parts), maxlen=0)
-                if strict and not host_samples: raise ValueError("pick='best': no hosts found to probe.")
-                host_ok: Dict[str, int] = {h: 0 for h in host_samples}; host_lat: Dict[str, List[float]] = {h: [] for h in host_samples}
-                with ThreadPoolExecutor(max_workers=max(1, probe_workers)) as ex:
-                    futs: list[tuple[str, str, Future]] = []
-                    deque((futs.append((h, u, ex.submit(probe_once_func, u))) for h, urls in host_samples.items() for u in urls), maxlen=0)
+            # host results live in a shared, persisted scoreboard, only unknown / faded hosts plus a small exploration budget are probed per call
+            scoreboard, host_samples = scoreboard or HostScoreboard.getinstance(), {}
+            deque(((h:=host_func(u)) and ((lst:=host_samples.setdefault(h, [])) is not None) and (len(lst) < samples_per_host) and (lst.append(u) or True) for parts in parsed for u in parts), maxlen=0)
+            if strict and not host_samples: raise ValueError("pick='best': no hosts found to probe.")
+            if (probe_hosts := scoreboard.planprobes(list(host_samples), budget=explore_budget)):
+                with ThreadPoolExecutor(max_workers=max(1, min(probe_workers, sum(len(host_samples[h]) for h in probe_hosts)))) as ex:
+                    futs: list[tuple[str, str, Future]] = [(h, u, ex.submit(probe_once_func, u)) for h in probe_hosts for u in host_samples[h]]
                     for h, u, fut in futs:
-                        ok, elapsed, code, err = fut.result()
-                        if verbose: print(f"[probe host] {h} ok={ok} t={elapsed:.3f}s code={code} url={u} err={err}")
-                        if ok: host_ok[h] += 1; host_lat[h].append(elapsed)
-                scored = [(host_ok[h], statistics.median(host_lat[h]) if host_lat[h] else float("inf"), h) for h in host_samples if host_ok[h] > 0]
-                if strict and not scored: raise ValueError("pick='best' (global_host): no reachable host found in probes.")
-                scored.sort(key=lambda x: (-x[0], x[1], x[2])); best_host = scored[0][2]
-                if verbose: print(f"[best_host] {best_host} ok_samples={scored[0][0]} median={scored[0][1]:.3f}s")
-                for parts in parsed: u = next((x for x in parts if host_func(x) == best_host), None); chosen_urls.append(u if u is not None else probe_pick_best_func(parts))
+                        ok, elapsed, code, err, throughput = fut.result(); scoreboard.record(h, ok, ttfb=elapsed if ok else None, throughput=throughput)
+                        if verbose: print(f"[probe host] {h} ok={ok} t={elapsed:.3f}s bps={throughput or 0:.0f} code={code} url={u} err={err}")
+                scoreboard.flush()
+            ranked_hosts = [h for h in scoreboard.rank(list(host_samples)) if scoreboard.usable(h)]
+            if strict and not ranked_hosts: raise ValueError(f"pick='best' ({strategy}): no reachable host found in probes.")
+            host_order = {h: i for i, h in enumerate(ranked_hosts or list(host_samples))}
+            pick_ranked_func = lambda parts: min(parts, key=lambda u: host_order.get(host_func(u), len(host_order)))
+            if strategy == "per_segment": chosen_urls = [pick_ranked_func(parts) for parts in parsed]
+            else:
+                best_host = next(iter(host_order))
+                if verbose: print(f"[best_host] {best_host} score={scoreboard.score(best_host)}")
+                for parts in parsed: u = next((x for x in parts if host_func(x) == best_host), None); chosen_urls.append(u if u is not None else pick_ranked_func(parts))
         if strict and not chosen_urls: raise ValueError("no segments chosen (unexpected).")
         # write m3u8
         target_duration = int(seg_duration) if float(seg_duration).is_integer() else int(seg_duration) + 1
@@ -155,13 +174,128 @@ class TencentHLSHelper():
         return out_path
 
 
+'''HLSSegment'''
+@dataclass(slots=True)
+class HLSSegment:
+    uri: str
+    duration: float = 0.0
+    title: str = ''
+    media_sequence: int = 0
+    byterange: Optional[Tuple[int, int]] = None
+    key: Optional[dict] = None
+    init_section: Optional[dict] = None
+    discontinuity: bool = False
+    program_date_time: Optional[str] = None
+
+
+'''M3U8StreamParser'''
+class M3U8StreamParser():
+    ATTRIBUTE_PATTERN = TencentHLSHelper.M3U8_ATTRIBUTE_PATTERN
+    def __init__(self, base_uri: str = ''):
+        self.base_uri = base_uri
+        self._base_dir = base_uri.split('?', 1)[0].split('#', 1)[0].rsplit('/', 1)[0] + '/' if '://' in base_uri else ''
+        self.variants: List[dict] = []
+        self.target_duration: Optional[float] = None
+        self.media_sequence = 0
+        self.is_endlist = False
+        self.num_segments = 0
+        self._started = False
+        self._duration, self._title, self._byterange, self._discontinuity, self._program_date_time = None, '', None, False, None
+        self._key, self._init_section, self._variant_attrs = None, None, None
+        self._byterange_ends: Dict[str, int] = {}
+    '''parseattributes'''
+    @staticmethod
+    def parseattributes(text: str) -> dict:
+        return {m.group(1): (m.group(2) if m.group(2) is not None else m.group(3)) for m in M3U8StreamParser.ATTRIBUTE_PATTERN.finditer(text)}
+    '''_absolute'''
+    def _absolute(self, uri: str) -> str:
+        if uri.startswith(('http://', 'https://')) or not self.base_uri: return uri
+        # plain relative paths are the common case, concatenating them gives the same result as urljoin at a fraction of the cost
+        if self._base_dir and uri[0] not in '/?#.' and ':' not in uri and '/.' not in uri: return self._base_dir + uri
+        return urljoin(self.base_uri, uri)
+    '''_parsebyterange'''
+    def _parsebyterange(self, text: str, uri: Optional[str]) -> Tuple[int, int]:
+        # an omitted offset continues right after the previous sub-range of the same resource
+        length, _, offset = text.strip().strip('"').partition('@'); length = int(length)
+        return length, int(offset) if offset else self._byterange_ends.get(uri, 0)
+    '''feed'''
+    def feed(self, line: str) -> Optional[HLSSegment]:
+        if not (line := line.strip()): return None
+        if not self._started:
+            self._started = True
+            if not line.lstrip('\ufeff').startswith('#EXTM3U'): raise ValueError('not an m3u8 playlist, missing #EXTM3U header')
+            return None
+        if line[0] != '#':
+            uri = self._absolute(line)
+            if self._variant_attrs is not None: self.variants.append({'uri': uri, 'attrs': self._variant_attrs}); self._variant_attrs = None; return None
+            byterange = None
+            if self._byterange is not None: byterange = self._parsebyterange(self._byterange, uri); self._byterange_ends[uri] = byterange[0] + byterange[1]
+            segment = HLSSegment(uri=uri, duration=self._duration or 0.0, title=self._title, media_sequence=self.media_sequence + self.num_segments, byterange=byterange, key=self._key, init_section=self._init_section, discontinuity=self._discontinuity, program_date_time=self._program_date_time)
+            self.num_segments += 1; self._duration, self._title, self._byterange, self._discontinuity, self._program_date_time = None, '', None, False, None
+            return segment
+        tag, _, value = line.partition(':')
+        if tag == '#EXTINF': duration, _, self._title = value.partition(','); self._duration = float(duration or 0)
+        elif tag == '#EXT-X-BYTERANGE': self._byterange = value
+        elif tag == '#EXT-X-DISCONTINUITY': self._discontinuity = True
+        elif tag == '#EXT-X-PROGRAM-DATE-TIME': self._program_date_time = value
+        elif tag == '#EXT-X-KEY':
+            attrs = self.parseattributes(value)
+            self._key = None if attrs.get('METHOD', 'NONE') == 'NONE' else {**attrs, 'URI': self._absolute(attrs['URI'])} if attrs.get('URI') else attrs
+        elif tag == '#EXT-X-MAP':
+            attrs = self.parseattributes(value); uri = self._absolute(attrs.get('URI', ''))
+            self._init_section = {'uri': uri, 'byterange': self._parsebyterange(attrs['BYTERANGE'], None) if attrs.get('BYTERANGE') else None}
+        elif tag == '#EXT-X-MEDIA-SEQUENCE': self.media_sequence = int(value or 0)
+        elif tag == '#EXT-X-TARGETDURATION': self.target_duration = float(value or 0)
+        elif tag == '#EXT-X-STREAM-INF': self._variant_attrs = self.parseattributes(value)
+        elif tag == '#EXT-X-ENDLIST': self.is_endlist = True
+        return None
+    '''iterlines'''
+    def iterlines(self, lines: Iterable[Union[str, bytes]]) -> Iterator[HLSSegment]:
+        for line in lines:
+            if isinstance(line, (bytes, bytearray)): line = line.decode('utf-8', errors='replace')
+            if (segment := self.feed(line)) is not None: yield segment
+    '''iterbytes'''
+    def iterbytes(self, chunks: Iterable[bytes]) -> Iterator[HLSSegment]:
+        # segments are yielded as soon as their uri line is complete, the unparsed tail never exceeds one line
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer.extend(chunk); start = 0
+            while (end := buffer.find(b'\n', start)) >= 0:
+                if (segment := self.feed(buffer[start:end].decode('utf-8', errors='replace'))) is not None: yield segment
+                start = end + 1
+            del buffer[:start]
+        if buffer and (segment := self.feed(buffer.decode('utf-8', errors='replace'))) is not None: yield segment
+    '''iterinbackground'''
+    @staticmethod
+    def iterinbackground(iterable: Iterable, name: str = 'videodl-m3u8-reader') -> Iterator:
+        # the playlist is drained on its own thread so the connection is never left idle while segments are being downloaded
+        records, sentinel, error = queue.SimpleQueue(), object(), []
+        '''_pump'''
+        def _pump():
+            try:
+                for record in iterable: records.put(record)
+            except BaseException as err: error.append(err)
+            finally: records.put(sentinel)
+        threading.Thread(target=_pump, name=name, daemon=True).start()
+        while (record := records.get()) is not sentinel: yield record
+        if error: raise error[0]
+    '''summarize'''
+    @staticmethod
+    def summarize(url: str, headers: dict = None, cookies: dict = None, request_overrides: dict = None, timeout: float = 10.0) -> dict:
+        request_overrides, first_segment, duration = {k: v for k, v in (request_overrides or {}).items() if k not in {'headers', 'cookies', 'stream', 'timeout'}}, None, 0.0
+        with MirrorProber._getsession().get(url, headers=headers, cookies=cookies, stream=True, timeout=timeout, **request_overrides) as resp:
+            resp.raise_for_status(); parser = M3U8StreamParser(resp.url or url)
+            for segment in parser.iterbytes(resp.iter_content(chunk_size=65536)): first_segment = first_segment or segment; duration += segment.duration or 0.0
+        return {'probe_url': first_segment.uri if first_segment else None, 'duration': duration or None, 'num_segments': parser.num_segments}
+
+
 '''CCTVHLSBestParser'''
 class CCTVHLSBestParser:
     KV = re.compile(r'([A-Z0-9\-]+)=(".*?"|[^,]*)')
     def __init__(self, master_url: str | None = None):
         self.master_url = master_url
-    '''best'''
-    def best(self, master_text: str) -> dict:
+    '''variants'''
+    def variants(self, master_text: str) -> list[dict]:
         lines, variants, idx = [ln.strip() for ln in master_text.splitlines() if ln.strip()], [], 0
         while idx < len(lines):
             if not (line := lines[idx]).startswith("#EXT-X-STREAM-INF:"): idx += 1; continue
@@ -175,4 +309,7 @@ class CCTVHLSBestParser:
             variants.append({"uri": uri, "bandwidth": bandwidth, "resolution": (width, height), "attrs": attrs, "score": (width * height, bandwidth)})
             idx = uri_idx; idx += 1
         if not variants: raise ValueError("No HLS variants found")
-        return max(variants, key=lambda v: v["score"])
\ No newline at end of file
+        return variants
+    '''best'''
+    def best(self, master_text: str) -> dict:
+        return max(self.variants(master_text), key=lambda v: v["score"])
\ No newline at end of file
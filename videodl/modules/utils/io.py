@@ -58,7 +58,7 @@ class FileLock:
                 else: fcntl.flock(self.fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
                 return self
             except OSError:
-                if time.time() >= deadline: raise TimeoutError(f"Timeout acquiring lock: {self.lock_path}")
+                if time.time() >= deadline: self.fp.close(); self.fp = None; raise TimeoutError(f"Timeout acquiring lock: {self.lock_path}")
                 time.sleep(self.poll_interval)
     '''exit'''
     def __exit__(self, exc_type, exc, tb):
@@ -0,0 +1,174 @@
+'''
+Function:
+    Implementation of Download Mirror Probing Related Utils
+Author:
+    Zhenchao Jin
+WeChat Official Account (微信公众号):
+    Charles的皮卡丘
+'''
+import os
+import time
+import requests
+import threading
+from contextlib import suppress
+from typing import Callable
+from .credentials import CredentialCache
+from platformdirs import user_cache_dir
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+
+'''MirrorProber'''
+class MirrorProber():
+    PROBE_BYTES = 256 * 1024
+    PROBE_TIMEOUT = 6.0
+    REFERENCE_BYTES = 4 * 1024 * 1024
+    MAX_PROBE_WORKERS = 8
+    _session: requests.Session = None
+    _lock = threading.Lock()
+    '''_getsession'''
+    @staticmethod
+    def _getsession() -> requests.Session:
+        with MirrorProber._lock:
+            if MirrorProber._session is None:
+                (session := requests.Session()).mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16)); session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+                MirrorProber._session = session
+            return MirrorProber._session
+    '''probe'''
+    @staticmethod
+    def probe(url: str, headers: dict = None, cookies: dict = None, request_overrides: dict = None, probe_bytes: int = None, timeout: float = None) -> dict:
+        probe_bytes, timeout, result = probe_bytes or MirrorProber.PROBE_BYTES, timeout or MirrorProber.PROBE_TIMEOUT, {'url': url, 'ok': False, 'ttfb': None, 'throughput': 0.0, 'score': float('inf'), 'received': 0, 'elapsed': None}
+        request_overrides = {k: v for k, v in (request_overrides or {}).items() if k not in {'headers', 'cookies', 'stream', 'timeout'}}
+        headers, received, first_byte_at = {**(headers or {}), 'Range': f'bytes=0-{probe_bytes - 1}'}, 0, None
+        started_at = time.perf_counter()
+        try:
+            with MirrorProber._getsession().get(url, headers=headers, cookies=cookies, stream=True, timeout=timeout, **request_overrides) as resp:
+                resp.raise_for_status()
+                for chunk in resp.iter_content(chunk_size=16384):
+                    if not chunk: continue
+                    first_byte_at = first_byte_at or time.perf_counter(); received += len(chunk)
+                    if received >= probe_bytes or time.perf_counter() - started_at > timeout: break
+        except Exception:
+            return result
+        if not received: return result
+        # score is the extrapolated time to fetch REFERENCE_BYTES, so a fast first byte cannot hide a trickling body
+        finished_at = time.perf_counter(); ttfb, throughput = first_byte_at - started_at, received / max(finished_at - first_byte_at, 1e-3)
+        result.update(dict(ok=True, ttfb=ttfb, throughput=throughput, score=ttfb + MirrorProber.REFERENCE_BYTES / throughput, received=received, elapsed=finished_at - started_at))
+        return result
+    '''rank'''
+    @staticmethod
+    def rank(urls: list[str], headers: dict = None, cookies: dict = None, request_overrides: dict = None, probe_bytes: int = None, timeout: float = None) -> list[str]:
+        if len(urls := list(dict.fromkeys(url for url in (urls or []) if url))) <= 1: return urls
+        with ThreadPoolExecutor(max_workers=min(len(urls), MirrorProber.MAX_PROBE_WORKERS), thread_name_prefix='videodl-mirror-probe') as executor:
+            results = list(executor.map(lambda url: MirrorProber.probe(url, headers=headers, cookies=cookies, request_overrides=request_overrides, probe_bytes=probe_bytes, timeout=timeout), urls))
+        # sort is stable, unreachable mirrors keep their original relative order at the tail
+        return [result['url'] for result in sorted(results, key=lambda r: (not r['ok'], r['score']))]
+
+
+'''HostScoreboard'''
+class HostScoreboard():
+    EWMA_ALPHA = 0.3
+    HALF_LIFE = 6 * 3600.0
+    MIN_CONFIDENCE = 1.0
+    FAILURE_PENALTY = 5.0
+    EXPLORATION_BUDGET = 2
+    PERSIST_TTL = 7 * 86400.0
+    _instances: dict[tuple[str, str], "HostScoreboard"] = {}
+    _global_lock = threading.Lock()
+    def __init__(self, cache_dir: str = None, namespace: str = 'hosts.scoreboard'):
+        self.cache = CredentialCache(cache_dir=cache_dir or user_cache_dir(appname='videodl', appauthor='zcjin'), namespace=namespace, ttl=HostScoreboard.PERSIST_TTL)
+        self._stats: dict[str, dict] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.RLock()
+    '''getinstance'''
+    @classmethod
+    def getinstance(cls, cache_dir: str = None, namespace: str = 'hosts.scoreboard') -> "HostScoreboard":
+        cache_dir = os.path.abspath(cache_dir or user_cache_dir(appname='videodl', appauthor='zcjin'))
+        with cls._global_lock:
+            if (cache_dir, namespace) not in cls._instances: cls._instances[(cache_dir, namespace)] = cls(cache_dir=cache_dir, namespace=namespace)
+            return cls._instances[(cache_dir, namespace)]
+    '''_load'''
+    def _load(self, host: str) -> dict:
+        if host not in self._stats: self._stats[host] = dict(self.cache.get(host) or {})
+        return self._stats[host]
+    '''confidence'''
+    def confidence(self, host: str) -> float:
+        # sample counts halve every HALF_LIFE seconds, so old measurements fade out instead of pinning a host forever
+        with self._lock:
+            if not (stats := self._load(host)): return 0.0
+            return float(stats.get('samples', 0)) * 0.5 ** (max(time.time() - float(stats.get('updated_at', 0)), 0.0) / HostScoreboard.HALF_LIFE)
+    '''record'''
+    def record(self, host: str, ok: bool, ttfb: float = None, throughput: float = None) -> None:
+        with self._lock:
+            confidence, stats = self.confidence(host), self._load(host); alpha = max(HostScoreboard.EWMA_ALPHA, 1.0 / (confidence + 1.0))
+            stats['fail'] = (1 - alpha) * float(stats.get('fail', 0.0)) + alpha * (0.0 if ok else 1.0)
+            if ok and ttfb is not None: stats['ttfb'] = ttfb if 'ttfb' not in stats else (1 - alpha) * stats['ttfb'] + alpha * ttfb
+            if ok and throughput: stats['throughput'] = throughput if 'throughput' not in stats else (1 - alpha) * stats['throughput'] + alpha * throughput
+            stats['samples'], stats['updated_at'] = confidence + 1.0, time.time(); self._dirty.add(host)
+    '''score'''
+    def score(self, host: str) -> float | None:
+        with self._lock:
+            if not (stats := self._load(host)): return None
+            return float(stats.get('ttfb', HostScoreboard.FAILURE_PENALTY)) + (MirrorProber.REFERENCE_BYTES / stats['throughput'] if stats.get('throughput') else 0.0) + float(stats.get('fail', 0.0)) * HostScoreboard.FAILURE_PENALTY
+    '''usable'''
+    def usable(self, host: str) -> bool:
+        with self._lock: return bool(stats := self._load(host)) and float(stats.get('fail', 1.0)) < 0.5
+    '''rank'''
+    def rank(self, hosts: list[str]) -> list[str]:
+        hosts = list(dict.fromkeys(hosts)); scores = {host: self.score(host) for host in hosts}
+        return sorted([h for h in hosts if scores[h] is not None], key=lambda h: scores[h]) + [h for h in hosts if scores[h] is None]
+    '''planprobes'''
+    def planprobes(self, hosts: list[str], budget: int = None) -> list[str]:
+        # unknown or faded hosts are always probed, confident hosts only get a small re-probe budget, stalest first
+        budget, confidences = HostScoreboard.EXPLORATION_BUDGET if budget is None else max(int(budget), 0), {host: self.confidence(host) for host in dict.fromkeys(hosts)}
+        unknown_hosts = [h for h, c in confidences.items() if c < HostScoreboard.MIN_CONFIDENCE]
+        return unknown_hosts + sorted([h for h, c in confidences.items() if c >= HostScoreboard.MIN_CONFIDENCE], key=lambda h: confidences[h])[:budget]
+    '''flush'''
+    def flush(self) -> None:
+        with self._lock:
+            items = {host: dict(self._stats[host]) for host in self._dirty}; self._dirty.clear()
+        if items: self.cache.setmany(items)
+
+
+'''VariantSelector'''
+class VariantSelector():
+    MAX_PROBED_VARIANTS = 2
+    PROBE_BYTES = 1024 * 1024
+    PROBE_TIMEOUT = 10.0
+    SAFETY_FACTOR = 0.8
+    def __init__(self, deadline: float = None, bandwidth_budget: float = None, max_probed_variants: int = None):
+        self.deadline = float(deadline) if deadline else None
+        self.bandwidth_budget = float(bandwidth_budget) if bandwidth_budget else None
+        self.max_probed_variants = max(int(max_probed_variants or VariantSelector.MAX_PROBED_VARIANTS), 1)
+    '''enabled'''
+    @property
+    def enabled(self) -> bool:
+        return bool(self.deadline or self.bandwidth_budget)
+    '''select'''
+    def select(self, variants: list[dict], duration: float = None, extra_bandwidth: float = 0.0, resolve_func: Callable[[dict], dict] = None, headers: dict = None, cookies: dict = None, request_overrides: dict = None) -> tuple[dict, dict]:
+        # variants carry bandwidth in bits per second, an optional sortable score (highest is best) and a probe_url pointing at real media bytes
+        if not (variants := sorted(variants or [], key=lambda v: v.get('score', v.get('bandwidth') or 0), reverse=True)): raise ValueError("No variants to select from")
+        if not self.enabled or len(variants) == 1: return variants[0], {}
+        decision, measured = dict(policy='throughput', deadline=self.deadline, bandwidth_budget=self.bandwidth_budget, measured_throughput=None, effective_throughput=None, duration=duration), []
+        # probed one after another on purpose, concurrent probes would split the link between them and underestimate it
+        for variant in variants[:self.max_probed_variants]:
+            if resolve_func is not None and not variant.get('probe_url'):
+                with suppress(Exception): variant.update({k: v for k, v in (resolve_func(variant) or {}).items() if v is not None})
+            duration = duration or variant.get('duration')
+            if not variant.get('probe_url'): continue
+            result = MirrorProber.probe(variant['probe_url'], headers=headers, cookies=cookies, request_overrides=request_overrides, probe_bytes=VariantSelector.PROBE_BYTES, timeout=VariantSelector.PROBE_TIMEOUT)
+            # time to first byte is kept in the estimate since segmented downloads pay it on every request
+            if result['ok'] and result['elapsed']: measured.append(result['received'] / max(result['elapsed'], 1e-3))
+        if not measured: decision.update(dict(reason='probe failed, kept the highest variant', chosen=variants[0].get('uri') or variants[0].get('probe_url'), bandwidth=variants[0].get('bandwidth'))); return variants[0], decision
+        throughput = max(measured) * VariantSelector.SAFETY_FACTOR; effective = min(throughput, self.bandwidth_budget) if self.bandwidth_budget else throughput
+        decision.update(dict(measured_throughput=max(measured), effective_throughput=effective, duration=duration)); time_limit, candidates = self.deadline or duration, []
+        # without a known duration a variant fits when it can be fetched at least in real time
+        for variant in variants:
+            rate = ((variant.get('bandwidth') or 0) + (extra_bandwidth or 0)) / 8.0; estimated_seconds = rate * duration / effective if duration else None
+            candidates.append(dict(uri=variant.get('uri') or variant.get('probe_url'), bandwidth=variant.get('bandwidth'), estimated_seconds=estimated_seconds, fits=(estimated_seconds <= time_limit) if estimated_seconds is not None and time_limit else rate <= effective))
+        if (index := next((idx for idx, candidate in enumerate(candidates) if candidate['fits']), None)) is None:
+            index = min(range(len(variants)), key=lambda idx: variants[idx].get('bandwidth') or 0); decision['reason'] = 'no variant fits, picked the lowest bitrate'
+        else:
+            decision['reason'] = 'highest variant that fits' if index else 'highest variant fits'
+        decision.update(dict(chosen=candidates[index]['uri'], bandwidth=candidates[index]['bandwidth'], estimated_seconds=candidates[index]['estimated_seconds'], candidates=candidates))
+        return variants[index], decision
\ No newline at end of file
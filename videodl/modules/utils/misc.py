@@ -18,6 +18,7 @@ import filetype
 import requests
 import puremagic
 import mimetypes
+import threading
 import functools
 import json_repair
 import unicodedata
@@ -25,7 +26,7 @@ from pathlib import Path
 from .data import VideoInfo
 from datetime import datetime
 from bs4 import BeautifulSoup
-from contextlib import suppress
+from contextlib import suppress, contextmanager
 from http.cookies import SimpleCookie
 from .importutils import optionalimport
 from urllib.parse import urlparse, unquote
@@ -308,6 +309,27 @@ class SpinWithBackoff:
         self.nth += 1
 
 
+'''HostConcurrencyLimiter'''
+class HostConcurrencyLimiter:
+    def __init__(self, max_per_host: int = 4, min_interval: float = 0.0):
+        self.max_per_host = max(1, int(max_per_host))
+        self.min_interval = max(0.0, float(min_interval))
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._next_start_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+    '''slot'''
+    @contextmanager
+    def slot(self, url: str):
+        host = urlparse(str(url)).netloc.lower()
+        with self._lock: semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+        with semaphore:
+            # request starts on one host are spaced by min_interval, the slot is reserved before sleeping so waiters queue up in order
+            if self.min_interval > 0:
+                with self._lock: start_at = max(time.monotonic(), self._next_start_at.get(host, 0.0)); self._next_start_at[host] = start_at + self.min_interval
+                if (delay := start_at - time.monotonic()) > 0: time.sleep(delay)
+            yield host
+
+
 '''FileTypeSniffer'''
 class FileTypeSniffer():
     COMMON_MEDIA_EXTS = {
@@ -0,0 +1,106 @@
+'''
+Function:
+    Implementation of Polling Related Utils
+Author:
+    Zhenchao Jin
+WeChat Official Account (微信公众号):
+    Charles的皮卡丘
+'''
+from __future__ import annotations
+import time
+import heapq
+import random
+import itertools
+import threading
+from contextlib import suppress
+from concurrent.futures import Future, ThreadPoolExecutor, InvalidStateError
+from typing import Any, Callable, Optional, Tuple
+
+
+'''PollCancelledError'''
+class PollCancelledError(RuntimeError):
+    pass
+
+
+'''AdaptivePoller'''
+class AdaptivePoller():
+    def __init__(self, initial_interval: float = 0.5, max_interval: float = 8.0, backoff_factor: float = 1.6, deadline: float = 120.0, jitter: float = 0.1):
+        self.jitter = max(0.0, jitter)
+        self.deadline = deadline
+        self.max_interval = max(initial_interval, max_interval)
+        self.backoff_factor = max(1.0, backoff_factor)
+        self.initial_interval = max(0.0, initial_interval)
+    '''nextinterval'''
+    def nextinterval(self, nth: int, elapsed: float, progress: Optional[float] = None) -> float:
+        interval = min(self.initial_interval * (self.backoff_factor ** nth), self.max_interval)
+        # with a progress hint, extrapolate the remaining time and check back around half way there
+        if progress is not None and 0.0 < progress < 1.0: interval = min(max(elapsed * (1.0 - progress) / progress * 0.5, self.initial_interval), self.max_interval)
+        return interval * (1.0 + random.uniform(-self.jitter, self.jitter))
+    '''checkonce'''
+    def checkonce(self, check_func: Callable[[], Any], done_func: Callable[[Any], bool], failed_func: Callable[[Any], Any] = None, progress_func: Callable[[Any], Optional[float]] = None, started_at: float = None, nth: int = 0) -> Tuple[bool, Any, float]:
+        value, elapsed = check_func(), time.monotonic() - (started_at if started_at is not None else time.monotonic())
+        if done_func(value): return True, value, 0.0
+        if failed_func and (err := failed_func(value)): raise RuntimeError(err if isinstance(err, str) else value)
+        if (remaining := self.deadline - elapsed) <= 0: raise TimeoutError(f"Polling task not finished within {self.deadline:.1f}s (last status: {value})")
+        try: progress = progress_func(value) if progress_func else None
+        except Exception: progress = None
+        return False, value, max(0.0, min(self.nextinterval(nth, elapsed, progress), remaining))
+    '''poll'''
+    def poll(self, check_func: Callable[[], Any], done_func: Callable[[Any], bool], failed_func: Callable[[Any], Any] = None, progress_func: Callable[[Any], Optional[float]] = None, cancel_event: threading.Event = None) -> Any:
+        started_at, nth = time.monotonic(), 0
+        while True:
+            if cancel_event is not None and cancel_event.is_set(): raise PollCancelledError("Polling task cancelled")
+            done, value, delay = self.checkonce(check_func, done_func, failed_func=failed_func, progress_func=progress_func, started_at=started_at, nth=nth)
+            if done: return value
+            if cancel_event is not None: cancel_event.wait(delay)
+            else: time.sleep(delay)
+            nth += 1
+    '''submit'''
+    def submit(self, check_func: Callable[[], Any], done_func: Callable[[Any], bool], failed_func: Callable[[Any], Any] = None, progress_func: Callable[[Any], Optional[float]] = None, cancel_event: threading.Event = None) -> Future:
+        return PollingScheduler.instance().submit(self, check_func, done_func, failed_func=failed_func, progress_func=progress_func, cancel_event=cancel_event)
+
+
+'''PollingScheduler'''
+class PollingScheduler():
+    _instance: Optional["PollingScheduler"] = None
+    _instance_lock = threading.Lock()
+    def __init__(self, max_workers: int = 8):
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="videodl-poll")
+        self._thread = threading.Thread(target=self._run, name="videodl-poll-scheduler", daemon=True)
+        self._thread.start()
+    '''instance'''
+    @classmethod
+    def instance(cls) -> "PollingScheduler":
+        if cls._instance is None:
+            with cls._instance_lock: cls._instance = cls._instance or cls()
+        return cls._instance
+    '''submit'''
+    def submit(self, poller: AdaptivePoller, check_func: Callable[[], Any], done_func: Callable[[Any], bool], failed_func: Callable[[Any], Any] = None, progress_func: Callable[[Any], Optional[float]] = None, cancel_event: threading.Event = None) -> Future:
+        task = dict(poller=poller, check_func=check_func, done_func=done_func, failed_func=failed_func, progress_func=progress_func, cancel_event=cancel_event, future=Future(), started_at=time.monotonic(), nth=0)
+        self._schedule(task, 0.0)
+        return task["future"]
+    '''_schedule'''
+    def _schedule(self, task: dict, delay: float):
+        with self._cond: heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), task)); self._cond.notify()
+    '''_run'''
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap: self._cond.wait()
+                if (delay := self._heap[0][0] - time.monotonic()) > 0: self._cond.wait(delay); continue
+                task = heapq.heappop(self._heap)[2]
+            self._executor.submit(self._check, task)
+    '''_check'''
+    def _check(self, task: dict):
+        future: Future = task["future"]
+        if future.cancelled(): return
+        if task["cancel_event"] is not None and task["cancel_event"].is_set(): future.cancel(); return
+        try: done, value, delay = task["poller"].checkonce(task["check_func"], task["done_func"], failed_func=task["failed_func"], progress_func=task["progress_func"], started_at=task["started_at"], nth=task["nth"])
+        except BaseException as err:
+            with suppress(InvalidStateError): future.set_exception(err)
+            return
+        if not done: task["nth"] += 1; self._schedule(task, delay); return
+        with suppress(InvalidStateError): future.set_result(value)
@@ -10,13 +10,24 @@ import re
 import html
 import json
 import copy
+import time
 import requests
+import threading
 from .misc import resp2json
+from collections import OrderedDict
+from .credentials import CredentialCache
 from urllib.parse import urlsplit, parse_qs, urljoin, urlencode
 
 
 '''BrightcoveSmuggler'''
 class BrightcoveSmuggler():
+    POLICY_KEY_TTL = 7 * 86400
+    PLAYBACK_CACHE_TTL = 300
+    PLAYBACK_CACHE_MAXSIZE = 256
+    _session: requests.Session = None
+    _policy_keys: dict[str, str] = {}
+    _playback_cache: "OrderedDict[str, tuple[dict, float]]" = OrderedDict()
+    _lock = threading.RLock()
     '''smuggleurl'''
     @staticmethod
     def smuggleurl(url, data: dict):
@@ -30,16 +41,27 @@ class BrightcoveSmuggler():
         url, _, sdata = smug_url.rpartition('#')
         data = json.loads(parse_qs(sdata)['__videodl_smuggle'][0])
         return url, data
+    '''getsession'''
+    @staticmethod
+    def getsession() -> requests.Session:
+        with BrightcoveSmuggler._lock:
+            if BrightcoveSmuggler._session is None: BrightcoveSmuggler._session = requests.Session()
+            return BrightcoveSmuggler._session
     '''parse'''
     @staticmethod
-    def extract(player_url, request_overrides: dict = None):
-        request_overrides, session = copy.deepcopy(request_overrides or {}), requests.Session()
+    def extract(player_url, request_overrides: dict = None, credential_cache: CredentialCache = None):
+        request_overrides, session = copy.deepcopy(request_overrides or {}), BrightcoveSmuggler.getsession()
         account_id, player_id, video_id = BrightcoveSmuggler._parseplayerurl(player_url)
-        policy_key = BrightcoveSmuggler._fetchpolicykey(session=session, player_url=player_url, request_overrides=request_overrides)
-        api_url = f'https://edge.api.brightcove.com/playback/v1/accounts/{account_id}/videos/{video_id}'
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36', 'Accept': f'application/json;pk={policy_key}', 'BCOV-Policy': policy_key, 'Origin': 'https://players.brightcove.net', 'Referer': player_url}
-        request_overrides.pop('headers', None); (resp := session.get(api_url, headers=headers, **request_overrides)).raise_for_status()
-        data = resp2json(resp=resp); formats: list[dict] = []
+        if (data := BrightcoveSmuggler._getcachedplayback(account_id, video_id)) is None:
+            api_url = f'https://edge.api.brightcove.com/playback/v1/accounts/{account_id}/videos/{video_id}'
+            # the policy key is stable per account/player, so it is only refetched from the player page when the playback api rejects it
+            for refresh in (False, True):
+                policy_key = BrightcoveSmuggler._getpolicykey(session=session, player_url=player_url, account_id=account_id, player_id=player_id, request_overrides=request_overrides, credential_cache=credential_cache, refresh=refresh)
+                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36', 'Accept': f'application/json;pk={policy_key}', 'BCOV-Policy': policy_key, 'Origin': 'https://players.brightcove.net', 'Referer': player_url}
+                resp = session.get(api_url, headers=headers, **{k: v for k, v in request_overrides.items() if k != 'headers'})
+                if resp.status_code not in {401, 403} or refresh: break
+            resp.raise_for_status(); data = resp2json(resp=resp); BrightcoveSmuggler._setcachedplayback(account_id, video_id, data)
+        formats: list[dict] = []
         for s in data.get('sources', []):
             if (not isinstance(s, dict)) or (not (src := s.get('src'))): continue
             formats.append({'url': src, 'type': s.get('type'), 'container': s.get('container'), 'codec': s.get('codec') or s.get('codecs'), 'height': s.get('height'), 'width': s.get('width'), 'avg_bitrate': s.get('avg_bitrate') or s.get('bitrate')})
@@ -51,12 +73,39 @@ class BrightcoveSmuggler():
         m = re.search(r'players\.brightcove\.net/(\d+)/([^/]+)_default/index\.html', player_url)
         account_id, player_id, video_id = m.group(1), m.group(2), parse_qs(urlsplit(player_url).query).get('videoId', [None])[0]
         return account_id, player_id, video_id
+    '''_getcachedplayback'''
+    @staticmethod
+    def _getcachedplayback(account_id: str, video_id: str):
+        with BrightcoveSmuggler._lock:
+            if not (item := BrightcoveSmuggler._playback_cache.get(cache_key := f'{account_id}:{video_id}')): return None
+            if item[1] <= time.time(): BrightcoveSmuggler._playback_cache.pop(cache_key, None); return None
+            BrightcoveSmuggler._playback_cache.move_to_end(cache_key); return copy.deepcopy(item[0])
+    '''_setcachedplayback'''
+    @staticmethod
+    def _setcachedplayback(account_id: str, video_id: str, data: dict):
+        if not data or BrightcoveSmuggler.PLAYBACK_CACHE_TTL <= 0: return
+        with BrightcoveSmuggler._lock:
+            BrightcoveSmuggler._playback_cache[f'{account_id}:{video_id}'] = (copy.deepcopy(data), time.time() + BrightcoveSmuggler.PLAYBACK_CACHE_TTL)
+            while len(BrightcoveSmuggler._playback_cache) > BrightcoveSmuggler.PLAYBACK_CACHE_MAXSIZE: BrightcoveSmuggler._playback_cache.popitem(last=False)
     '''_extractpolicykeyfromhtml'''
     @staticmethod
     def _extractpolicykeyfromhtml(html_text: str):
         if (m := re.search(r'"policyKey"\s*:\s*"([^"]+)"', html_text)): return m.group(1)
         if (m := re.search(r'policyKey\s*:\s*"([^"]+)"', html_text)): return m.group(1)
         return None
+    '''_getpolicykey'''
+    @staticmethod
+    def _getpolicykey(session: requests.Session, player_url: str, account_id: str, player_id: str, request_overrides: dict = None, credential_cache: CredentialCache = None, refresh: bool = False):
+        cache_key = f'brightcove_policy_key:{account_id}:{player_id}'
+        if refresh:
+            with BrightcoveSmuggler._lock: BrightcoveSmuggler._policy_keys.pop(cache_key, None)
+            if credential_cache is not None: credential_cache.invalidate(cache_key)
+        if (policy_key := BrightcoveSmuggler._policy_keys.get(cache_key)): return policy_key
+        fetch_func = lambda: BrightcoveSmuggler._fetchpolicykey(session=session, player_url=player_url, request_overrides=request_overrides)
+        policy_key = credential_cache.getorfetch(cache_key, fetch_func, ttl=BrightcoveSmuggler.POLICY_KEY_TTL) if credential_cache is not None else fetch_func()
+        if policy_key:
+            with BrightcoveSmuggler._lock: BrightcoveSmuggler._policy_keys[cache_key] = policy_key
+        return policy_key
     '''_fetchpolicykey'''
     @staticmethod
     def _fetchpolicykey(session: requests.Session, player_url: str, request_overrides: dict = None):
@@ -65,4 +114,4 @@ class BrightcoveSmuggler():
         if (policy_key := BrightcoveSmuggler._extractpolicykeyfromhtml(resp.text)): return policy_key
         m = re.search(r'<script[^>]+src="([^"]*index(?:\.min)?\.js[^"]*)"[^>]*>', resp.text, flags=re.IGNORECASE)
         (js_resp := session.get(urljoin(player_url, html.unescape(m.group(1))), **request_overrides)).raise_for_status()
-        return BrightcoveSmuggler._extractpolicykeyfromhtml(js_resp.text)
\ No newline at end of file
+        return BrightcoveSmuggler._extractpolicykeyfromhtml(js_resp.text)
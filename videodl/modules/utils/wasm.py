@@ -0,0 +1,140 @@
+'''
+Function:
+    Implementation of In-Process WebAssembly Runtime Related Utils
+Author:
+    Zhenchao Jin
+WeChat Official Account (微信公众号):
+    Charles的皮卡丘
+'''
+import time
+import random
+import threading
+from pathlib import Path
+from .importutils import optionalimport
+
+
+'''optional runtime'''
+wasmtime = optionalimport('wasmtime')
+
+
+'''WasmModuleRuntime'''
+class WasmModuleRuntime():
+    WASM_FILE_PATH: Path = None
+    _instances: dict[str, 'WasmModuleRuntime'] = {}
+    _global_lock = threading.Lock()
+    def __init__(self, wasm_file_path: str | Path = None):
+        if wasmtime is None: raise RuntimeError('Optional dependency "wasmtime" is not installed')
+        self.wasm_file_path = Path(wasm_file_path or self.WASM_FILE_PATH)
+        # a wasmtime store is not thread safe, every call into the instance is serialised on this lock
+        self.lock = threading.RLock()
+        self.engine = wasmtime.Engine(); self.store = wasmtime.Store(self.engine)
+        self.module = wasmtime.Module.from_file(self.engine, str(self.wasm_file_path))
+        self.instance = wasmtime.Instance(self.store, self.module, self.buildimports())
+        self.exports = self.instance.exports(self.store)
+        self.memory = self.resolvememory()
+    '''isavailable'''
+    @staticmethod
+    def isavailable() -> bool:
+        return wasmtime is not None
+    '''getinstance'''
+    @classmethod
+    def getinstance(cls, wasm_file_path: str | Path = None) -> 'WasmModuleRuntime':
+        key = f'{cls.__name__}:{Path(wasm_file_path or cls.WASM_FILE_PATH).resolve()}'
+        if (runtime := WasmModuleRuntime._instances.get(key)) is not None: return runtime
+        # the module is compiled and instantiated once per process, concurrent first callers wait for the same instance
+        with WasmModuleRuntime._global_lock:
+            if (runtime := WasmModuleRuntime._instances.get(key)) is None: runtime = WasmModuleRuntime._instances[key] = cls(wasm_file_path)
+        return runtime
+    '''buildimports'''
+    def buildimports(self) -> list:
+        return [self.buildimport(item) for item in self.module.imports]
+    '''buildimport'''
+    def buildimport(self, item):
+        if isinstance(item.type, wasmtime.FuncType): return self.stubfunc(item.type)
+        raise RuntimeError(f'Unsupported wasm import {item.module}.{item.name} in {self.wasm_file_path}')
+    '''stubfunc'''
+    def stubfunc(self, func_type, result=0):
+        zeros = [result if valtype in (wasmtime.ValType.i32(), wasmtime.ValType.i64()) else float(result) for valtype in func_type.results]
+        return wasmtime.Func(self.store, func_type, lambda *args: (None if not zeros else zeros[0] if len(zeros) == 1 else zeros))
+    '''resolvememory'''
+    def resolvememory(self):
+        return self.exports['memory'] if 'memory' in self.exports else None
+    '''call'''
+    def call(self, func_name: str, *args):
+        with self.lock: return self.exports[func_name](self.store, *args)
+    '''readbytes'''
+    def readbytes(self, ptr: int, size: int) -> bytes:
+        with self.lock: return bytes(self.memory.read(self.store, ptr, ptr + size))
+    '''writebytes'''
+    def writebytes(self, ptr: int, data: bytes):
+        with self.lock: self.memory.write(self.store, data, ptr)
+    '''readcstring'''
+    def readcstring(self, ptr: int, max_size: int = 65536) -> str:
+        if not ptr: return ''
+        with self.lock: data = self.readbytes(ptr, min(max_size, self.memory.data_len(self.store) - ptr))
+        return data[:data.find(b'\x00') if b'\x00' in data else len(data)].decode('utf-8', errors='replace')
+
+
+'''TencentCKeyWasmRuntime'''
+class TencentCKeyWasmRuntime(WasmModuleRuntime):
+    WASM_FILE_PATH = Path(__file__).resolve().parents[1] / "js" / "tencent" / "ckey.wasm"
+    # layout of the asm2wasm build, mirrors the globals set up by js/tencent/vqq_ckey-9.1.js
+    TOTAL_MEMORY, WASM_PAGE_SIZE, TABLE_SIZE, GLOBAL_BASE, STATIC_BUMP, TOTAL_STACK = 16777216, 65536, 99, 1024, 6928, 5242880
+    NAVIGATOR = {'userAgent': 'Mozilla/5.0 (Linux; U; Android 9; zh-cn) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Safari/537.36', 'appCodeName': 'Mozilla', 'appName': 'Netscape', 'platform': 'Linux'}
+    def __init__(self, wasm_file_path: str | Path = None):
+        self.document_url, self.document_referrer = '', ''
+        align16 = lambda value: (value + 15) & -16
+        self.temp_double_ptr = self.GLOBAL_BASE + self.STATIC_BUMP; self.dynamictop_ptr = self.temp_double_ptr + 16
+        self.stack_top = align16(self.dynamictop_ptr + 4); self.stack_max = self.stack_top + self.TOTAL_STACK
+        super(TencentCKeyWasmRuntime, self).__init__(wasm_file_path)
+        self.memory.write(self.store, (1668509029).to_bytes(4, 'little') + (25459).to_bytes(2, 'little'), 0)
+        self.memory.write(self.store, align16(self.stack_max).to_bytes(4, 'little'), self.dynamictop_ptr)
+    '''createguid'''
+    @staticmethod
+    def createguid(length: int = 32) -> str:
+        return ''.join(f'{random.randrange(16):x}' for _ in range(length))
+    '''buildimport'''
+    def buildimport(self, item):
+        i32, f64 = wasmtime.ValType.i32(), wasmtime.ValType.f64()
+        if isinstance(item.type, wasmtime.MemoryType):
+            pages = self.TOTAL_MEMORY // self.WASM_PAGE_SIZE; self._memory = wasmtime.Memory(self.store, wasmtime.MemoryType(wasmtime.Limits(pages, pages)))
+            return self._memory
+        if isinstance(item.type, wasmtime.TableType): return wasmtime.Table(self.store, wasmtime.TableType(wasmtime.ValType.funcref(), wasmtime.Limits(self.TABLE_SIZE, self.TABLE_SIZE)), None)
+        if isinstance(item.type, wasmtime.GlobalType):
+            values = {'memoryBase': self.GLOBAL_BASE, 'tableBase': 0, 'DYNAMICTOP_PTR': self.dynamictop_ptr, 'tempDoublePtr': self.temp_double_ptr, 'STACKTOP': self.stack_top, 'STACK_MAX': self.stack_max, 'NaN': float('nan'), 'Infinity': float('inf')}
+            return wasmtime.Global(self.store, wasmtime.GlobalType(item.type.content, False), wasmtime.Val.f64(values[item.name]) if item.type.content == f64 else wasmtime.Val.i32(values[item.name]))
+        if item.name == 'getTotalMemory': return wasmtime.Func(self.store, wasmtime.FuncType([], [i32]), lambda: self.TOTAL_MEMORY)
+        if item.name == '_get_unicode_str': return wasmtime.Func(self.store, wasmtime.FuncType([], [i32]), self.getunicodestr)
+        return super(TencentCKeyWasmRuntime, self).buildimport(item)
+    '''resolvememory'''
+    def resolvememory(self):
+        return self._memory
+    '''getunicodestr'''
+    def getunicodestr(self) -> int:
+        # the buffer is owned by the module, _getckey frees it before returning (the same chunk is handed out on every call), so it must not be freed here
+        truncate = lambda value: (value or '')[:48]
+        fingerprint = '|'.join([truncate(self.document_url), truncate(self.NAVIGATOR['userAgent'].lower()), truncate(self.document_referrer), self.NAVIGATOR['appCodeName'], self.NAVIGATOR['appName'], self.NAVIGATOR['platform']]).encode('utf-8') + b'\x00'
+        ptr = self.exports['_malloc'](self.store, len(fingerprint)); self.memory.write(self.store, fingerprint, ptr)
+        return ptr
+    '''stackstring'''
+    def stackstring(self, value: str) -> int:
+        data = value.encode('utf-8') + b'\x00'; ptr = self.exports['stackAlloc'](self.store, (len(value) << 2) + 1)
+        self.memory.write(self.store, data, ptr)
+        return ptr
+    '''getckey'''
+    def getckey(self, platform: str | int, app_version: str, vid: str, guid: str, tm: int, vurl: str = '', referrer: str = '') -> str:
+        with self.lock:
+            self.document_url, self.document_referrer = vurl, referrer; stack = self.exports['stackSave'](self.store)
+            try:
+                args = [int(platform), self.stackstring(app_version), self.stackstring(vid), self.stackstring(''), self.stackstring(guid), int(tm)]
+                return self.readcstring(self.exports['_getckey'](self.store, *args))
+            finally:
+                self.exports['stackRestore'](self.store, stack)
+    '''computeckeys'''
+    def computeckeys(self, platform: str, app_version: str, vid: str, vurl: str, referrer: str, num: int = 1) -> list[list[str]]:
+        # same record layout as the node worker, < cKey tm guid flowid >, with fresh ids per ckey like the resident script
+        tm, records = int(time.time()), []
+        for _ in range(num):
+            guid, flowid = self.createguid(), f'{self.createguid()}_{platform}'
+            records.append([self.getckey(platform, app_version, vid, guid, tm, vurl, referrer), str(tm), guid, flowid])
+        return records
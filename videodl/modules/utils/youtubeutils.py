@@ -10,22 +10,29 @@ import os
 import re
 import sys
 import ast
+import copy
 import math
 import enum
 import json
 import time
+import atexit
 import shutil
 import struct
 import base64
 import socket
+import hashlib
 import pathlib
+import itertools
+import threading
 import subprocess
 import http.client
 from enum import Enum
 from pathlib import Path
 from urllib import parse
 from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from collections.abc import Sequence
+from collections import OrderedDict, deque
 from datetime import datetime, timezone
 from urllib.request import Request, urlopen
 from urllib.error import HTTPError, URLError
@@ -503,7 +510,7 @@ def extractsignaturetimestamp(js: str):
 '''applysignature'''
 def applysignature(stream_manifest: Dict, vid_info: Dict, js: str, url_js: str):
     cipher = Cipher(js=js, js_url=url_js)
-    discovered_n = dict()
+    parsed_streams = []
     for i, stream in enumerate(stream_manifest):
         try:
             url: str = stream["url"]
@@ -513,21 +520,17 @@ def applysignature(stream_manifest: Dict, vid_info: Dict, js: str, url_js: str):
         parsed_url = urlparse(url)
         query_params = parse_qs(urlparse(url).query)
         query_params = {k: v[0] for k, v in query_params.items()}
-        if "signature" in url or ("s" not in stream and ("&sig=" in url or "&lsig=" in url)):
-            pass
-        else:
-            signature = cipher.getsig(ciphered_signature=stream["s"])
-            query_params['sig'] = signature
-        if 'n' in query_params.keys():
-            initial_n = query_params['n']
-            if initial_n not in discovered_n: discovered_n[initial_n] = cipher.getnsig(initial_n)
-            else: pass
-            new_n = discovered_n[initial_n]
-            query_params['n'] = new_n
+        needs_sig = not ("signature" in url or ("s" not in stream and ("&sig=" in url or "&lsig=" in url)))
+        parsed_streams.append((i, parsed_url, query_params, needs_sig))
+    # decipher every distinct value of the manifest in one round trip per function
+    signatures = cipher.getsigs([stream_manifest[i]["s"] for i, _, _, needs_sig in parsed_streams if needs_sig])
+    discovered_n = cipher.getnsigs([query_params['n'] for _, _, query_params, _ in parsed_streams if 'n' in query_params])
+    for i, parsed_url, query_params, needs_sig in parsed_streams:
+        if needs_sig: query_params['sig'] = signatures[stream_manifest[i]["s"]]
+        if 'n' in query_params.keys(): query_params['n'] = discovered_n[query_params['n']]
         url = f'{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}?{urlencode(query_params)}'
         stream_manifest[i]["url"] = url
-    cipher.runner_sig.close()
-    cipher.runner_nsig.close()
+    cipher.close()
 
 
 '''ProtoInt64'''
@@ -550,6 +553,13 @@ class ProtoInt64:
 '''RequestWrapper'''
 class RequestWrapper:
     default_range_size = 9437184
+    default_max_workers = 4
+    min_range_size = 524288
+    throttle_ratio = 0.35
+    max_idle_connections = 8
+    max_redirects = 5
+    _idle_connections: Dict[Tuple[str, str], list] = {}
+    _connections_lock = threading.Lock()
     '''_executerequest'''
     @staticmethod
     def _executerequest(url: str, method=None, headers=None, data=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
@@ -559,6 +569,52 @@ class RequestWrapper:
         if url.lower().startswith("http"): request = Request(url, headers=base_headers, method=method, data=data)
         else: raise ValueError("Invalid URL")
         return urlopen(request, timeout=timeout)
+    '''_acquireconnection'''
+    @staticmethod
+    def _acquireconnection(scheme: str, netloc: str, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, fresh: bool = False):
+        if not fresh:
+            with RequestWrapper._connections_lock:
+                if (idle_connections := RequestWrapper._idle_connections.get((scheme, netloc))): return idle_connections.pop(), True
+        return (http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection)(netloc, timeout=timeout), False
+    '''_releaseconnection'''
+    @staticmethod
+    def _releaseconnection(scheme: str, netloc: str, conn: http.client.HTTPConnection):
+        with RequestWrapper._connections_lock:
+            if len(idle_connections := RequestWrapper._idle_connections.setdefault((scheme, netloc), [])) < RequestWrapper.max_idle_connections: idle_connections.append(conn); return
+        conn.close()
+    '''_fetchrange'''
+    @staticmethod
+    def _fetchrange(url: str, start: int, end: int, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, max_retries=0, rate_floor=0.0):
+        headers, tries, redirects, stale_retried, force_fresh = {"User-Agent": "Mozilla/5.0", "accept-language": "en-US,en", "Connection": "keep-alive"}, 0, 0, False, False
+        while tries < 1 + max_retries:
+            split_url = parse.urlsplit(url); resp = None; started_at = time.monotonic()
+            conn, reused = RequestWrapper._acquireconnection(split_url.scheme, split_url.netloc, timeout, fresh=force_fresh); force_fresh = False
+            try:
+                conn.request("GET", f"{split_url.path}?{split_url.query}&range={start}-{end}", headers=headers); resp = conn.getresponse(); data = resp.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                # a pooled connection the server already dropped fails before any response, redo it once on a new socket without spending a try
+                if reused and resp is None and not stale_retried: stale_retried = force_fresh = True; continue
+                tries += 1; continue
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+                if (redirects := redirects + 1) > RequestWrapper.max_redirects: conn.close(); raise HTTPError(url, resp.status, f"Too many redirects fetching range {start}-{end}", resp.headers, None)
+                RequestWrapper._releaseconnection(split_url.scheme, split_url.netloc, conn); url = parse.urljoin(url, resp.getheader("Location")); continue
+            if resp.status >= 400:
+                conn.close(); raise HTTPError(url, resp.status, resp.reason, resp.headers, None)
+            if len(data) != end - start + 1:
+                conn.close(); tries += 1; continue
+            # a throttled connection is not put back, the next range starts over on a fresh one
+            rate = len(data) / max(time.monotonic() - started_at, 1e-6)
+            if rate < rate_floor: conn.close()
+            else: RequestWrapper._releaseconnection(split_url.scheme, split_url.netloc, conn)
+            return data, rate
+        raise HTTPError(url, 503, f"Fail to fetch range {start}-{end}", None, None)
+    '''_contentlength'''
+    @staticmethod
+    def _contentlength(url: str):
+        if (clen := dict(parse.parse_qsl(parse.urlsplit(url).query)).get("clen", "")).isdigit(): return int(clen)
+        try: return RequestWrapper.filesize(url)
+        except Exception: return None
     '''get'''
     @staticmethod
     def get(url, extra_headers=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
@@ -597,11 +653,50 @@ class RequestWrapper:
             yield from RequestWrapper.stream(url, timeout=timeout, max_retries=max_retries)
             seq_num += 1
         return
+    '''parallelstream'''
+    @staticmethod
+    def parallelstream(url, file_size: int, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, max_retries=0, max_workers: Optional[int] = None, start: int = 0):
+        max_workers, base_range_size = max(1, max_workers or RequestWrapper.default_max_workers), max(RequestWrapper.default_range_size, RequestWrapper.min_range_size)
+        cond, results = threading.Condition(), {}
+        state = {"next_offset": start, "consumed_offset": start, "range_size": base_range_size, "best_rate": 0.0, "error": None, "stopped": False}
+        def worker_func():
+            while True:
+                with cond:
+                    # the reassembly buffer is bounded, workers wait instead of running too far ahead of the consumer
+                    while not state["stopped"] and state["next_offset"] < file_size and state["next_offset"] - state["consumed_offset"] >= base_range_size * max_workers * 2: cond.wait()
+                    if state["stopped"] or state["next_offset"] >= file_size: return
+                    start = state["next_offset"]; end = min(start + state["range_size"], file_size) - 1; state["next_offset"] = end + 1; rate_floor = state["best_rate"] * RequestWrapper.throttle_ratio
+                try:
+                    data, rate = RequestWrapper._fetchrange(url, start, end, timeout=timeout, max_retries=max_retries, rate_floor=rate_floor)
+                except BaseException as err:
+                    with cond: state["error"] = state["error"] or err; state["stopped"] = True; cond.notify_all()
+                    return
+                with cond:
+                    results[start] = data
+                    if rate < rate_floor: state["range_size"] = max(RequestWrapper.min_range_size, state["range_size"] // 2)
+                    else: state["range_size"] = min(base_range_size, state["range_size"] * 2)
+                    state["best_rate"] = max(state["best_rate"] * 0.9, rate); cond.notify_all()
+        workers = [threading.Thread(target=worker_func, name="videodl-yt-range", daemon=True) for _ in range(min(max_workers, math.ceil(max(file_size - start, 0) / base_range_size)))]
+        for worker in workers: worker.start()
+        offset = start
+        try:
+            while offset < file_size:
+                with cond:
+                    while offset not in results and state["error"] is None: cond.wait()
+                    if offset not in results: raise state["error"]
+                    data = results.pop(offset); state["consumed_offset"] = offset + len(data); cond.notify_all()
+                offset += len(data)
+                yield data
+        finally:
+            with cond: state["stopped"] = True; cond.notify_all()
     '''stream'''
     @staticmethod
-    def stream(url, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, max_retries=0):
-        downloaded = 0
-        file_size: int = RequestWrapper.default_range_size
+    def stream(url, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, max_retries=0, start: int = 0):
+        if RequestWrapper.default_max_workers > 1 and (file_size := RequestWrapper._contentlength(url)):
+            yield from RequestWrapper.parallelstream(url, file_size, timeout=timeout, max_retries=max_retries, start=start)
+            return
+        downloaded, file_size_known = start, False
+        file_size: int = start + RequestWrapper.default_range_size
         while downloaded < file_size:
             stop_pos, tries = min(downloaded + RequestWrapper.default_range_size, file_size) - 1, 0
             while True:
@@ -613,10 +708,10 @@ class RequestWrapper:
                 except http.client.IncompleteRead: pass
                 else: break
                 tries += 1
-            if file_size == RequestWrapper.default_range_size:
+            if not file_size_known:
                 try:
                     content_range = RequestWrapper._executerequest(f"{url}&range=0-99999999999", method="GET", timeout=timeout).info()["Content-Length"]
-                    file_size = int(content_range)
+                    file_size = int(content_range); file_size_known = True
                 except (KeyError, IndexError, ValueError) as e:
                     pass
             while True:
@@ -651,12 +746,9 @@ class RequestWrapper:
             try: segment_count = int(regexsearch(segment_regex, line, 1))
             except: pass
         if segment_count == 0: raise Exception
-        seq_num = 1
-        while seq_num <= segment_count:
-            querys['sq'] = seq_num
-            url = base_url + parse.urlencode(querys)
-            total_filesize += int(RequestWrapper.head(url)['content-length'])
-            seq_num += 1
+        headsize_func = lambda seq_num: int(RequestWrapper.head(base_url + parse.urlencode({**querys, 'sq': seq_num}))['content-length'])
+        with ThreadPoolExecutor(max_workers=min(segment_count, RequestWrapper.default_max_workers * 2)) as executor:
+            total_filesize += sum(executor.map(headsize_func, range(1, segment_count + 1)))
         return total_filesize
     '''head'''
     @staticmethod
@@ -702,6 +794,146 @@ class NodeRunner:
         self.proc.wait()
 
 
+'''PooledNodeRunner'''
+class PooledNodeRunner(NodeRunner):
+    BATCH_FUNCTION_NAME = '__batchcall__'
+    BATCH_FUNCTION_CODE = "_exposed['__batchcall__']=function(fun,argsList){var f=_exposed[fun];return argsList.map(function(args){try{return f.apply(null,args)}catch(e){return {error:e.message}}})};"
+    def __init__(self, code: str, function_names: List[str], load_timeout: float = 60.0):
+        super(PooledNodeRunner, self).__init__(code)
+        self.function_names = set(function_names)
+        self.last_used = time.monotonic()
+        self._pending = deque()
+        self._closed = False
+        self._write_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._reader = threading.Thread(target=self._readloop, name="videodl-node-runner", daemon=True)
+        self._reader.start()
+        for function_name in function_names: code = self._exposed(code, function_name)
+        # player functions are loaded once and stay resident for every later call
+        self.submit({"type": "load", "code": code}).result(timeout=load_timeout)
+        self.submit({"type": "load", "code": PooledNodeRunner.BATCH_FUNCTION_CODE}).result(timeout=load_timeout)
+    '''alive'''
+    @property
+    def alive(self):
+        return not self._closed and self.proc.poll() is None
+    '''busy'''
+    @property
+    def busy(self):
+        return bool(self._pending)
+    '''_readloop'''
+    def _readloop(self):
+        for line in self.proc.stdout:
+            if not self._pending: continue
+            future: Future = self._pending.popleft()
+            try: future.set_result(json.loads(line))
+            except Exception as err: future.set_exception(err)
+        self._closed = True
+        while self._pending: self._pending.popleft().set_exception(RuntimeError("node runner exited"))
+    '''submit'''
+    def submit(self, data: dict) -> Future:
+        future = Future(); future.request_id = next(self._request_ids)
+        # runner.js answers strictly in order, so responses are matched to requests by their position in the queue
+        with self._write_lock:
+            if not self.alive: raise RuntimeError("node runner is closed")
+            self._pending.append(future); self.last_used = time.monotonic()
+            try: self.proc.stdin.write(json.dumps(data) + "\n"); self.proc.stdin.flush()
+            except Exception: self._closed = True; raise
+        return future
+    '''call'''
+    def call(self, args: list, function_name: str = None, timeout: float = 60.0):
+        return self.submit({"type": "call", "fun": function_name or self.function_name, "args": args or []}).result(timeout=timeout)
+    '''batchcall'''
+    def batchcall(self, args_list: List[list], function_name: str, timeout: float = 60.0):
+        if not args_list: return []
+        return self.submit({"type": "call", "fun": PooledNodeRunner.BATCH_FUNCTION_NAME, "args": [function_name, args_list]}).result(timeout=timeout)
+    '''close'''
+    def close(self):
+        with self._write_lock:
+            self._closed = True
+            try: super(PooledNodeRunner, self).close()
+            except Exception: pass
+
+
+'''NodeRunnerPool'''
+class NodeRunnerPool:
+    _instance: Optional["NodeRunnerPool"] = None
+    _instance_lock = threading.Lock()
+    def __init__(self, idle_timeout: float = 300.0, max_players: int = 4, memo_size: int = 8192):
+        self.idle_timeout = idle_timeout
+        self.max_players = max_players
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._runners: Dict[str, PooledNodeRunner] = {}
+        self._retired: List[PooledNodeRunner] = []
+        self._create_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.RLock()
+        self._reaper = threading.Thread(target=self._reaploop, name="videodl-node-reaper", daemon=True)
+        self._reaper.start()
+        atexit.register(self.closeall)
+    '''instance'''
+    @classmethod
+    def instance(cls) -> "NodeRunnerPool":
+        if cls._instance is None:
+            with cls._instance_lock: cls._instance = cls._instance or cls()
+        return cls._instance
+    '''getrunner'''
+    def getrunner(self, js: str, js_url: str, function_names: List[str]) -> PooledNodeRunner:
+        with self._lock:
+            if (runner := self._usablerunner(js_url, function_names)) is not None: return runner
+            create_lock = self._create_locks.setdefault(js_url, threading.Lock())
+        # loading a multi MB player takes a while, only callers of the same player wait for it, the pool lock stays free
+        with create_lock:
+            with self._lock:
+                if (runner := self._usablerunner(js_url, function_names)) is not None: return runner
+            runner = PooledNodeRunner(js, function_names)
+            with self._lock:
+                if (replaced := self._runners.get(js_url)) is not None: self._retire(replaced)
+                self._runners[js_url] = runner
+                idle_urls = [u for u in self._runners if u != js_url and not self._runners[u].busy]
+                for stale_url in sorted(idle_urls, key=lambda u: self._runners[u].last_used)[:max(0, len(self._runners) - self.max_players)]: self._runners.pop(stale_url).close()
+            return runner
+    '''_usablerunner'''
+    def _usablerunner(self, js_url: str, function_names: List[str]) -> Optional[PooledNodeRunner]:
+        if (runner := self._runners.get(js_url)) is None or not runner.alive or not set(function_names) <= runner.function_names: return None
+        runner.last_used = time.monotonic(); return runner
+    '''_retire'''
+    def _retire(self, runner: PooledNodeRunner):
+        # calls already in flight keep their runner, it is closed by the reaper once it goes idle
+        if runner.busy and runner.alive: self._retired.append(runner)
+        else: runner.close()
+    '''discard'''
+    def discard(self, js_url: str):
+        with self._lock:
+            if (runner := self._runners.pop(js_url, None)) is not None: self._retire(runner)
+    '''memoget'''
+    def memoget(self, js_url: str, key: str):
+        with self._lock:
+            if (js_url, key) not in self._memo: return None
+            self._memo.move_to_end((js_url, key))
+            return self._memo[(js_url, key)]
+    '''memoset'''
+    def memoset(self, js_url: str, key: str, value):
+        with self._lock:
+            self._memo[(js_url, key)] = value; self._memo.move_to_end((js_url, key))
+            while len(self._memo) > self.memo_size: self._memo.popitem(last=False)
+    '''_reaploop'''
+    def _reaploop(self):
+        while True:
+            time.sleep(max(1.0, min(30.0, self.idle_timeout / 4)))
+            with self._lock:
+                for js_url, runner in list(self._runners.items()):
+                    if not runner.alive or (not runner.busy and time.monotonic() - runner.last_used > self.idle_timeout): self._runners.pop(js_url).close()
+                for runner in [runner for runner in self._retired if not runner.busy or not runner.alive]: self._retired.remove(runner); runner.close()
+                # runners kept over max_players because they were busy at eviction time are trimmed once idle
+                idle_urls = [u for u in self._runners if not self._runners[u].busy]
+                for stale_url in sorted(idle_urls, key=lambda u: self._runners[u].last_used)[:max(0, len(self._runners) - self.max_players)]: self._runners.pop(stale_url).close()
+    '''closeall'''
+    def closeall(self):
+        with self._lock:
+            while self._runners: self._runners.popitem()[1].close()
+            while self._retired: self._retired.pop().close()
+
+
 '''PART'''
 class PART(Enum):
     ONESIE_HEADER = 10
@@ -782,15 +1014,24 @@ class ChunkedDataBuffer:
         return self.total_length
     '''append'''
     def append(self, chunk):
-        if self.canmergewithlastchunk(chunk):
-            last_chunk = self.chunks[-1]
-            merged = bytearray(last_chunk)
-            merged.extend(chunk)
-            self.chunks[-1] = bytes(merged)
-            self.resetfocus()
-        else:
-            self.chunks.append(chunk)
+        # chunks are kept as memoryviews so that slicing parts out of a response never copies the payload
+        if not isinstance(chunk, memoryview): chunk = memoryview(chunk)
+        if chunk.format != 'B' or chunk.ndim != 1: chunk = chunk.cast('B')
+        if not len(chunk): return
+        self.chunks.append(chunk)
         self.total_length += len(chunk)
+    '''view'''
+    def view(self, start=0, end=None):
+        end = self.total_length if end is None else end
+        if start >= end: return memoryview(b'')
+        self.focus(start)
+        chunk, offset = self.chunks[self.current_chunk_index], self.current_chunk_offset
+        if end - offset <= len(chunk): return chunk[start - offset:end - offset]
+        joined, position = bytearray(), start
+        while position < end:
+            self.focus(position); chunk, offset = self.chunks[self.current_chunk_index], self.current_chunk_offset
+            piece = chunk[position - offset:min(end - offset, len(chunk))]; joined += piece; position += len(piece)
+        return memoryview(bytes(joined))
     '''split'''
     def split(self, position):
         extracted_buffer, remaining_buffer, remaining_pos = ChunkedDataBuffer(), ChunkedDataBuffer(), position
@@ -826,11 +1067,6 @@ class ChunkedDataBuffer:
         self.focus(position)
         chunk = self.chunks[self.current_chunk_index]
         return chunk[position - self.current_chunk_offset]
-    '''canmergewithlastchunk'''
-    def canmergewithlastchunk(self, chunk):
-        if not self.chunks: return False
-        last_chunk = self.chunks[-1]
-        return (last_chunk is not None and isinstance(last_chunk, (bytes, bytearray)) and isinstance(chunk, (bytes, bytearray)))
     '''resetfocus'''
     def resetfocus(self):
         self.current_data_view = None
@@ -844,20 +1080,20 @@ class UMP:
         self.chunked_data_buffer = chunked_data_buffer
     '''parse'''
     def parse(self, handle_part):
+        # walk the buffer with a cursor, each part is handed out as a view into the received chunks
+        offset = 0
         while True:
-            offset = 0
-            part_type, new_offset = self.readvarint(offset)
-            offset = new_offset
-            part_size, final_offset = self.readvarint(offset)
-            offset = final_offset
+            part_start = offset
+            part_type, offset = self.readvarint(offset)
+            part_size, offset = self.readvarint(offset)
             if part_type < 0 or part_size < 0: break
             if not self.chunked_data_buffer.canreadbytes(offset, part_size):
                 if not self.chunked_data_buffer.canreadbytes(offset, 1): break
+                self.chunked_data_buffer = self.chunked_data_buffer.split(part_start)['remaining_buffer']
                 return {"type": part_type, "size": part_size, "data": self.chunked_data_buffer}
-            split_result = self.chunked_data_buffer.split(offset)['remaining_buffer'].split(part_size)
-            offset = 0
-            handle_part({"type": part_type, "size": part_size, "data": split_result['extracted_buffer']})
-            self.chunked_data_buffer = split_result['remaining_buffer']
+            handle_part({"type": part_type, "size": part_size, "data": ChunkedDataBuffer([self.chunked_data_buffer.view(offset, offset + part_size)])})
+            offset += part_size
+        self.chunked_data_buffer = self.chunked_data_buffer.split(part_start)['remaining_buffer']
     '''readvarint'''
     def readvarint(self, offset):
         if self.chunked_data_buffer.canreadbytes(offset, 1):
@@ -1121,15 +1357,22 @@ class Stream:
     '''onprogressforchunks'''
     def onprogressforchunks(self, chunk: bytes, bytes_remaining: int):
         if self._monostate.on_progress: self._monostate.on_progress(self, chunk, bytes_remaining)
+    '''mirrorurls'''
+    def mirrorurls(self) -> list[str]:
+        # googlevideo urls list their alternate edge nodes in `mn`, the same signed path is served from rr{fvip}---{node}.googlevideo.com
+        split_url = parse.urlsplit(self.url); querys = dict(parse.parse_qsl(split_url.query))
+        if not split_url.netloc.endswith('.googlevideo.com'): return []
+        urls = [parse.urlunsplit(split_url._replace(netloc=f"rr{querys.get('fvip', '1')}---{node}.googlevideo.com")) for node in querys.get('mn', '').split(',') if node]
+        return [url for url in dict.fromkeys(urls) if url != self.url]
     '''iterchunks'''
-    def iterchunks(self, chunk_size: Optional[int] = None):
-        bytes_remaining = self.filesize
+    def iterchunks(self, chunk_size: Optional[int] = None, url: Optional[str] = None, start: int = 0):
+        bytes_remaining, url = self.filesize - start, url or self.url
         if chunk_size: RequestWrapper.default_range_size = chunk_size
         try:
-            stream = RequestWrapper.stream(self.url)
+            stream = RequestWrapper.stream(url, start=start)
         except HTTPError as e:
-            if e.code != 404: raise Exception
-            stream = RequestWrapper.seqstream(self.url)
+            if e.code != 404 or start > 0: raise Exception
+            stream = RequestWrapper.seqstream(url)
         for chunk in stream:
             bytes_remaining -= len(chunk)
             self.onprogressforchunks(chunk, bytes_remaining)
@@ -1254,7 +1497,7 @@ class BinaryWriter:
 class BinaryReader:
     def __init__(self, buf, decode_utf8: Callable[[bytes], str] = lambda b: b.decode('utf-8')):
         if isinstance(buf, list): buf = bytes(buf)
-        elif isinstance(buf, bytearray): buf = bytes(buf)
+        elif isinstance(buf, (bytearray, memoryview)): buf = bytes(buf)
         elif not isinstance(buf, bytes): raise TypeError(f"Unsupported buffer type: {type(buf)}")
         self.decode_utf8 = decode_utf8
         self.buf = buf
@@ -2807,7 +3050,7 @@ class ServerAbrStream:
         sabr_error, sabr_redirect, sabr_context_update = None, None, False
         ump = UMP(ChunkedDataBuffer([resp]))
         def callback_func(part):
-            data = list(part['data'].chunks[0] if part['data'].chunks else [])
+            data = part['data'].view() if part['type'] not in (PART.MEDIA.value, PART.MEDIA_END.value) else None
             if part['type'] == PART.MEDIA_HEADER.value:
                 self.processmediaheader(data)
             elif part['type'] == PART.MEDIA.value:
@@ -2867,12 +3110,11 @@ class ServerAbrStream:
     '''processmediadata'''
     def processmediadata(self, data):
         header_id = data.getuint8(0)
-        stream_data = data.split(1)['remaining_buffer']
         format_key = self.header_id_to_format_key_map.get(header_id)
         if not format_key: return
         current_format = self.formats_by_key.get(format_key)
         if not current_format: return
-        current_format['mediaChunks'].append(stream_data.chunks[0])
+        current_format['mediaChunks'].append(data.view(1))
     '''processendofmedia'''
     def processendofmedia(self, data):
         header_id = data.getuint8(0)
@@ -3058,7 +3300,7 @@ class StreamQuery(Sequence):
 class InnerTube:
     def __init__(self, client='ANDROID_VR', use_oauth=False, allow_cache=True, token_file=None, oauth_verifier=None, use_po_token=False, po_token_verifier=None):
         self.client_name = client
-        self.innertube_context = DEFAULT_CLIENTS[client]['innertube_context']
+        self.innertube_context = copy.deepcopy(DEFAULT_CLIENTS[client]['innertube_context'])
         self.header = DEFAULT_CLIENTS[client]['header']
         self.api_key = DEFAULT_CLIENTS[client]['api_key']
         self.require_js_player = DEFAULT_CLIENTS[client]['require_js_player']
@@ -3241,6 +3483,92 @@ class YouTubeMetadata:
         return self._metadata
 
 
+'''PlayerJSCache'''
+class PlayerJSCache:
+    cache_dir = Path(__file__).parent.resolve() / '__cache__' / 'players'
+    max_cache_bytes = 64 * 1024 * 1024
+    max_memory_entries = 4
+    _memory: "OrderedDict[str, str]" = OrderedDict()
+    _lock = threading.RLock()
+    '''_remember'''
+    @staticmethod
+    def _remember(js_url: str, js: str):
+        # players are several MB each, only the most recently used few stay in process memory
+        with PlayerJSCache._lock:
+            PlayerJSCache._memory[js_url] = js; PlayerJSCache._memory.move_to_end(js_url)
+            while len(PlayerJSCache._memory) > max(PlayerJSCache.max_memory_entries, 1): PlayerJSCache._memory.popitem(last=False)
+    '''_metapath'''
+    @staticmethod
+    def _metapath(js_url: str):
+        return PlayerJSCache.cache_dir / f"{hashlib.sha256(js_url.encode('utf-8')).hexdigest()[:32]}.json"
+    '''_writeatomic'''
+    @staticmethod
+    def _writeatomic(path: Path, content: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True); tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try: tmp_path.write_bytes(content); os.replace(str(tmp_path), str(path))
+        finally: tmp_path.unlink(missing_ok=True)
+    '''getmeta'''
+    @staticmethod
+    def getmeta(js_url: str) -> dict:
+        try: meta = json.loads(PlayerJSCache._metapath(js_url).read_text(encoding='utf-8'))
+        except Exception: return {}
+        return meta if isinstance(meta, dict) and meta.get('js_url') == js_url else {}
+    '''putmeta'''
+    @staticmethod
+    def putmeta(js_url: str, **kwargs):
+        with PlayerJSCache._lock:
+            (meta := PlayerJSCache.getmeta(js_url)).update(kwargs); meta['js_url'] = js_url
+            try: PlayerJSCache._writeatomic(PlayerJSCache._metapath(js_url), json.dumps(meta).encode('utf-8'))
+            except OSError: pass
+    '''getjs'''
+    @staticmethod
+    def getjs(js_url: str) -> Optional[str]:
+        with PlayerJSCache._lock:
+            if (js := PlayerJSCache._memory.get(js_url)): PlayerJSCache._memory.move_to_end(js_url); return js
+        if not (content_hash := PlayerJSCache.getmeta(js_url).get('sha256')): return None
+        try: content = (js_path := PlayerJSCache.cache_dir / f"{content_hash}.js").read_bytes()
+        except OSError: return None
+        if hashlib.sha256(content).hexdigest() != content_hash: PlayerJSCache.invalidate(js_url); return None
+        # touch on read so eviction drops the least recently used players first
+        try: os.utime(js_path); os.utime(PlayerJSCache._metapath(js_url))
+        except OSError: pass
+        PlayerJSCache._remember(js_url, (js := content.decode('utf-8')))
+        return js
+    '''putjs'''
+    @staticmethod
+    def putjs(js_url: str, js: str):
+        content = js.encode('utf-8'); content_hash = hashlib.sha256(content).hexdigest()
+        with PlayerJSCache._lock:
+            PlayerJSCache._remember(js_url, js)
+            try:
+                if not (js_path := PlayerJSCache.cache_dir / f"{content_hash}.js").exists(): PlayerJSCache._writeatomic(js_path, content)
+                if PlayerJSCache.getmeta(js_url).get('sha256') != content_hash: PlayerJSCache._writeatomic(PlayerJSCache._metapath(js_url), json.dumps({'js_url': js_url, 'sha256': content_hash, 'size': len(content)}).encode('utf-8'))
+                PlayerJSCache.evict()
+            except OSError:
+                pass
+    '''invalidate'''
+    @staticmethod
+    def invalidate(js_url: str):
+        with PlayerJSCache._lock:
+            PlayerJSCache._memory.pop(js_url, None)
+            PlayerJSCache._metapath(js_url).unlink(missing_ok=True)
+    '''evict'''
+    @staticmethod
+    def evict():
+        with PlayerJSCache._lock:
+            try: entries = [(e.stat().st_mtime, e.stat().st_size, e) for e in PlayerJSCache.cache_dir.glob('*.js')]
+            except OSError: return
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, js_path in sorted(entries, key=lambda e: e[0]):
+                if total_size <= PlayerJSCache.max_cache_bytes: break
+                js_path.unlink(missing_ok=True); total_size -= size
+            live_hashes = {js_path.stem for js_path in PlayerJSCache.cache_dir.glob('*.js')}
+            for meta_path in PlayerJSCache.cache_dir.glob('*.json'):
+                try: meta = json.loads(meta_path.read_text(encoding='utf-8'))
+                except Exception: meta = {}
+                if meta.get('sha256') not in live_hashes: meta_path.unlink(missing_ok=True); PlayerJSCache._memory.pop(meta.get('js_url'), None)
+
+
 '''Cipher'''
 class Cipher:
     def __init__(self, js: str, js_url: str):
@@ -3248,36 +3576,68 @@ class Cipher:
         self.js = js
         self._sig_param_val = None
         self._nsig_param_val = None
-        self.sig_function_name = self.getsigfunctionname(js, js_url)
-        self.nsig_function_name = self.getnsigfunctionname(js, js_url)
-        self.runner_sig = NodeRunner(js)
-        self.runner_sig.loadfunction(self.sig_function_name)
-        self.runner_nsig = NodeRunner(js)
-        self.runner_nsig.loadfunction(self.nsig_function_name)
+        # function names and parameter values only depend on the versioned player, so reuse what an earlier parse extracted
+        if (meta := PlayerJSCache.getmeta(js_url)).get('sig_function_name') and meta.get('nsig_function_name'):
+            self.sig_function_name, self.nsig_function_name = meta['sig_function_name'], meta['nsig_function_name']
+            self._sig_param_val, self._nsig_param_val = meta.get('sig_param_val'), meta.get('nsig_param_val')
+        else:
+            self.sig_function_name = self.getsigfunctionname(js, js_url)
+            self.nsig_function_name = self.getnsigfunctionname(js, js_url)
+            PlayerJSCache.putmeta(js_url, sig_function_name=self.sig_function_name, nsig_function_name=self.nsig_function_name, sig_param_val=self._sig_param_val, nsig_param_val=self._nsig_param_val)
+        # one resident node process per player version serves both functions for every cipher sharing it
+        self.runner_pool = NodeRunnerPool.instance()
+        self.runner: Optional[PooledNodeRunner] = None
+        self._acquirerunner()
         self.calculated_n = None
+    '''_acquirerunner'''
+    def _acquirerunner(self) -> Optional[PooledNodeRunner]:
+        try: self.runner = self.runner_pool.getrunner(self.js, self.js_url, [self.sig_function_name, self.nsig_function_name])
+        except Exception: self.runner = None
+        return self.runner
+    '''batchcall'''
+    def batchcall(self, args_list: List[list], function_name: str):
+        # a runner the pool closed (eviction, idle reaping, crash) is re-acquired once, after that the python interpreter takes over
+        for _ in range(2):
+            if self.runner is not None and not self.runner.alive: self._acquirerunner()
+            if self.runner is None: break
+            try: return self.runner.batchcall(args_list, function_name)
+            except RuntimeError:
+                if self.runner.alive: raise
+        # without a usable node, fall back to the pure python interpreter whose extracted functions are cached per player
+        results = []
+        for args in args_list:
+            try: results.append(JSInterpreter.cachedfunction(self.js, function_name)(args))
+            except Exception as err: results.append({'error': str(err)})
+        return results
+    '''getnsigs'''
+    def getnsigs(self, ns: List[str]):
+        nsigs = {n: nsig for n in dict.fromkeys(ns) if (nsig := self.runner_pool.memoget(self.js_url, f'nsig:{n}')) is not None}
+        if not (pending := [n for n in dict.fromkeys(ns) if n not in nsigs]): return nsigs
+        for param in (self._nsig_param_val or [None]):
+            results = self.batchcall([[n] if param is None else [param, n] for n in pending], self.nsig_function_name)
+            for n, nsig in zip(pending, results):
+                if isinstance(nsig, str): nsigs[n] = nsig
+            if not (pending := [n for n in pending if n not in nsigs]): break
+        for n in ns:
+            if n not in nsigs or 'error' in nsigs[n] or '_w8_' in nsigs[n]: raise Exception
+            self.runner_pool.memoset(self.js_url, f'nsig:{n}', nsigs[n])
+        return nsigs
     '''getnsig'''
     def getnsig(self, n: str):
-        try:
-            if self._nsig_param_val:
-                for param in self._nsig_param_val:
-                    nsig = self.runner_nsig.call([param, n])
-                    if not isinstance(nsig, str): continue
-                    else: break
-            else:
-                nsig = self.runner_nsig.call([n])
-        except Exception as err:
-            raise err
-        if 'error' in nsig or '_w8_' in nsig or not isinstance(nsig, str): raise Exception 
-        return nsig
+        return self.getnsigs([n])[n]
+    '''getsigs'''
+    def getsigs(self, ciphered_signatures: List[str]):
+        ciphered_signatures = list(dict.fromkeys(ciphered_signatures))
+        results = self.batchcall([[self._sig_param_val, s] if self._sig_param_val else [s] for s in ciphered_signatures], self.sig_function_name)
+        for sig in results:
+            if not isinstance(sig, str) or 'error' in sig: raise Exception
+        return dict(zip(ciphered_signatures, results))
     '''getsig'''
     def getsig(self, ciphered_signature: str):
-        try:
-            if self._sig_param_val: sig = self.runner_sig.call([self._sig_param_val, ciphered_signature])
-            else: sig = self.runner_sig.call([ciphered_signature])
-        except Exception as err:
-            raise err
-        if 'error' in sig or not isinstance(sig, str): raise Exception 
-        return sig
+        return self.getsigs([ciphered_signature])[ciphered_signature]
+    '''close'''
+    def close(self):
+        if self.runner is not None: self.runner.last_used = time.monotonic()
     '''getsigfunctionname'''
     def getsigfunctionname(self, js: str, js_url: str):
         function_patterns = [
@@ -3356,6 +3716,12 @@ class Cipher:
 
 '''YouTube'''
 class YouTube:
+    fallback_hedge_delay = 0.75
+    visitor_data_ttl = 3600.0
+    _client_scores: Dict[str, float] = {}
+    _client_scores_lock = threading.Lock()
+    _shared_visitor_data: Optional[Tuple[str, float]] = None
+    _shared_visitor_data_lock = threading.Lock()
     def __init__(self, video_id: str, client: str = InnerTube().client_name, on_progress_callback: Optional[Callable[[Any, bytes, int], None]] = None, on_complete_callback: Optional[Callable[[Any, Optional[str]], None]] = None,
                  use_oauth: bool = False, allow_oauth_cache: bool = True, token_file: Optional[str] = None, oauth_verifier: Optional[Callable[[str, str], None]] = None, use_po_token: Optional[bool] = False,
                  po_token_verifier: Optional[Callable[[None], Tuple[str, str]]] = None):
@@ -3389,6 +3755,7 @@ class YouTube:
         self.po_token_verifier = po_token_verifier
         self.po_token = None
         self._pot = None
+        self._lazy_lock = threading.RLock()
     '''watch_html'''
     @property
     def watch_html(self):
@@ -3418,33 +3785,43 @@ class YouTube:
     @property
     def js(self):
         if self._js: return self._js
-        self._js = RequestWrapper.get(self.js_url)
+        if (js := PlayerJSCache.getjs(self.js_url)): self._js = js; return self._js
+        self._js = RequestWrapper.get(self.js_url); PlayerJSCache.putjs(self.js_url, self._js)
         return self._js
     '''visitor_data'''
     @property
     def visitor_data(self):
         if self._visitor_data: return self._visitor_data
-        if InnerTube(self.client).require_po_token:
-            try:
-                self._visitor_data = extractvisitordata(str(self.initial_data['responseContext']))
+        # visitor data is not bound to a video, share it process wide so racing clients and later videos skip the extra player call
+        with YouTube._shared_visitor_data_lock:
+            if self._visitor_data: return self._visitor_data
+            if (shared := YouTube._shared_visitor_data) and time.time() - shared[1] < self.visitor_data_ttl:
+                self._visitor_data = shared[0]
                 return self._visitor_data
-            except:
-                pass
-        innertube_response = InnerTube('WEB').player(self.video_id)
-        try:
-            self._visitor_data = innertube_response['responseContext']['visitorData']
-        except KeyError:
-            p_dicts = innertube_response['responseContext']['serviceTrackingParams'][0]['params']
-            self._visitor_data = next(p for p in p_dicts if p['key'] == 'visitor_data')['value']
+            if InnerTube(self.client).require_po_token:
+                try:
+                    self._visitor_data = extractvisitordata(str(self.initial_data['responseContext']))
+                except:
+                    pass
+            if not self._visitor_data:
+                innertube_response = InnerTube('WEB').player(self.video_id)
+                try:
+                    self._visitor_data = innertube_response['responseContext']['visitorData']
+                except KeyError:
+                    p_dicts = innertube_response['responseContext']['serviceTrackingParams'][0]['params']
+                    self._visitor_data = next(p for p in p_dicts if p['key'] == 'visitor_data')['value']
+            if self._visitor_data: YouTube._shared_visitor_data = (self._visitor_data, time.time())
         return self._visitor_data
     '''pot'''
     @property
     def pot(self):
         if self._pot: return self._pot
-        try:
-            self._pot = generatepotoken(video_id=self.video_id)
-        except Exception as err:
-            pass
+        with self._lazy_lock:
+            if self._pot: return self._pot
+            try:
+                self._pot = generatepotoken(video_id=self.video_id)
+            except Exception as err:
+                pass
         return self._pot
     '''initial_data'''
     @property
@@ -3455,12 +3832,9 @@ class YouTube:
     '''streaming_data'''
     @property
     def streaming_data(self):
-        invalid_id_list = ['aQvGIIdgFDM']
-        if 'streamingData' not in self.vid_info or self.vid_info['videoDetails']['videoId'] in invalid_id_list:
-            for client in self.fallback_clients:
-                self.client = client
-                self.vid_info = None
-                if 'streamingData' in self.vid_info: break
+        if not self.isplayableresponse(self.vid_info):
+            if (clients := [client for client in self.fallback_clients if client != self.client]):
+                self.vid_info = self.racevidinfoclients(clients)
         return self.vid_info['streamingData']
     '''fmt_streams'''
     @property
@@ -3474,6 +3848,7 @@ class YouTube:
             try:
                 applysignature(stream_manifest, self.vid_info, self.js, self.js_url)
             except:
+                PlayerJSCache.invalidate(self.js_url)
                 self._js = None
                 self._js_url = None
                 applysignature(stream_manifest, self.vid_info, self.js, self.js_url)
@@ -3486,8 +3861,10 @@ class YouTube:
     '''signature_timestamp'''
     @property
     def signature_timestamp(self):
-        if not self._signature_timestamp:
-            self._signature_timestamp = {'playbackContext': {'contentPlaybackContext': {'signatureTimestamp': extractsignaturetimestamp(self.js)}}}
+        if self._signature_timestamp: return self._signature_timestamp
+        with self._lazy_lock:
+            if not self._signature_timestamp:
+                self._signature_timestamp = {'playbackContext': {'contentPlaybackContext': {'signatureTimestamp': extractsignaturetimestamp(self.js)}}}
         return self._signature_timestamp
     '''video_playback_ustreamer_config'''
     @property
@@ -3514,29 +3891,73 @@ class YouTube:
         self._vid_info = value
     '''vid_info_client'''
     def vid_info_client(self, optional_client=None):
-        if optional_client is None:
-            if self._vid_info: return self._vid_info
-            optional_client = self.client
-        def callinnertube_func(optional_client):
-            innertube = InnerTube(
-                client=optional_client, use_oauth=self.use_oauth, allow_cache=self.allow_oauth_cache, token_file=self.token_file, oauth_verifier=self.oauth_verifier,
-                use_po_token=self.use_po_token, po_token_verifier=self.po_token_verifier
-            )
-            if innertube.require_js_player: innertube.innertube_context.update(self.signature_timestamp)
-            if innertube.require_po_token and not self.use_po_token: innertube.insertvisitordata(visitor_data=self.visitor_data)
-            elif not self.use_po_token: innertube.insertvisitordata(visitor_data=self.visitor_data)
-            response = innertube.player(self.video_id)
-            if self.use_po_token or innertube.require_po_token: self.po_token = innertube.access_po_token or self.pot
+        if optional_client is not None:
+            response, po_token = self.callinnertube(optional_client)
+            if po_token is not None: self.po_token = po_token
             return response
-        innertube_response = callinnertube_func(optional_client)
-        for client in self.fallback_clients:
-            playability_status = innertube_response['playabilityStatus']
-            if playability_status['status'] == 'UNPLAYABLE' and 'reason' in playability_status and playability_status['reason'] == 'This video is not available':
-                self.client = client
-                innertube_response = callinnertube_func(client)
-            else:
-                break
-        return innertube_response
+        if self._vid_info: return self._vid_info
+        return self.racevidinfoclients([self.client] + [client for client in self.fallback_clients if client != self.client])
+    '''callinnertube'''
+    def callinnertube(self, client):
+        innertube = InnerTube(
+            client=client, use_oauth=self.use_oauth, allow_cache=self.allow_oauth_cache, token_file=self.token_file, oauth_verifier=self.oauth_verifier,
+            use_po_token=self.use_po_token, po_token_verifier=self.po_token_verifier
+        )
+        if innertube.require_js_player: innertube.innertube_context.update(self.signature_timestamp)
+        if innertube.require_po_token and not self.use_po_token: innertube.insertvisitordata(visitor_data=self.visitor_data)
+        elif not self.use_po_token: innertube.insertvisitordata(visitor_data=self.visitor_data)
+        response = innertube.player(self.video_id)
+        po_token = (innertube.access_po_token or self.pot) if (self.use_po_token or innertube.require_po_token) else None
+        return response, po_token
+    '''isplayableresponse'''
+    @staticmethod
+    def isplayableresponse(response):
+        invalid_id_list = ['aQvGIIdgFDM']
+        if not isinstance(response, dict) or 'streamingData' not in response: return False
+        return response.get('videoDetails', {}).get('videoId') not in invalid_id_list
+    '''rankclients'''
+    @classmethod
+    def rankclients(cls, clients):
+        # stable sort keeps the configured order until the success memo says otherwise
+        with cls._client_scores_lock: scores = dict(cls._client_scores)
+        return sorted(dict.fromkeys(clients), key=lambda client: -scores.get(client, 0.0))
+    '''recordclient'''
+    @classmethod
+    def recordclient(cls, client, success):
+        with cls._client_scores_lock: cls._client_scores[client] = cls._client_scores.get(client, 0.0) * 0.7 + (1.0 if success else -1.0)
+    '''racevidinfoclients'''
+    def racevidinfoclients(self, clients):
+        clients = self.rankclients(clients)
+        # resolve the shared inputs once up front instead of once per racing client
+        if any(DEFAULT_CLIENTS[client]['require_js_player'] for client in clients): self.signature_timestamp
+        if not self.use_po_token: self.visitor_data
+        executor = ThreadPoolExecutor(max_workers=len(clients), thread_name_prefix='videodl-innertube')
+        pending, results, errors, winner = {}, {}, [], None
+        try:
+            for idx, client in enumerate(clients):
+                pending[executor.submit(self.callinnertube, client)] = client
+                deadline = time.monotonic() + self.fallback_hedge_delay if idx < len(clients) - 1 else None
+                while pending and winner is None:
+                    done, _ = wait(list(pending), timeout=None if deadline is None else max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                    # hedge delay elapsed without an answer, start the next client alongside the running ones
+                    if not done: break
+                    for future in done:
+                        finished_client = pending.pop(future)
+                        try: results[finished_client] = future.result()
+                        except Exception as err: errors.append(err); YouTube.recordclient(finished_client, False); continue
+                        success = self.isplayableresponse(results[finished_client][0]); YouTube.recordclient(finished_client, success)
+                        if success and winner is None: winner = finished_client
+                    # every started client failed, do not wait for the hedge delay before trying the next one
+                    if winner is None and not pending: break
+                if winner is not None: break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        # nobody is playable, keep the highest ranked answer so metadata (title, playability reason) is still available
+        if winner is None: winner = next((client for client in clients if client in results), None)
+        if winner is None: raise errors[0] if errors else RuntimeError(f'No InnerTube client answered for {self.video_id}')
+        self.client = winner; response, po_token = results[winner]
+        if po_token is not None: self.po_token = po_token
+        return response
     '''vid_details'''
     @property
     def vid_details(self):